@@ -76,13 +76,18 @@ def parse_commandline():
         help=_("line number to go to, starting at 1"))
     parser.add_argument('-c', '--column', type=int, metavar=_("NUM"),
         help=_("column to go to, starting at 1"))
-    parser.add_argument('--start', metavar=_("NAME"),
+    parser.add_argument('--start', '--session', metavar=_("NAME"),
         help=_("session to start ('{none}' for empty session)").format(none="-"),
         dest="session")
     parser.add_argument('--list-sessions', action="store_true", default=False,
         help=_("list the session names and exit"))
     parser.add_argument('-n', '--new', action="store_true", default=False,
         help=_("always start a new instance"))
+    parser.add_argument('--engrave', action="store_true", default=False,
+        help=_("engrave the files, or the documents of the session given "
+               "with --session or --start, without opening a window, and exit"))
+    parser.add_argument('-j', '--jobs', type=int, metavar=_("NUM"), default=0,
+        help=_("number of files to engrave at the same time with --engrave"))
     parser.add_argument('--python-ly', type=str, metavar=_("STR"), default="",
         help=_("path to python-ly"))
     parser.add_argument('files', metavar=_("file"), nargs='*',
@@ -167,6 +172,13 @@ def check_ly():
 
 def main(debug=False):
     """Main function."""
+    if '--engrave' in sys.argv[1:]:
+        # engraving from the command line needs no display
+        if not os.environ.get("QT_QPA_PLATFORM"):
+            os.environ["QT_QPA_PLATFORM"] = "offscreen"
+        # Qt would take --session NAME as the id of a restored desktop session
+        # (--session=NAME is left alone by Qt and handled by argparse)
+        sys.argv[1:] = ['--start' if arg == '--session' else arg for arg in sys.argv[1:]]
     app.instantiate()               # Construct QApplication object
     args = parse_commandline()
 
@@ -190,6 +202,10 @@ def main(debug=False):
             sys.stdout.write(name + '\n')
         sys.exit(0)
 
+    if args.engrave:
+        import engrave.batch
+        sys.exit(engrave.batch.run(args.files, args.session, args.jobs, args.encoding))
+
     urls = list(map(url, args.files))
 
     if not app.qApp.isSessionRestored():
@@ -82,11 +82,14 @@ def activeWindow():
             return w
         return windows[0]
 
-def openUrl(url, encoding=None):
+def openUrl(url, encoding=None, deferred=False):
     """Returns a Document instance for the given QUrl.
 
     If there is already a document with that url, it is returned.
 
+    If deferred is True, a new document is not loaded yet, see
+    document.EditorDocument.new_deferred().
+
     """
     d = findDocument(url)
     if not d:
@@ -103,7 +106,10 @@ def openUrl(url, encoding=None):
                 d.load(url)
         else:
             import document
-            d = document.EditorDocument.new_from_url(url, encoding)
+            if deferred:
+                d = document.EditorDocument.new_deferred(url, encoding)
+            else:
+                d = document.EditorDocument.new_from_url(url, encoding)
     return d
 
 def findDocument(url):
@@ -290,8 +296,6 @@ def job_queue():
     global _job_queue
     if _job_queue is None:
         import job.queue
-        #TODO: save the number of runners in the Preferences
-        #NOTE: Provide code for *changing* the number of runners
         _job_queue = job.queue.GlobalJobQueue()
     return _job_queue
 
@@ -26,6 +26,7 @@ import itertools
 import os
 import platform
 
+import includeresolver
 import listmodel
 import plugin
 import ly.words
@@ -163,19 +164,20 @@ class DocumentDataSource(plugin.DocumentPlugin):
 
 
 def get_filenames(path, directories = False):
-    try:
-        for root, dirs, files in os.walk(path):
-            for f in files:
-                if f and f[0] not in '.~':
-                    name, ext = os.path.splitext(f)
-                    if ext.lower() in ('.ly', '.lyi', '.ily'):
-                        yield f
-            if directories:
-                for f in dirs:
-                    if f and not f.startswith('.'):
-                        yield f + os.sep
-            return
-    except UnicodeDecodeError:
-        # this only happens when there are filenames in the wrong encoding,
-        # but never ever bug the user about this while typing :)
-        pass
+    """Yield the LilyPond files (and directories if desired) in path.
+
+    The cached directory listing of the includeresolver module is used if
+    available, but the directory is not watched if it isn't already.
+
+    """
+    listing = includeresolver.listing(
+        os.path.normpath(os.path.abspath(path)), watch=False)
+    for f in listing.files:
+        if f and f[0] not in '.~':
+            name, ext = os.path.splitext(f)
+            if ext.lower() in ('.ly', '.lyi', '.ily'):
+                yield f
+    if directories:
+        for f in listing.dirs:
+            if f and not f.startswith('.'):
+                yield f + os.sep
@@ -22,11 +22,10 @@ Harvest strings from document for autocompletion purposes.
 """
 
 
-import itertools
 import re
 
 import documentinfo
-import fileinfo
+import symbolindex
 import tokeniter
 import ly.lex.lilypond
 import ly.lex.scheme
@@ -57,18 +56,14 @@ def schemewords(document):
 
 def include_identifiers(cursor):
     """Harvests identifier definitions from included files."""
-    dinfo = documentinfo.info(cursor.document())
-    files = fileinfo.includefiles(get_docinfo(cursor), dinfo.includepath())
-    return itertools.chain.from_iterable(fileinfo.docinfo(f).definitions()
-                                         for f in files)
+    return symbolindex.include_names(cursor.document(),
+        symbolindex.DEFINITION, cursor.position())
 
 
 def include_markup_commands(cursor):
     """Harvest markup command definitions from included files."""
-    dinfo = documentinfo.info(cursor.document())
-    files = fileinfo.includefiles(get_docinfo(cursor), dinfo.includepath())
-    return itertools.chain.from_iterable(fileinfo.docinfo(f).markup_definitions()
-                                         for f in files)
+    return symbolindex.include_names(cursor.document(),
+        symbolindex.MARKUP, cursor.position())
 
 
 _words = re.compile(r'\w{5,}|\w{2,}(?:[:-]\w+)+').finditer
@@ -57,16 +57,44 @@ class Bookmarks(plugin.DocumentPlugin):
 
     The marks are stored in the metainfo for the Document.
 
+    For every type the sorted list of the line numbers of the marks is cached,
+    so looking up a mark does not need to ask every mark for its line number.
+    The cache is cleared when lines are inserted or removed.
+
     """
     marksChanged = signals.Signal()
 
     def __init__(self, document):
         """Creates the Bookmarks instance."""
+        self._lines = {}
+        self._blockCount = document.blockCount()
+        document.contentsChange.connect(self._contentsChange)
         document.loaded.connect(self.load)
         document.saved.connect(self.save)
         document.closed.connect(self.save)
         self.load() # initializes self._marks
 
+    def _contentsChange(self, position, removed, added):
+        """Called when the document changes, forgets the line numbers if needed."""
+        doc = self.document()
+        count, self._blockCount = self._blockCount, doc.blockCount()
+        if count != self._blockCount or doc.findBlock(position) != doc.findBlock(position + added):
+            self._lines.clear()
+
+    def _linenums(self, type):
+        """Returns the (cached) sorted list of line numbers of the marks of type."""
+        try:
+            return self._lines[type]
+        except KeyError:
+            nums = self._lines[type] = [mark.blockNumber() for mark in self._marks[type]]
+            return nums
+
+    def _mark(self, linenum):
+        """Returns a new mark (QTextCursor) at the given line."""
+        mark = QTextCursor(self.document().findBlockByNumber(linenum))
+        mark.setKeepPositionOnInsert(True)
+        return mark
+
     def marks(self, type=None):
         """Returns marks (QTextCursor instances).
 
@@ -81,52 +109,63 @@ class Bookmarks(plugin.DocumentPlugin):
 
     def setMark(self, linenum, type):
         """Marks the given line number with a mark of the given type."""
-        nums = [mark.blockNumber() for mark in self._marks[type]]
-        if linenum in nums:
-            return
+        nums = self._linenums(type)
         index = bisect.bisect_left(nums, linenum)
-        mark = QTextCursor(self.document().findBlockByNumber(linenum))
-        mark.setKeepPositionOnInsert(True)
-        self._marks[type].insert(index, mark)
+        if index < len(nums) and nums[index] == linenum:
+            return
+        self._marks[type].insert(index, self._mark(linenum))
+        nums.insert(index, linenum)
+        self.marksChanged()
+
+    def setMarks(self, linenums, type):
+        """Marks all the given line numbers with a mark of the given type.
+
+        The marksChanged signal is emitted only once, if any mark was added.
+
+        """
+        nums = self._linenums(type)
+        new = sorted(set(linenums).difference(nums))
+        if not new:
+            return
+        marks = list(zip(nums, self._marks[type]))
+        marks.extend((linenum, self._mark(linenum)) for linenum in new)
+        marks.sort(key=lambda m: m[0])
+        self._lines[type] = [num for num, mark in marks]
+        self._marks[type] = [mark for num, mark in marks]
         self.marksChanged()
 
     def unsetMark(self, linenum, type):
         """Removes a mark of the given type on the given line."""
-        nums = [mark.blockNumber() for mark in self._marks[type]]
-        if linenum in nums:
-            # remove double occurrences
-            while True:
-                index = bisect.bisect_left(nums, linenum)
-                del self._marks[type][index]
-                del nums[index]
-                if linenum not in nums:
-                    break
+        nums = self._linenums(type)
+        # remove double occurrences
+        start = bisect.bisect_left(nums, linenum)
+        end = bisect.bisect_right(nums, linenum, start)
+        if start < end:
+            del self._marks[type][start:end]
+            del nums[start:end]
             self.marksChanged()
 
     def toggleMark(self, linenum, type):
         """Toggles the mark of the given type on the given line."""
-        nums = [mark.blockNumber() for mark in self._marks[type]]
-        index = bisect.bisect_left(nums, linenum)
-        if linenum in nums:
-            # remove double occurrences
-            while True:
-                del self._marks[type][index]
-                del nums[index]
-                if linenum not in nums:
-                    break
-                index = bisect.bisect_left(nums, linenum)
+        nums = self._linenums(type)
+        # remove double occurrences
+        start = bisect.bisect_left(nums, linenum)
+        end = bisect.bisect_right(nums, linenum, start)
+        if start < end:
+            del self._marks[type][start:end]
+            del nums[start:end]
         else:
-            mark = QTextCursor(self.document().findBlockByNumber(linenum))
-            mark.setKeepPositionOnInsert(True)
-            self._marks[type].insert(index, mark)
+            self._marks[type].insert(start, self._mark(linenum))
+            nums.insert(start, linenum)
         self.marksChanged()
 
     def hasMark(self, linenum, type=None):
         """Returns True if the line has a mark (of the given type if specified) else False."""
         for type in types if type is None else (type,):
-            for mark in self._marks[type]:
-                if mark.blockNumber() == linenum:
-                    return True
+            nums = self._linenums(type)
+            index = bisect.bisect_left(nums, linenum)
+            if index < len(nums) and nums[index] == linenum:
+                return True
         return False
 
     def clear(self, type=None):
@@ -134,43 +173,40 @@ class Bookmarks(plugin.DocumentPlugin):
         if type is None:
             for type in types:
                 self._marks[type] = []
+                self._lines[type] = []
         else:
             self._marks[type] = []
+            self._lines[type] = []
         self.marksChanged()
 
     def nextMark(self, cursor, type=None):
         """Finds the first mark after the cursor (of the type if specified)."""
-        if type is None:
-            marks = []
-            for type in types:
-                marks += self._marks[type]
-            # sort the marks on line number
-            marks.sort(key=lambda mark: mark.blockNumber())
-        else:
-            marks = self._marks[type]
-        nums = [mark.blockNumber() for mark in marks]
-        index = bisect.bisect_right(nums, cursor.blockNumber())
-        if index < len(nums):
-            return QTextCursor(marks[index].block())
+        linenum = cursor.blockNumber()
+        result = None
+        for type in types if type is None else (type,):
+            nums = self._linenums(type)
+            index = bisect.bisect_right(nums, linenum)
+            if index < len(nums) and (result is None or nums[index] < result[0]):
+                result = nums[index], self._marks[type][index]
+        if result:
+            return QTextCursor(result[1].block())
 
     def previousMark(self, cursor, type=None):
         """Finds the first mark before the cursor (of the type if specified)."""
-        if type is None:
-            marks = []
-            for type in types:
-                marks += self._marks[type]
-            # sort the marks on line number
-            marks.sort(key=lambda mark: mark.blockNumber())
-        else:
-            marks = self._marks[type]
-        nums = [mark.blockNumber() for mark in marks]
-        index = bisect.bisect_left(nums, cursor.blockNumber())
-        if index > 0:
-            return QTextCursor(marks[index-1].block())
+        linenum = cursor.blockNumber()
+        result = None
+        for type in types if type is None else (type,):
+            nums = self._linenums(type)
+            index = bisect.bisect_left(nums, linenum)
+            if index > 0 and (result is None or nums[index-1] > result[0]):
+                result = nums[index-1], self._marks[type][index-1]
+        if result:
+            return QTextCursor(result[1].block())
 
     def load(self):
         """Loads the marks from the metainfo."""
         self._marks = {type: [] for type in types}
+        self._lines.clear()
         marks = metainfo.info(self.document()).bookmarks
         try:
             d = json.loads(marks) or {}
@@ -185,9 +221,8 @@ class Bookmarks(plugin.DocumentPlugin):
         d = {}
         for type in types:
             d[type] = lines = []
-            for mark in self._marks[type]:
-                linenum = mark.blockNumber()
-                if linenum not in lines:
+            for linenum in self._linenums(type):
+                if not lines or linenum != lines[-1]:
                     lines.append(linenum)
         metainfo.info(self.document()).bookmarks = json.dumps(d)
 
@@ -91,18 +91,18 @@ def open_files(cursor, menu, mainwindow):
 def jump_to_definition(cursor, menu, mainwindow):
     """Return a list of context menu actions jumping to the definition."""
     import definition
-    node = definition.refnode(cursor)
-    if node:
+    token = definition.reference(cursor)
+    if token:
         a = QAction(menu)
         def complete():
-            target = definition.target(node)
+            target = definition.target(cursor, token)
             if target:
-                if target.document is node.document:
+                if target.document is cursor.document():
                     a.setText(_("&Jump to definition (line {num})").format(
-                        num = node.document.index(node.document.block(target.position)) + 1))
+                        num = target.document.findBlock(target.position).blockNumber() + 1))
                 else:
                     a.setText(_("&Jump to definition (in {filename})").format(
-                        filename=util.homify(target.document.filename)))
+                        filename=util.homify(target.filename)))
                 @a.triggered.connect
                 def activate():
                     definition.goto_target(mainwindow, target)
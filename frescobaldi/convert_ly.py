@@ -22,7 +22,6 @@ Updates a document using convert-ly.
 """
 
 
-import difflib
 import textwrap
 import os
 import platform
@@ -42,6 +41,7 @@ import icons
 import widgets
 import htmldiff
 import cursordiff
+import textdiff
 import lilychooser
 import documentinfo
 import textformats
@@ -184,7 +184,7 @@ class Dialog(QDialog):
             from_filename = "current"   # TODO: maybe use real filename here
             to_filename = "converted"   # but difflib can choke on non-ascii characters,
                                         # see https://github.com/frescobaldi/frescobaldi/issues/674
-            difflist = list(difflib.unified_diff(
+            difflist = list(textdiff.unified_diff(
                     self._text.split('\n'), text.split('\n'),
                     from_filename, to_filename))
             diffHLstr = self.diffHighl(difflist)
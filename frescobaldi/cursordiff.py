@@ -22,15 +22,14 @@ Replaces selected text of a QTextCursor without erasing all the other
 QTextCursor instances that exist in the selected range.
 
 This is done by making a diff between the existing selection and the replacing
-text, and applying that diff.
+text (using the textdiff module), and applying that diff.
 """
 
 
-import difflib
-
 from PyQt6.QtGui import QTextCursor
 
 import cursortools
+import textdiff
 
 
 def insert_text(cursor, text):
@@ -49,20 +48,12 @@ def insert_text(cursor, text):
     new_pos = start + len(text)
 
     old = cursor.selection().toPlainText()
-    diff = difflib.SequenceMatcher(None, old, text).get_opcodes()
-
-    # make a list of edits
-    edits = sorted(
-        ((start + i1, start + i2, text[j1:j2])
-         for tag, i1, i2, j1, j2 in diff
-         if tag != 'equal'),
-        reverse = True)
 
-    # perform the edits
+    # perform the edits (they are sorted from the end to the start)
     with cursortools.compress_undo(cursor):
-        for pos, end, text in edits:
-            cursor.setPosition(pos)
-            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        for pos, end, text in textdiff.edits(old, text):
+            cursor.setPosition(start + pos)
+            cursor.setPosition(start + end, QTextCursor.MoveMode.KeepAnchor)
             cursor.insertText(text)
     cursor.setPosition(new_pos)
 
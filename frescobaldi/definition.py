@@ -26,30 +26,32 @@ from PyQt6.QtCore import QUrl
 from PyQt6.QtGui import QTextCursor
 
 import app
-import documentinfo
-import ly.music.items
+import symbolindex
+import tokeniter
+import ly.lex.lilypond
 import browseriface
 
 
-def refnode(cursor):
-    """Return the music item at the cursor if that probably is a reference to a definition elsewhere."""
-    node = documentinfo.music(cursor.document()).node(cursor.position())
-    if (node and node.end_position() >= cursor.selectionEnd()
-        and isinstance(node, (
-                ly.music.items.UserCommand,
-                ly.music.items.MarkupUserCommand,
-        ))):
-        return node
+def reference(cursor):
+    """Return the token at the cursor if that probably is a reference to a definition elsewhere."""
+    block = cursor.document().findBlock(cursor.position())
+    pos = cursor.position() - block.position()
+    for t in tokeniter.tokens(block):
+        if t.pos <= pos <= t.end:
+            if (isinstance(t, (
+                    ly.lex.lilypond.UserCommand,
+                    ly.lex.lilypond.MarkupUserCommand,
+                )) and block.position() + t.end >= cursor.selectionEnd()):
+                return t
+        elif t.pos > pos:
+            break
 
 
-def target(node):
-    """Return the target node (where the node is defined)."""
-    value = node.value()
-    if value:
-        target = value.parent()
-        if isinstance(target, ly.music.items.Document):
-            target = value # happens with #(define-markup-command ...)
-        return target
+def target(cursor, token):
+    """Return the symbolindex.Definition of the token at the cursor, or None."""
+    block = cursor.document().findBlock(cursor.position())
+    return symbolindex.find_definition(
+        cursor.document(), token[1:], block.position() + token.pos)
 
 
 def goto_definition(mainwindow, cursor=None):
@@ -60,27 +62,21 @@ def goto_definition(mainwindow, cursor=None):
     """
     if cursor is None:
         cursor = mainwindow.textCursor()
-    node = refnode(cursor)
-    if node:
-        t = target(node)
+    token = reference(cursor)
+    if token:
+        t = target(cursor, token)
         if t:
             goto_target(mainwindow, t)
             return True
 
 
 def goto_target(mainwindow, target):
-    """Switch to the document and location where the node target is."""
-    lydoc = target.document
-    try:
-        # this succeeds if this is a document that is currently open
-        doc = lydoc.document
-    except AttributeError:
+    """Switch to the document and location of the symbolindex.Definition."""
+    doc = target.document
+    if doc is None:
         # it is an included file, just load it
-        filename = target.document.filename
-        doc = app.openUrl(QUrl.fromLocalFile(filename))
+        doc = app.openUrl(QUrl.fromLocalFile(target.filename))
     cursor = QTextCursor(doc)
     cursor.setPosition(target.position)
     browseriface.get(mainwindow).setTextCursor(cursor)
     mainwindow.currentView().centerCursor()
-
-
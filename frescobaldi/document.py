@@ -35,16 +35,38 @@ document to a job.lilypond.LilyPondJob without implicitly creating a tab.
 
 import os
 
-from PyQt6.QtCore import QUrl
+from PyQt6.QtCore import QTimer, QUrl
 from PyQt6.QtGui import QTextCursor, QTextDocument
 from PyQt6.QtWidgets import QPlainTextDocumentLayout
 
 import app
+import textdiff
 import util
 import variables
 import signals
 
 
+def line_edits(old, new):
+    """Return a list of (start, end, text) edits that change old into new.
+
+    The texts are compared line by line. Every edit replaces the range
+    start:end of the document (in QTextDocument positions, i.e. UTF-16 code
+    units) with text. The edits are returned from the end of the document
+    to the start, so they can be applied in that order.
+
+    """
+    old_lines = old.splitlines(True)
+    new_lines = new.splitlines(True)
+    matcher = textdiff.LineMatcher(old_lines, new_lines)
+    positions = [0]
+    for line in old_lines:
+        length = len(line) if line.isascii() else len(line.encode('utf-16-le')) // 2
+        positions.append(positions[-1] + length)
+    return [(positions[i1], positions[i2], ''.join(new_lines[j1:j2]))
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes())
+        if tag != 'equal']
+
+
 class AbstractDocument(QTextDocument):
     """Base class for a Frescobaldi document. Not intended to be instantiated.
 
@@ -119,7 +141,8 @@ class AbstractDocument(QTextDocument):
         If loading succeeds and an url was specified, the url is made the
         current url (by calling setUrl() internally).
 
-        If keepUndo is True, the loading can be undone (with Ctrl-Z).
+        If keepUndo is True, the loading can be undone (with Ctrl-Z). In that
+        case only the lines that changed are replaced, in one undo step.
 
         """
         if url is None:
@@ -127,9 +150,22 @@ class AbstractDocument(QTextDocument):
         u = url if not url.isEmpty() else self.url()
         text = self.load_data(u, encoding or self._encoding)
         if keepUndo:
+            # only change the lines that differ, so that the tokens, cursors
+            # etc. of the unchanged blocks are kept
+            # every edit is made in its own edit block, joined to the
+            # previous one: this creates a single undo step, while the
+            # contentsChange signal is emitted for every edit separately
             c = QTextCursor(self)
-            c.select(QTextCursor.SelectionType.Document)
-            c.insertText(text)
+            edits = line_edits(self.toPlainText(), text)
+            for i, (start, end, replacement) in enumerate(edits):
+                if i:
+                    c.joinPreviousEditBlock()
+                else:
+                    c.beginEditBlock()
+                c.setPosition(start)
+                c.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+                c.insertText(replacement)
+                c.endEditBlock()
         else:
             self.setPlainText(text)
         self.setModified(False)
@@ -249,7 +285,28 @@ class EditorDocument(AbstractDocument):
             app.documentLoaded(d)
         return d
 
+    @classmethod
+    def new_deferred(cls, url, encoding=None):
+        """Create and return a new document for url, without loading it yet.
+
+        The contents are loaded by ensureLoaded(), which is called when the
+        document is displayed in a View or when its text or blocks are
+        requested. This makes restoring a session with many documents fast.
+
+        Raises OSError if the url is not an existing local file.
+
+        """
+        filename = url.toLocalFile()
+        if not filename:
+            raise OSError("not a local file")
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(filename)
+        d = cls(url, encoding)
+        d._deferred = True
+        return d
+
     def __init__(self, url=None, encoding=None):
+        self._deferred = False
         super().__init__(url, encoding)
         self.modificationChanged.connect(self.slotModificationChanged)
         app.documents.append(self)
@@ -264,10 +321,83 @@ class EditorDocument(AbstractDocument):
         app.documents.remove(self)
 
     def load(self, url=None, encoding=None, keepUndo=False):
+        self._deferred = False
         super().load(url, encoding, keepUndo)
         self.loaded()
         app.documentLoaded(self)
 
+    def isLoaded(self):
+        """Return False if the contents have not been loaded yet.
+
+        This is only the case for documents created with new_deferred().
+
+        """
+        return not self._deferred
+
+    def ensureLoaded(self):
+        """Load the contents if that was deferred by new_deferred().
+
+        This is mostly called when some code needs the contents, possibly
+        while a DocumentPlugin is being created. So the loaded() and
+        documentLoaded() signals are emitted later, from the event loop.
+
+        If loading fails, the document remains empty.
+
+        """
+        if self._deferred:
+            self._deferred = False
+            try:
+                super().load()
+            except OSError:
+                return
+            QTimer.singleShot(0, self._deferredLoaded)
+
+    def _deferredLoaded(self):
+        """(internal) Emit the signals for a deferred load."""
+        if self in app.documents:
+            self.loaded()
+            app.documentLoaded(self)
+
+    def toPlainText(self):
+        self.ensureLoaded()
+        return super().toPlainText()
+
+    def isEmpty(self):
+        self.ensureLoaded()
+        return super().isEmpty()
+
+    def characterCount(self):
+        self.ensureLoaded()
+        return super().characterCount()
+
+    def blockCount(self):
+        self.ensureLoaded()
+        return super().blockCount()
+
+    def begin(self):
+        self.ensureLoaded()
+        return super().begin()
+
+    def firstBlock(self):
+        self.ensureLoaded()
+        return super().firstBlock()
+
+    def lastBlock(self):
+        self.ensureLoaded()
+        return super().lastBlock()
+
+    def findBlock(self, position):
+        self.ensureLoaded()
+        return super().findBlock(position)
+
+    def findBlockByNumber(self, blockNumber):
+        self.ensureLoaded()
+        return super().findBlockByNumber(blockNumber)
+
+    def findBlockByLineNumber(self, lineNumber):
+        self.ensureLoaded()
+        return super().findBlockByLineNumber(lineNumber)
+
     def save(self, url=None, encoding=None):
         url, filename = super().save(url, encoding)
         with self.saving(), app.documentSaving(self):
@@ -29,8 +29,8 @@ from PyQt6.QtCore import QSettings
 import app
 import plugin
 
-import lydocument
-import ly.document
+import tokeniter
+import ly.lex
 
 # default outline patterns that are ignored in comments
 default_outline_patterns = [
@@ -108,50 +108,132 @@ def create_outline_re(comments):
     return re.compile(rx, re.MULTILINE | re.UNICODE)
 
 
+class OutlineMatch:
+    """A match of an outline pattern in a single block.
+
+    Behaves like a regular expression match object, but the positions
+    are relative to the document instead of the block.
+
+    """
+    __slots__ = ('_match', '_offset')
+
+    def __init__(self, match, offset):
+        self._match = match
+        self._offset = offset
+
+    def start(self, group=0):
+        return self._offset + self._match.start(group)
+
+    def end(self, group=0):
+        return self._offset + self._match.end(group)
+
+    def span(self, group=0):
+        return self.start(group), self.end(group)
+
+    def group(self, *groups):
+        return self._match.group(*groups)
+
+    def groupdict(self, default=None):
+        return self._match.groupdict(default)
+
+
 class DocumentStructure(plugin.DocumentPlugin):
+    """Maintains the outline of a Document.
+
+    The outline patterns are matched per block (line), and the matches
+    are cached per block. When the document changes, only the blocks that
+    were touched by the change, and the blocks whose lexer state at the
+    start changed (e.g. because a block comment was opened above them),
+    are searched again.
+
+    """
     def __init__(self, document):
         self._outline = None
+        self._blocks = None     # per block: (start state, matches) or None
+        document.contentsChange.connect(self.slotContentsChange)
+        app.settingsChanged.connect(self.invalidate, -999)
 
     def invalidate(self):
-        """Called when the document changes or the settings are changed."""
+        """Called when the settings are changed."""
         self._outline = None
-        app.settingsChanged.disconnect(self.invalidate)
-        self.document().contentsChanged.disconnect(self.invalidate)
+        self._blocks = None
+
+    def slotContentsChange(self, position, removed, added):
+        """Called when the document changes; forgets the touched blocks."""
+        self._outline = None
+        blocks = self._blocks
+        if blocks is None:
+            return
+        doc = self.document()
+        first = doc.findBlock(position)
+        last = doc.findBlock(position + added)
+        if not first.isValid():
+            first = doc.lastBlock()
+        if not last.isValid():
+            last = doc.lastBlock()
+        first, last = first.blockNumber(), last.blockNumber()
+        old_last = last - (doc.blockCount() - len(blocks))
+        if old_last < first - 1:
+            self._blocks = None
+        else:
+            blocks[first:old_last+1] = [None] * (last - first + 1)
 
     def outline(self):
         """Return the document outline as a series of match objects."""
         if self._outline is None:
-            # match patterns excluding comments
-            active_code = self.remove_comments()
-            outline_list = list(outline_re(False).finditer(active_code))
-            # match patterns including comments
-            outline_list_comments = list(outline_re(True).finditer(self.document().toPlainText()))
-            # merge lists and sort by start position
-            self._outline = outline_list + outline_list_comments
-            self._outline.sort(key=lambda match: match.start())
-            self.document().contentsChanged.connect(self.invalidate)
-            app.settingsChanged.connect(self.invalidate, -999)
+            doc = self.document()
+            blocks = self._blocks
+            if blocks is None or len(blocks) != doc.blockCount():
+                blocks = self._blocks = [None] * doc.blockCount()
+            outline = self._outline = []
+            block = doc.firstBlock()
+            state = 0
+            while block.isValid():
+                n = block.blockNumber()
+                entry = blocks[n]
+                if entry is None or entry[0] != state:
+                    entry = blocks[n] = (state, self.block_outline(block))
+                if entry[1]:
+                    offset = block.position()
+                    outline.extend(OutlineMatch(m, offset) for m in entry[1])
+                state = block.userState()
+                block = block.next()
         return self._outline
 
-    def remove_comments(self):
-        """Remove Lilypond comments from text"""
-        def whiteout_section(cursor, start, end):
-            spaces = ''.join(' ' for x in range(start, end))
-            with cursor.document as doc:
-                doc[start:end] = spaces
-
-        doc = ly.document.Document(self.document().toPlainText())
-        cursor = lydocument.Cursor(doc)
-        source = ly.document.Source(cursor, True, tokens_with_position=True)
-        start = 0
-        for token in source:
-            if isinstance(token, ly.lex.BlockCommentStart):
-                start = token.pos
-            elif isinstance(token, ly.lex.BlockCommentEnd):
-                if start:
-                    whiteout_section(cursor, start, token.end)
-                    start = 0
-            elif isinstance(token, ly.lex.Comment):
-                whiteout_section(cursor, token.pos, token.end)
-        return cursor.document.plaintext()
-
+    def block_outline(self, block):
+        """Return the matches of the outline patterns in the block.
+
+        The returned tuple contains regular expression match objects, with
+        positions relative to the start of the block.
+
+        """
+        text = block.text()
+        code = self.remove_block_comments(block, text)
+        matches = list(outline_re(False).finditer(code))
+        matches.extend(outline_re(True).finditer(text))
+        matches.sort(key=lambda match: match.start())
+        return tuple(matches)
+
+    def remove_block_comments(self, block, text):
+        """Return the text of the block with comments replaced by spaces."""
+        return mask_comments(text, tokeniter.tokens(block))
+
+
+def mask_comments(text, tokens):
+    """Return text with all comment tokens replaced by spaces.
+
+    The tokens must be the tokens of text, e.g. returned by
+    tokeniter.tokens() for a block.
+
+    """
+    parts = []
+    pos = 0
+    for token in tokens:
+        if isinstance(token, ly.lex.Comment):
+            parts.append(text[pos:token.pos])
+            parts.append(' ' * len(token))
+            pos = token.end
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return ''.join(parts)
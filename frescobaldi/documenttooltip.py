@@ -35,7 +35,6 @@ import tokeniter
 import highlighter
 import textformats
 import gadgets.customtooltip
-import ly.lex.lilypond
 
 
 def pixmap(cursor, num_lines=6, scale=0.8):
@@ -115,16 +114,10 @@ def get_definition(cursor):
     Returns None if no variable name can be found.
 
     """
+    import symbolindex
     block = cursor.block()
-    while block.isValid():
-        state = tokeniter.state(block)
-        if isinstance(state.parser(), ly.lex.lilypond.ParseGlobal):
-            for t in tokeniter.tokens(block)[:2]:
-                if type(t) is ly.lex.lilypond.Name:
-                    return t[:]
-                elif isinstance(t, ly.lex.lilypond.Keyword) and t == '\\score':
-                    return '\\score'
-        block = block.previous()
+    return symbolindex.definition_at(
+        cursor.document(), block.position() + block.length() - 1)
 
 
 def time_position(cursor):
@@ -133,8 +126,8 @@ def time_position(cursor):
     Format the value as "5/1" etc.
 
     """
-    import documentinfo
-    pos = documentinfo.music(cursor.document()).time_position(cursor.position())
+    import timeindex
+    pos = timeindex.time_position(cursor.document(), cursor.position())
     if pos is not None:
         import ly.duration
         return ly.duration.format_fraction(pos)
@@ -256,6 +256,8 @@ class Engraver(plugin.MainWindowPlugin):
         if rjob and rjob.is_running():
             rjob.abort()
         job.manager.manager(document).start_job(j)
+        # the job may wait in the queue, it can be aborted already
+        self.updateActions()
 
     def stickyToggled(self):
         """Called when the user toggles the 'Sticky' action."""
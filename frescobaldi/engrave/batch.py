@@ -0,0 +1,168 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Engraves documents from the command line, without a user interface.
+
+The same LilyPond jobs are created as when engraving from the editor, so
+the LilyPond version, include path, session settings and -d options are
+chosen in the same way. The jobs are run in parallel by a JobQueue; their
+output is written to stderr, prefixed with the name of the file, and a
+report is written to stdout when all jobs have finished.
+"""
+
+
+import os
+import sys
+import time
+
+from PyQt6.QtCore import QUrl
+
+import app
+import job
+import job.lilypond
+import job.queue
+
+
+def run(filenames, session=None, jobs=0, encoding=None):
+    """Engraves the files and returns the exit status.
+
+    If session is given, the named session is made current, so that its
+    include path is used. If no filenames are given, the documents of the
+    session are engraved. jobs is the number of files to engrave at the
+    same time, by default the number set in the Preferences is used.
+
+    Returns 0 if all files were engraved successfully, 1 if a job failed
+    and 2 if the arguments were not valid.
+
+    """
+    import sessions
+    if session and session != "-":
+        if session not in sessions.sessionNames():
+            _error(_("Unknown session: {name}").format(name=session))
+            return 2
+        sessions.setCurrentSession(session)
+        if not filenames:
+            import qsettings
+            urls = qsettings.get_url_list(sessions.sessionGroup(session), "urls")
+            filenames = [url.toLocalFile() for url in urls if url.isLocalFile()]
+    if not filenames:
+        _error(_("No files to engrave."))
+        return 2
+
+    docs = []
+    for filename in filenames:
+        doc = load(filename, encoding)
+        if doc is None:
+            return 2
+        if all(doc.url() != d.url() for d in docs):
+            docs.append(doc)
+
+    queue = job.queue.JobQueue(
+        queue_mode=job.queue.QueueMode.SINGLE,
+        num_runners=jobs or job.queue.num_runners_setting())
+    engrave_jobs = []
+    writers = []    # the signals keep no reference to the writers
+    for doc in docs:
+        j = job.lilypond.PublishJob(doc)
+        writer = LogWriter(os.path.basename(j.filename()))
+        j.output.connect(writer.write)
+        writers.append(writer)
+        engrave_jobs.append(j)
+        queue.add_job(j)
+    queue.finished.connect(lambda: app.qApp.quit())
+    start = time.time()
+    queue.start()
+    if queue.is_running():
+        app.qApp.exec()
+    return report(engrave_jobs, time.time() - start)
+
+
+def load(filename, encoding=None):
+    """Returns a Document for the file, or None if it could not be loaded.
+
+    If the document sets the master variable, the master document is
+    returned instead, just like when engraving from the editor.
+
+    """
+    import document
+    import variables
+    url = QUrl.fromLocalFile(os.path.abspath(filename))
+    try:
+        doc = document.Document.new_from_url(url, encoding)
+        master = variables.get(doc, "master")
+        if master:
+            doc = document.Document.new_from_url(url.resolved(QUrl(master)), encoding)
+    except OSError as e:
+        _error(_("Can't load {filename}: {error}").format(
+            filename=url.toLocalFile(), error=e.strerror or e))
+        return None
+    return doc
+
+
+def report(jobs, elapsed):
+    """Writes a report of the finished jobs to stdout and returns the exit status."""
+    failed = 0
+    for j in jobs:
+        if j.success:
+            status = _("done")
+        else:
+            failed += 1
+            status = _("failed")
+        sys.stdout.write("{0:8} {1:>8}  {2}\n".format(
+            status, job.Job.elapsed2str(j.elapsed_time()), j.filename()))
+    sys.stdout.write(_("Engraved {succeeded} of {total} files in {time} "
+                       "({jobtime} job time).").format(
+        succeeded=len(jobs) - failed,
+        total=len(jobs),
+        time=job.Job.elapsed2str(elapsed),
+        jobtime=job.Job.elapsed2str(sum(j.elapsed_time() for j in jobs))) + '\n')
+    sys.stdout.flush()
+    return 1 if failed else 0
+
+
+def _error(message):
+    sys.stderr.write(message + '\n')
+
+
+class LogWriter:
+    """Writes the output of a Job to stderr, prefixing every line.
+
+    Output of jobs that run in parallel is only written in complete lines,
+    so the lines of different jobs do not get mixed up.
+
+    """
+    def __init__(self, name):
+        self._prefix = f"[{name}] "
+        self._partial = ""
+
+    def write(self, message, type):
+        if type & job.OUTPUT:
+            text = self._partial + message
+            end = text.rfind('\n') + 1
+            self._partial = text[end:]
+            lines = text[:end].splitlines()
+        else:
+            # status messages are written as separate lines
+            lines = [self._partial] if self._partial else []
+            self._partial = ""
+            lines.extend(message.strip('\n').splitlines())
+        if lines:
+            sys.stderr.write(''.join(self._prefix + line + '\n' for line in lines))
+            sys.stderr.flush()
@@ -22,6 +22,8 @@ Utilities to run external commands.
 """
 
 
+from PyQt6.QtWidgets import QProgressBar, QVBoxLayout, QWidget
+
 import app
 import log
 import widgets.dialog
@@ -35,7 +37,11 @@ class ExternalCommandDialog(widgets.dialog.Dialog):
     method is called.
 
     You need to create a Job instance with the command, and call the run_job()
-    method to start it. The output is displayed in the dialog.
+    method to start it. The output is displayed in the dialog. To run several
+    commands at the same time, call run_jobs() with a list of Job instances.
+
+    A progress bar shows how many of the jobs have finished; while a single
+    job runs, it shows that the command is busy.
 
     When the user cancels the dialog while the command is running, cleanup() is
     called with the 'aborted' argument. When the user closes the dialog after
@@ -48,30 +54,75 @@ class ExternalCommandDialog(widgets.dialog.Dialog):
     """
     def __init__(self, parent=None):
         super().__init__(parent)
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
         self.log = log.Log(self)
-        self.setMainWidget(self.log)
+        self.progress = QProgressBar()
+        layout.addWidget(self.log)
+        layout.addWidget(self.progress)
+        self.setMainWidget(widget)
         self.finished.connect(self._closed)
 
     def run_job(self, job):
         """Run a job.Job()."""
+        self._start([job])
+        app.job_queue().add_job(job, 'generic')
+
+    def run_jobs(self, jobs):
+        """Run a list of job.Job() instances.
+
+        The jobs are run in parallel, by as many runners as set in the
+        Preferences. The output of all jobs is displayed in the dialog, and
+        the dialog shows how many of the jobs have finished. When the dialog
+        is cancelled, the jobs that have not started yet are not run at all.
+
+        """
+        import job.queue
+        self._start(jobs)
+        self.queue = job.queue.JobQueue(
+            queue_mode=job.queue.QueueMode.SINGLE,
+            num_runners=job.queue.num_runners_setting())
+        for j in self.jobs:
+            self.queue.add_job(j)
+        self.queue.start()
+
+    def _start(self, jobs):
+        """(internal) Prepare the dialog for running the jobs."""
+        self.jobs = list(jobs)
+        self.job = self.jobs[0]
+        self.queue = None
+        self._finished = 0
+        # a single job shows a busy indicator
+        self.progress.setRange(0, len(self.jobs) if len(self.jobs) > 1 else 0)
+        self.progress.setValue(0)
         self.setMessage(_("Please wait until the command finishes."))
         self.setStandardButtons(('cancel',))
-        self.job = job
-        self.log.connectJob(job)
-        job.done.connect(self._done)
-        app.job_queue().add_job(job, 'generic')
+        for j in self.jobs:
+            self.log.connectJob(j)
+            j.done.connect(self._done)
 
     def _done(self):
-        """(internal) Called when the job has finished."""
+        """(internal) Called when a job has finished."""
+        self._finished += 1
+        self.progress.setRange(0, len(self.jobs))
+        self.progress.setValue(self._finished)
+        if self._finished < len(self.jobs):
+            self.setMessage(_("Finished {count} of {total} commands.").format(
+                count=self._finished, total=len(self.jobs)))
+            return
         self.setMessage(_("Command completed"))
         self.setStandardButtons(('ok',))
 
     def _closed(self):
         """(internal) Called when the user closes the dialog, calls cleanup()."""
-        if self.job.success is None:
-            self.job.abort()
+        if any(j.success is None for j in self.jobs):
+            if self.queue and self.queue.is_running():
+                self.queue.abort()
+            else:
+                self.job.abort()
             state = "aborted"
-        elif self.job.success:
+        elif all(j.success for j in self.jobs):
             state = "success"
         else:
             state = "failure"
@@ -36,7 +36,6 @@ import documentinfo
 import plugin
 import tokeniter
 import appinfo
-import codecs
 import job
 import qutil
 import resultfiles
@@ -48,7 +47,10 @@ class FileExport(plugin.MainWindowPlugin):
         ac = self.actionCollection = Actions()
         actioncollectionmanager.manager(mainwindow).addActionCollection(ac)
         ac.export_musicxml.triggered.connect(self.exportMusicXML)
+        ac.export_session_musicxml.triggered.connect(self.exportSessionMusicXML)
         ac.export_audio.triggered.connect(self.exportAudio)
+        ac.export_all_audio.triggered.connect(self.exportAllAudio)
+        ac.export_session_audio.triggered.connect(self.exportSessionAudio)
 
     def exportMusicXML(self):
         """ Convert the current document to MusicXML """
@@ -60,19 +62,56 @@ class FileExport(plugin.MainWindowPlugin):
         filename = QFileDialog.getSaveFileName(self.mainwindow(), caption, filename, filetypes)[0]
         if not filename:
             return False # cancelled
-        import ly.musicxml
-        writer = ly.musicxml.writer()
-        writer.parse_text(doc.toPlainText(), orgname)
-        xml = writer.musicxml()
-        # put the Frescobaldi version in the xml file
-        software = xml.root.find('.//encoding/software')
-        software.text = f"{appinfo.appname} {appinfo.version}"
-        try:
-            xml.write(filename)
-        except OSError as err:
-            QMessageBox.warning(self.mainwindow(), app.caption(_("Error")),
-                _("Can't write to destination:\n\n{url}\n\n{error}").format(
-                    url=filename, error=err.strerror))
+        self._exportMusicXML(caption, [(doc, filename)])
+
+    def exportSessionMusicXML(self):
+        """ Convert all documents of the session to MusicXML in a directory """
+        docs = [doc for doc in app.documents if not doc.isEmpty()]
+        if not docs:
+            return False
+        doc = self.mainwindow().currentDocument()
+        directory = os.path.dirname(doc.url().toLocalFile())
+        caption = app.caption(_("dialog title", "Export Session as MusicXML"))
+        directory = QFileDialog.getExistingDirectory(self.mainwindow(), caption, directory)
+        if not directory:
+            return False # cancelled
+        exports = []
+        names = set()
+        for doc in docs:
+            name = os.path.splitext(doc.documentName())[0]
+            filename, count = name, 1
+            while filename in names:
+                count += 1
+                filename = f"{name}-{count}"
+            names.add(filename)
+            exports.append((doc, os.path.join(directory, filename + '.xml')))
+        self._exportMusicXML(caption, exports)
+
+    def _exportMusicXML(self, caption, exports):
+        """Convert documents to MusicXML.
+
+        exports is a list of (document, filename) tuples. Normally the
+        conversions run in the background, shown in a MusicXMLExportDialog.
+        If the 'ly' command can't be found, they are done right here.
+
+        """
+        from . import musicxml
+        if musicxml.ly_command():
+            dlg = MusicXMLExportDialog(self.mainwindow(), caption)
+            dlg.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose) # we use it only once
+            dlg.export(exports)
+            dlg.show()
+            return
+        software = f"{appinfo.appname} {appinfo.version}"
+        for doc, filename in exports:
+            try:
+                musicxml.write(doc.toPlainText(), doc.url().toLocalFile(),
+                               filename, software)
+            except OSError as err:
+                QMessageBox.warning(self.mainwindow(), app.caption(_("Error")),
+                    _("Can't write to destination:\n\n{url}\n\n{error}").format(
+                        url=filename, error=err.strerror))
+                return
 
     def exportAudio(self):
         """ Convert the current document to Audio """
@@ -96,6 +135,77 @@ class FileExport(plugin.MainWindowPlugin):
         dlg.midi2wav(midifile, wavfile)
         dlg.show()
 
+    def exportAllAudio(self):
+        """ Convert all MIDI files of the current document to Audio """
+        self._exportAudioFiles([self.mainwindow().currentDocument()])
+
+    def exportSessionAudio(self):
+        """ Convert all MIDI files of all documents of the session to Audio """
+        self._exportAudioFiles(app.documents)
+
+    def _exportAudioFiles(self, documents):
+        """Convert the MIDI files of the documents to WAV files next to them.
+
+        WAV files that are newer than their MIDI file are not created again.
+        The conversions run in parallel.
+
+        """
+        midfiles = []
+        for doc in documents:
+            for midfile in resultfiles.results(doc).files('.mid*'):
+                if midfile not in midfiles:
+                    midfiles.append(midfile)
+        if not midfiles:
+            QMessageBox.critical(None, _("Error"),
+                    _("The audio file couldn't be created. Please create midi file first"))
+            return False
+        conversions = []
+        for midfile in midfiles:
+            wavfile = os.path.splitext(midfile)[0] + '.wav'
+            try:
+                if os.path.getmtime(wavfile) > os.path.getmtime(midfile):
+                    continue
+            except OSError:
+                pass
+            conversions.append((midfile, wavfile))
+        if not conversions:
+            QMessageBox.information(self.mainwindow(), app.caption(_("Export Audio")),
+                _("All audio files are up to date."))
+            return False
+        caption = app.caption(_("dialog title", "Export Audio Files"))
+        dlg = AudioExportDialog(self.mainwindow(), caption)
+        dlg.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose) # we use it only once
+        dlg.midis2wav(conversions)
+        dlg.show()
+
+
+class MusicXMLExportDialog(externalcommand.ExternalCommandDialog):
+
+    """Dialog to show the progress of the MusicXML conversion.
+
+    The conversion runs in a separate process, so the user can keep working
+    and cancel the export at any time.
+
+    """
+
+    def __init__(self, parent, caption):
+        super().__init__(parent)
+        self.setWindowModality(Qt.WindowModality.NonModal)
+        self.setWindowTitle(caption)
+        qutil.saveDialogSize(self, "musicxml_export/dialog/size", QSize(640, 400))
+
+    def export(self, exports):
+        """Convert documents to MusicXML.
+
+        exports is a list of (document, filename) tuples. The documents are
+        converted in parallel.
+
+        """
+        from . import musicxml
+        self.run_jobs([musicxml.MusicXMLJob(doc.toPlainText(), filename,
+                                            doc.url().toLocalFile())
+                       for doc, filename in exports])
+
 
 class AudioExportDialog(externalcommand.ExternalCommandDialog):
 
@@ -106,35 +216,72 @@ class AudioExportDialog(externalcommand.ExternalCommandDialog):
         self.setWindowModality(Qt.WindowModality.NonModal)
         self.setWindowTitle(caption)
         qutil.saveDialogSize(self, "audio_export/dialog/size", QSize(640, 400))
+        self.wavfiles = {}
 
     def midi2wav(self, midfile, wavfile):
         """Run timidity to convert the MIDI to WAV."""
-        self.wavfile = wavfile # we could need to clean it up...
-        j = job.Job()
-        j.decoder_stdout = j.decoder_stderr = codecs.getdecoder('utf-8')
+        j = job.Job(encoding='utf-8')
         j.command = ["timidity", midfile, "-Ow", "-o", wavfile]
+        self.wavfiles[j] = wavfile # we could need to clean it up...
         self.run_job(j)
 
+    def midis2wav(self, conversions):
+        """Run timidity to convert MIDI files to WAV files in parallel.
+
+        conversions is a list of (midfile, wavfile) tuples.
+
+        """
+        jobs = []
+        for midfile, wavfile in conversions:
+            j = job.Job(encoding='utf-8')
+            j.command = ["timidity", midfile, "-Ow", "-o", wavfile]
+            j.set_title(os.path.basename(wavfile))
+            self.wavfiles[j] = wavfile
+            jobs.append(j)
+        self.run_jobs(jobs)
+
     def cleanup(self, state):
         if state == "aborted":
-            try:
-                os.remove(self.wavfile)
-            except OSError:
-                pass
+            # only remove the files of the conversions that were not
+            # finished (successfully)
+            for j, wavfile in self.wavfiles.items():
+                if j.start_time() and not j.success:
+                    try:
+                        os.remove(wavfile)
+                    except OSError:
+                        pass
 
 
 class Actions(actioncollection.ActionCollection):
     name = "file_export"
     def createActions(self, parent):
         self.export_musicxml = QAction(parent)
+        self.export_session_musicxml = QAction(parent)
         self.export_audio = QAction(parent)
+        self.export_all_audio = QAction(parent)
+        self.export_session_audio = QAction(parent)
 
         self.export_musicxml.setIcon(icons.get("document-export"))
+        self.export_session_musicxml.setIcon(icons.get("document-export"))
         self.export_audio.setIcon(icons.get("document-export"))
+        self.export_all_audio.setIcon(icons.get("document-export"))
+        self.export_session_audio.setIcon(icons.get("document-export"))
 
     def translateUI(self):
         self.export_musicxml.setText(_("Export Music&XML..."))
         self.export_musicxml.setToolTip(_("Export current document as MusicXML."))
 
+        self.export_session_musicxml.setText(_("Export Session as MusicXML..."))
+        self.export_session_musicxml.setToolTip(_(
+            "Export all open documents as MusicXML files to a directory."))
+
         self.export_audio.setText(_("Export Audio..."))
         self.export_audio.setToolTip(_("Export to different audio formats."))
+
+        self.export_all_audio.setText(_("Export Audio of All MIDI Files"))
+        self.export_all_audio.setToolTip(_(
+            "Export all MIDI files of the current document as WAV files."))
+
+        self.export_session_audio.setText(_("Export Audio of Session"))
+        self.export_session_audio.setToolTip(_(
+            "Export all MIDI files of all open documents as WAV files."))
@@ -0,0 +1,152 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Converts LilyPond text to MusicXML in a separate process.
+
+The conversion by ly.musicxml can take a long time for large documents, so
+it is not done in the GUI process. Instead, a MusicXMLJob runs the musicxml
+command of the 'ly' command line tool of python-ly.
+
+The text is written to a temporary file when the job is started and removed
+when the job is done, so jobs that are still waiting in a queue have no
+files. The temporary file is created in the directory of the document, so
+that relative \\include files are found as they would be by LilyPond.
+The MusicXML file is first written to a temporary file next to the
+destination and then renamed, so an aborted conversion leaves no partial
+file behind.
+
+A frozen build may lack the 'ly' command; in that case ly_command() returns
+None and write() can be used to convert the text in the GUI process.
+"""
+
+
+import os
+import shutil
+import sys
+import tempfile
+
+import job
+
+
+def ly_command():
+    """Return the command (a list) that runs the python-ly command line tool.
+
+    Normally the entry point of python-ly is run with the current Python
+    interpreter, so the same ly package is used as by Frescobaldi. In a
+    frozen build sys.executable is Frescobaldi itself, and the 'ly' command
+    that comes with python-ly is used instead. Returns None if that command
+    can't be found.
+
+    """
+    if getattr(sys, 'frozen', False):
+        ly = shutil.which('ly')
+        return [ly] if ly else None
+    return [sys.executable, '-c',
+            'import sys, ly.cli.main; sys.exit(ly.cli.main.main())']
+
+
+def write(text, filename, xmlfile, software=None):
+    """Convert text to MusicXML in the current process and write xmlfile.
+
+    filename is the name of the document, used to resolve \\include files.
+    If software is given, it is put in the encoding section of the MusicXML.
+    Raises OSError if xmlfile can't be written.
+
+    """
+    import ly.musicxml
+    writer = ly.musicxml.writer()
+    writer.parse_text(text, filename)
+    xml = writer.musicxml()
+    if software:
+        xml.root.find('.//encoding/software').text = software
+    xml.write(xmlfile)
+
+
+def _temp_directory(filename):
+    """Return the directory to create the temporary .ly file in.
+
+    This is the directory of the document filename, so that relative includes
+    are resolved, or the system temporary directory if there is no filename
+    or its directory is not writable.
+
+    """
+    directory = os.path.dirname(filename) if filename else None
+    if directory and os.access(directory, os.W_OK):
+        return directory
+    return tempfile.gettempdir()
+
+
+def _remove(filename):
+    """Remove a file, ignoring errors."""
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+class MusicXMLJob(job.Job):
+    """A Job converting LilyPond text to the MusicXML file xmlfile.
+
+    filename is the name of the document the text comes from, if any; it is
+    used to resolve \\include files.
+
+    """
+
+    def __init__(self, text, xmlfile, filename=None):
+        super().__init__(encoding='utf-8')
+        self._text = text
+        self._xmlfile = xmlfile
+        self._filename = filename
+        self._textfile = None
+        self.environment['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+        self.environment['PYTHONIOENCODING'] = 'utf-8'
+        self.set_title(os.path.basename(xmlfile))
+
+    def xmlfile(self):
+        """Return the name of the MusicXML file that is written."""
+        return self._xmlfile
+
+    def start(self):
+        """Write the text to a temporary file and start the conversion."""
+        fd, self._textfile = tempfile.mkstemp('.ly', '.frescobaldi-musicxml-',
+                                              _temp_directory(self._filename))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self._text)
+        self.command = ly_command() + [
+            '-e', 'utf-8', '-d', 'rel-absolute=false',
+            'musicxml', '-o', self._xmlfile + '.part', self._textfile]
+        super().start()
+
+    def _bye(self, success):
+        """(internal) Remove the temporary files and put the result in place."""
+        if self._textfile:
+            _remove(self._textfile)
+            self._textfile = None
+        temp = self._xmlfile + '.part'
+        if success:
+            try:
+                os.replace(temp, self._xmlfile)
+            except OSError as err:
+                self.message(_("Can't write to destination:\n\n{url}\n\n{error}").format(
+                    url=self._xmlfile, error=err.strerror), job.FAILURE)
+                success = False
+        if not success:
+            _remove(temp)
+        super()._bye(success)
@@ -31,6 +31,7 @@ import ly.document
 import lydocinfo
 import ly.lex
 import filecache
+import includeresolver
 import util
 import variables
 
@@ -104,6 +105,21 @@ def textmode(text, guess=True):
         return ly.lex.guessMode(text)
 
 
+def find_include(arg, directory=None, basedir=None, include_path=()):
+    """Return the real path of the file an \\include argument refers to.
+
+    The file is searched relative to directory (the directory of the file
+    containing the \\include command), then relative to basedir (the
+    directory of the master file) and then in the include_path, using the
+    cached directory listings of the includeresolver module. Returns None if
+    the file can't be found.
+
+    """
+    path = includeresolver.find(arg, itertools.chain((directory, basedir), include_path))
+    if path:
+        return includeresolver.realpath(path)
+
+
 def includefiles(dinfo, include_path=()):
     """Returns a set of filenames that are included by the DocInfo's document.
 
@@ -120,24 +136,12 @@ def includefiles(dinfo, include_path=()):
     basedir = os.path.dirname(filename) if filename else None
     files = set()
 
-    def tryarg(directory, arg):
-        path = os.path.realpath(os.path.join(directory, arg))
-        if path not in files and os.path.isfile(path):
-            files.add(path)
-            args = docinfo(path).include_args()
-            find(args, os.path.dirname(path))
-            return True
-
     def find(incl_args, directory):
         for arg in incl_args:
-            # new, recursive, relative include
-            if not (directory and tryarg(directory, arg)):
-                # old include (relative to master file)
-                if not (basedir and tryarg(basedir, arg)):
-                    # if path is given, also search there:
-                    for p in include_path:
-                        if tryarg(p, arg):
-                            break
+            path = find_include(arg, directory, basedir, include_path)
+            if path and path not in files:
+                files.add(path)
+                find(docinfo(path).include_args(), os.path.dirname(path))
 
     find(dinfo.include_args(), basedir)
     return files
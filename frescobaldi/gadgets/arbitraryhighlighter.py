@@ -20,12 +20,16 @@
 """
 Manages highlighting of arbitrary sections in a Q(Plain)TextEdit
 using QTextEdit.ExtraSelections.
+
+Large lists of selections (e.g. many search results) are kept sorted by
+position, and only the selections near the visible part of the text are
+given to the text edit.
 """
 
 import weakref
 import operator
 
-from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtCore import QObject, QPoint, QTimer
 from PyQt6.QtGui import QTextCharFormat, QTextFormat
 from PyQt6.QtWidgets import QTextEdit
 
@@ -35,12 +39,22 @@ class ArbitraryHighlighter(QObject):
 
     Stores and highlights lists of QTextCursors on a per-format basis.
 
+    Lists longer than cullThreshold are sorted by position, and only the
+    selections within the visible area of the text edit (plus a margin
+    of one page above and below) are displayed. This assumes the
+    selections in such a list do not overlap. Set cullThreshold to 0
+    to always display all selections.
+
     """
+    cullThreshold = 200
+
     def __init__(self, edit):
         """Initializes ourselves with a Q(Plain)TextEdit as parent."""
         QObject.__init__(self, edit)
         self._selections = {}
         self._formats = {} # store the QTextFormats
+        self._range = None # the text range the culled selections cover
+        edit.verticalScrollBar().valueChanged.connect(self._scrolled)
 
     def highlight(self, format, cursors, priority=0, msec=0):
         """Highlights the selection of an arbitrary list of QTextCursors.
@@ -65,6 +79,8 @@ class ArbitraryHighlighter(QObject):
             es.cursor = cursor
             es.format = fmt
             selections.append(es)
+        if self.cullThreshold and len(selections) > self.cullThreshold:
+            selections.sort(key=lambda es: es.cursor.selectionStart())
         if msec:
             def clear(selfref=weakref.ref(self)):
                 self = selfref()
@@ -103,9 +119,43 @@ class ArbitraryHighlighter(QObject):
         textedit = self.parent()
         if textedit:
             selections = sorted(self._selections.values(), key=operator.itemgetter(0))
-            ess = sum(map(operator.itemgetter(1), selections), [])
+            self._range = None
+            ess = []
+            for priority, sels, *timer in selections:
+                if self.cullThreshold and len(sels) > self.cullThreshold:
+                    if self._range is None:
+                        self._range = self._visibleRange(textedit, True)
+                    sels = visible(sels, *self._range)
+                ess.extend(sels)
             textedit.setExtraSelections(ess)
 
+    def _scrolled(self):
+        """(Internal) Called when the text edit scrolls.
+
+        Updates the highlighting if culled selections are displayed and
+        the visible area has moved outside the range they cover.
+
+        """
+        textedit = self.parent()
+        if textedit and self._range:
+            start, end = self._visibleRange(textedit)
+            if start < self._range[0] or end > self._range[1]:
+                self.update()
+
+    def _visibleRange(self, textedit, margin=False):
+        """(Internal) Returns the (start, end) positions of the visible text.
+
+        If margin is True, the range is extended with one page above and
+        below the visible area.
+
+        """
+        viewport = textedit.viewport()
+        height = viewport.height()
+        top, bottom = (-height, 2 * height) if margin else (0, height)
+        start = textedit.cursorForPosition(QPoint(0, top)).block().position()
+        block = textedit.cursorForPosition(QPoint(viewport.width(), bottom)).block()
+        return start, block.position() + block.length()
+
     def reload(self):
         """Reloads the named formats in the highlighting (e.g. in case of settings change)."""
         for key in self._selections:
@@ -116,3 +166,26 @@ class ArbitraryHighlighter(QObject):
         self.update()
 
 
+def visible(selections, start, end):
+    """Returns the ExtraSelections that intersect with the range start-end.
+
+    The selections must be sorted and not overlap, so both the start and
+    the end positions of their cursors are in ascending order.
+
+    """
+    lo, hi = 0, len(selections)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if selections[mid].cursor.selectionEnd() < start:
+            lo = mid + 1
+        else:
+            hi = mid
+    first = lo
+    hi = len(selections)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if selections[mid].cursor.selectionStart() <= end:
+            lo = mid + 1
+        else:
+            hi = mid
+    return selections[first:lo]
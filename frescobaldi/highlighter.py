@@ -24,6 +24,7 @@ about a document's contents.
 
 
 
+from PyQt6.QtCore import QTimer
 from PyQt6.QtGui import (
     QColor, QSyntaxHighlighter, QTextBlockUserData, QTextCharFormat,
     QTextCursor, QTextDocument)
@@ -35,6 +36,7 @@ import ly.colorize
 import app
 import cursortools
 import document
+import lexcache
 import textformats
 import metainfo
 import plugin
@@ -95,6 +97,9 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
     The Highlighter automatically re-reads the highlighting settings if they
     are changed.
 
+    For large documents the lexer states and tokens are saved when the
+    document is closed, and reused when it is opened again (see lexcache).
+
     """
     def __init__(self, doc):
         QSyntaxHighlighter.__init__(self, doc)
@@ -103,6 +108,12 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
         self._initialState = None
         self._highlighting = True
         self._mode = None
+        self._cache = None
+        self._cachedMode = None
+        # Qt ignores changes until its first (delayed) full rehighlight
+        self._rehighlightPending = True
+        QTimer.singleShot(0, self._firstRehighlightDone)
+        doc.contentsChange.connect(self._contentsChange)
         self.initializeDocument()
 
     def initializeDocument(self):
@@ -118,47 +129,164 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
         doc = self.document()
         if hasattr(doc, 'url'):
             self._highlighting = metainfo.info(doc).highlighting
-            self._mode = documentinfo.mode(doc, False)
             if doc.__class__ == document.EditorDocument:
                 doc.loaded.connect(self._resetHighlighting)
+                doc.closed.connect(self._saveCache)
+                doc.modificationChanged.connect(self._dropCache)
+                # don't load a deferred document, _resetHighlighting()
+                # reads the mode and the cache when it is loaded
+                if doc.isLoaded():
+                    self._mode = documentinfo.mode(doc, False)
+                    self._loadCache()
                 variables.manager(doc).changed.connect(self._variablesChange)
+            else:
+                self._mode = documentinfo.mode(doc, False)
+
+    def _firstRehighlightDone(self):
+        """Called after Qt's first full rehighlight has been run."""
+        self._rehighlightPending = False
+
+    def _contentsChange(self, position, removed, added):
+        """Called when the document changes.
+
+        Before Qt's first full rehighlight, changed blocks are not lexed
+        again, so the tokens and states lexUntil() stored in them and in the
+        blocks after them are forgotten.
+
+        """
+        if self._rehighlightPending:
+            block = self.document().findBlock(position)
+            while block.isValid() and block.userState() != -1:
+                block.setUserState(-1)
+                try:
+                    del block.userData().tokens
+                except AttributeError:
+                    pass
+                block = block.next()
+
+    def _loadCache(self):
+        """Load cached lexer states and tokens for the document, if any.
+
+        Returns True if a cache was found. The lexer states are put in a new
+        Fridge then, so all blocks must be highlighted again.
+
+        """
+        doc = self.document()
+        filename = doc.url().toLocalFile()
+        if (filename and not doc.isModified() and self._initialState is None
+                and doc.blockCount() >= lexcache.MIN_BLOCKS):
+            cache = lexcache.load(filename, doc.toPlainText(), self._mode)
+            if cache:
+                self._fridge = ly.lex.Fridge()
+                lexcache.restore_fridge(self._fridge, cache.states)
+                self._cache = cache
+                self._cachedMode = cache.mode
+                return True
+        return False
+
+    def _dropCache(self):
+        """Forget the cached lexer states and tokens."""
+        self._cache = None
+        self._cachedMode = None
+
+    def _saveCache(self):
+        """Called when the document is closed, saves the lexer states."""
+        if self._initialState is None:
+            doc = self.document()
+            if doc.blockCount() >= lexcache.MIN_BLOCKS:
+                mode = self._mode or ly.lex.guessMode(doc.toPlainText())
+                lexcache.save(doc, self._fridge, self._mode, mode)
 
     def _variablesChange(self):
         """Called whenever the variables have changed. Checks the mode."""
         mode = documentinfo.mode(self.document(), False)
         if mode != self._mode:
             self._mode = mode
+            self._dropCache()
             self.rehighlight()
 
     def _resetHighlighting(self):
-        """Switch highlighting on or off depending on saved metainfo."""
-        self.setHighlighting(metainfo.info(self.document()).highlighting)
+        """Called when the document is (re)loaded.
+
+        Switches highlighting on or off depending on saved metainfo, and uses
+        the cached lexer states and tokens of the loaded text, if any.
+
+        """
+        self._dropCache()
+        self._mode = documentinfo.mode(self.document(), False)
+        if self._loadCache():
+            self._highlighting = metainfo.info(self.document()).highlighting
+            self.rehighlight()
+        else:
+            self.setHighlighting(metainfo.info(self.document()).highlighting)
 
     def highlightBlock(self, text):
         """Called by Qt when the highlighting of the current line needs updating."""
+        block = self.currentBlock()
+        tokens, state = self._lexBlock(block, text, self.previousBlockState())
+        cursortools.data(block).tokens = tokens
+        self.setCurrentBlockState(state)
+
+        # apply highlighting if desired
+        if self._highlighting:
+            setFormat = lambda f: self.setFormat(token.pos, len(token), f)
+            mapping = highlight_mapping()
+            for token in tokens:
+                f = mapping[token]
+                if f:
+                    setFormat(f)
+
+    def _lexBlock(self, block, text, prev):
+        """Lex the text of the block, starting in the frozen state prev.
+
+        Returns a tuple (tokens, state), where state is the frozen state at
+        the end of the block, to be used as the user state of the block.
+
+        """
+        if self._cache:
+            cached = self._cache.tokens(block.blockNumber(), text, prev)
+            if cached:
+                return cached
         # find the state of the previous line
-        prev = self.previousBlockState()
         state = self._fridge.thaw(prev)
         blank = not state and (not text or text.isspace())
         if not state:
             state = self.initialState()
 
-        # collect and save the tokens
+        # collect the tokens
         tokens = tuple(state.tokens(text))
-        cursortools.data(self.currentBlock()).tokens = tokens
 
         # if blank thus far, keep the highlighter coming back
         # because the parsing state is not yet known; else save the state
-        self.setCurrentBlockState(prev - 1 if blank else self._fridge.freeze(state))
+        return tokens, prev - 1 if blank else self._fridge.freeze(state)
 
-        # apply highlighting if desired
-        if self._highlighting:
-            setFormat = lambda f: self.setFormat(token.pos, len(token), f)
-            mapping = highlight_mapping()
-            for token in tokens:
-                f = mapping[token]
-                if f:
-                    setFormat(f)
+    def lexUntil(self, block):
+        """Make sure all blocks up to and including block have been lexed.
+
+        Only the blocks that have not been lexed yet are processed, starting
+        after the last block with a known state. The tokens and states are
+        stored in the blocks, but no highlighting is applied; that is done by
+        Qt's own highlighting run later.
+
+        Use this instead of rehighlight() when the tokens or states of some
+        block are needed before the highlighter has run.
+
+        """
+        if not block.isValid() or block.userState() != -1:
+            return
+        start = block
+        while True:
+            prev = start.previous()
+            if not prev.isValid() or prev.userState() != -1:
+                break
+            start = prev
+        state = start.previous().userState()    # -1 for the first block
+        end = block.next()
+        while start != end:
+            tokens, state = self._lexBlock(start, start.text(), state)
+            cursortools.data(start).tokens = tokens
+            start.setUserState(state)
+            start = start.next()
 
     def setHighlighting(self, enable):
         """Enable or disable highlighting."""
@@ -175,20 +303,22 @@ class Highlighter(plugin.Plugin, QSyntaxHighlighter):
         """Return a thawed ly.lex.State() object at the *end* of the QTextBlock.
 
         Do not use this method directly. Instead use tokeniter.state() or
-        tokeniter.state_end(), because that assures the highlighter has run
-        at least once.
+        tokeniter.state_end(), because that assures the block has been lexed
+        (see lexUntil()).
 
         """
         return self._fridge.thaw(block.userState()) or self.initialState()
 
     def setInitialState(self, state):
         """Force the initial state. Use None to enable auto-detection."""
+        self._dropCache()
         self._initialState = self._fridge.freeze(state) if state else None
 
     def initialState(self):
         """Return the initial State for this document."""
         if self._initialState is None:
-            mode = self._mode or ly.lex.guessMode(self.document().toPlainText())
+            mode = (self._mode or self._cachedMode
+                    or ly.lex.guessMode(self.document().toPlainText()))
             return ly.lex.state(mode)
         return self._fridge.thaw(self._initialState)
 
@@ -22,20 +22,23 @@ Create a HTML diff view from two text strings.
 """
 
 
-import re
 import difflib
+import itertools
+import re
+
+import textdiff
 
 
 def htmldiff(oldtext, newtext, oldtitle="", newtitle="",
              context=True, numlines=3, tabsize=8, wrapcolumn=None):
     """Return a HTML diff from oldtext to newtext.
 
-    See also the Python documentation for difflib.HtmlDiff().make_table().
+    See also the Python documentation for difflib.HtmlDiff().make_table()
+    and make_table() below.
 
     """
-    table = difflib.HtmlDiff(tabsize=tabsize, wrapcolumn=wrapcolumn).make_table(
-        oldtext.splitlines(), newtext.splitlines(),
-        oldtitle, newtitle, context, numlines)
+    table = make_table(oldtext.splitlines(), newtext.splitlines(),
+        oldtitle, newtitle, context, numlines, tabsize, wrapcolumn)
     # overcome a QTextBrowser limitation (no text-align css support)
     table = table.replace('<td class="diff_header"', '<td align="right" class="diff_header"')
     # make horizontal lines between sections
@@ -52,6 +55,219 @@ def htmldiff(oldtext, newtext, oldtitle="", newtitle="",
     return _htmltemplate.format(diff = table, css = _css, legend = legend)
 
 
+def make_table(fromlines, tolines, fromdesc='', todesc='',
+               context=False, numlines=5, tabsize=8, wrapcolumn=None):
+    """Return a HTML table with a side by side comparison of the lines.
+
+    The table looks like the one created by difflib.HtmlDiff.make_table(),
+    and the arguments have the same meaning. But the lines are compared
+    using textdiff, and the changed lines are shown side by side in the order
+    they appear, instead of searching the best matching pairs of changed
+    lines, which is very slow for large changes.
+
+    """
+    prefix = next(_table_count)
+    fromprefix, toprefix = f"from{prefix}_", f"to{prefix}_"
+    fromlines = [line.expandtabs(tabsize) for line in fromlines]
+    tolines = [line.expandtabs(tabsize) for line in tolines]
+    rows = _mdiff(fromlines, tolines, numlines if context else None)
+    if wrapcolumn:
+        rows = _wrap(rows, wrapcolumn)
+    fromlist, tolist, flaglist = [], [], []
+    for fromdata, todata, flag in rows:
+        if flag is None:
+            fromlist.append(None)
+            tolist.append(None)
+        else:
+            fromlist.append(_format_line(fromprefix, *fromdata))
+            tolist.append(_format_line(toprefix, *todata))
+        flaglist.append(flag)
+
+    # the anchors and the links to the next change
+    next_id = [''] * len(flaglist)
+    next_href = [''] * len(flaglist)
+    count, in_change, last = 0, False, 0
+    for i, flag in enumerate(flaglist):
+        if flag:
+            if not in_change:
+                in_change = True
+                last = i
+                # put the anchor a few (context) lines before the change
+                next_id[max(0, i - numlines)] = f' id="difflib_chg_{toprefix}_{count}"'
+                count += 1
+                next_href[i] = f'<a href="#difflib_chg_{toprefix}_{count}">n</a>'
+        else:
+            in_change = False
+    if not flaglist:
+        text = "No Differences Found" if context else "Empty File"
+        fromlist = tolist = [f'<td></td><td>&nbsp;{text}&nbsp;</td>']
+        flaglist, next_id, next_href = [False], [''], ['']
+    if not flaglist[0]:
+        next_href[0] = f'<a href="#difflib_chg_{toprefix}_0">f</a>'
+    next_href[last] = f'<a href="#difflib_chg_{toprefix}_top">t</a>'
+
+    rows = []
+    for i, flag in enumerate(flaglist):
+        if flag is None:
+            # no separator before the first group
+            if i > 0:
+                rows.append('        </tbody>\n        <tbody>\n')
+        else:
+            rows.append(
+                f'            <tr><td class="diff_next"{next_id[i]}>{next_href[i]}</td>'
+                f'{fromlist[i]}<td class="diff_next">{next_href[i]}</td>{tolist[i]}</tr>\n')
+    if fromdesc or todesc:
+        header_row = (
+            '<thead><tr><th class="diff_next"><br /></th>'
+            f'<th colspan="2" class="diff_header">{fromdesc}</th>'
+            '<th class="diff_next"><br /></th>'
+            f'<th colspan="2" class="diff_header">{todesc}</th></tr></thead>')
+    else:
+        header_row = ''
+    table = _table_template.format(
+        prefix=toprefix, header_row=header_row, rows=''.join(rows))
+    return (table.replace('\0+', '<span class="diff_add">')
+                 .replace('\0-', '<span class="diff_sub">')
+                 .replace('\0^', '<span class="diff_chg">')
+                 .replace('\1', '</span>'))
+
+
+def _format_line(prefix, linenum, text):
+    """Return the HTML cells for the line number and the text of a line."""
+    id = f' id="{prefix}{linenum}"' if isinstance(linenum, int) else ''
+    text = text.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+    # keep the spaces, they would be compressed or wrapped otherwise
+    text = text.replace(' ', '&nbsp;').rstrip()
+    return f'<td class="diff_header"{id}>{linenum}</td><td nowrap="nowrap">{text}</td>'
+
+
+def _wrap(rows, width):
+    """Split the lines of the (from, to, flag) rows that are longer than width.
+
+    The continuation lines have '>' as line number.
+
+    """
+    for fromdata, todata, flag in rows:
+        if flag is None:
+            yield fromdata, todata, flag
+            continue
+        fromparts = _wrap_line(*fromdata, width)
+        toparts = _wrap_line(*todata, width)
+        for i in range(max(len(fromparts), len(toparts))):
+            yield (fromparts[i] if i < len(fromparts) else ('', ''),
+                   toparts[i] if i < len(toparts) else ('', ''),
+                   flag)
+
+
+def _wrap_line(linenum, text, width):
+    """Return a list of (linenum, text) tuples with the text split at width.
+
+    The change markers are closed at the end of a part and opened again at
+    the start of the next part.
+
+    """
+    parts, part, count, mark = [], [], 0, None
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == '\0':
+            mark = text[i+1]
+            part.append(text[i:i+2])
+            i += 2
+            continue
+        elif c == '\1':
+            mark = None
+        else:
+            if count == width:
+                if mark:
+                    part.append('\1')
+                parts.append(''.join(part))
+                part = ['\0' + mark] if mark else []
+                count = 0
+            count += 1
+        part.append(c)
+        i += 1
+    parts.append(''.join(part))
+    return [(linenum, parts[0])] + [('>', p) for p in parts[1:]]
+
+
+def _mdiff(fromlines, tolines, context=None):
+    """Yield (from, to, flag) tuples for the rows of the table.
+
+    from and to are (linenumber, text) tuples, where the changes in the text
+    are marked with '\0+', '\0-' or '\0^' and '\1'. flag is True if the
+    lines differ. If context is not None, only the changed lines and context
+    lines around them are yielded, with (None, None, None) between the
+    groups of lines.
+
+    """
+    pairs = _line_pairs(fromlines, tolines)
+    if context is None:
+        yield from pairs
+        return
+    pairs = list(pairs)
+    show = [False] * len(pairs)
+    for index, pair in enumerate(pairs):
+        if pair[2]:
+            for i in range(max(0, index - context), min(len(pairs), index + context + 1)):
+                show[i] = True
+    last = -1
+    for index, pair in enumerate(pairs):
+        if show[index]:
+            if index > last + 1:
+                yield None, None, None
+            yield pair
+            last = index
+
+
+def _line_pairs(fromlines, tolines):
+    """Yield (from, to, flag) tuples for all the lines."""
+    blank = ('', '')
+    for tag, i1, i2, j1, j2 in textdiff.LineMatcher(fromlines, tolines).get_opcodes():
+        if tag == 'equal':
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                yield (i + 1, fromlines[i]), (j + 1, tolines[j]), False
+            continue
+        count = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for k in range(count):
+            old, new = _markup(fromlines[i1 + k], tolines[j1 + k])
+            yield (i1 + k + 1, old), (j1 + k + 1, new), True
+        for i in range(i1 + count, i2):
+            yield (i + 1, '\0-' + (fromlines[i] or ' ') + '\1'), blank, True
+        for j in range(j1 + count, j2):
+            yield blank, (j + 1, '\0+' + (tolines[j] or ' ') + '\1'), True
+
+
+def _markup(old, new):
+    """Return the old and new line with the changed characters marked."""
+    if len(old) + len(new) > textdiff.MAX_REFINE:
+        return '\0^' + old + '\1', '\0^' + new + '\1'
+    o, n = [], []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, False).get_opcodes():
+        if tag == 'equal':
+            o.append(old[i1:i2])
+            n.append(new[j1:j2])
+            continue
+        if i1 < i2:
+            o.append('\0' + ('^' if tag == 'replace' else '-') + old[i1:i2] + '\1')
+        if j1 < j2:
+            n.append('\0' + ('^' if tag == 'replace' else '+') + new[j1:j2] + '\1')
+    return ''.join(o), ''.join(n)
+
+
+# used to give every table unique anchor names
+_table_count = itertools.count(1)
+
+_table_template = """
+    <table class="diff" id="difflib_chg_{prefix}_top"
+           cellspacing="0" cellpadding="0" rules="groups" >
+        <colgroup></colgroup> <colgroup></colgroup> <colgroup></colgroup>
+        <colgroup></colgroup> <colgroup></colgroup> <colgroup></colgroup>
+        {header_row}
+        <tbody>
+{rows}        </tbody>
+    </table>"""
+
 _htmltemplate = """
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
           "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
@@ -0,0 +1,201 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Finds the files \\include commands refer to.
+
+The listings of the directories that are searched are cached, so finding
+a file normally does not access the disk. The directories are watched with
+a QFileSystemWatcher, and the listing of a directory is read again after
+files were added to, removed from or renamed in it.
+
+Only the directories that are searched (the include path and the directories
+of the documents) and their subdirectories are watched, and at most
+MAX_WATCHED of them; the least recently used directory is not watched anymore
+when another one is needed.
+
+Directories that are not watched (e.g. because they don't exist) are not
+cached, they are read every time.
+"""
+
+
+import collections
+import os
+import sys
+
+from PyQt6.QtCore import QFileSystemWatcher
+
+
+# how names are compared on case-insensitive file systems
+if sys.platform.startswith(('win', 'darwin')):
+    _fold = str.lower
+else:
+    _fold = str
+
+
+class Listing:
+    """The names of the files and the subdirectories in a directory."""
+    def __init__(self, files=(), dirs=()):
+        self.files = frozenset(files)
+        self.dirs = frozenset(dirs)
+        self._folded = frozenset(map(_fold, self.files))
+
+    def isfile(self, name):
+        """Return True if name is a file in the directory."""
+        return name in self.files or _fold(name) in self._folded
+
+
+# the maximum number of directories that are watched
+MAX_WATCHED = 200
+
+_listings = {}      # directory: Listing
+_watched = collections.OrderedDict()    # watched directories, least recently used first
+_found = {}         # (arg, directories): path or None
+_realpaths = {}     # path: real path
+_watcher = None
+
+
+def watcher():
+    """Return the QFileSystemWatcher watching the cached directories."""
+    global _watcher
+    if _watcher is None:
+        _watcher = QFileSystemWatcher()
+        _watcher.directoryChanged.connect(_directoryChanged)
+    return _watcher
+
+
+def _directoryChanged(directory):
+    """Called when a watched directory is changed; forgets its listing."""
+    _listings.pop(directory, None)
+    _found.clear()
+    # a symlink may have been changed
+    _realpaths.clear()
+    if not os.path.isdir(directory):
+        watcher().removePath(directory)
+        _watched.pop(directory, None)
+
+
+def _watch(directory):
+    """Start watching the directory, returns True if that succeeded.
+
+    If MAX_WATCHED directories are watched already, the least recently used
+    one is not watched anymore and its listing is forgotten.
+
+    """
+    w = watcher()
+    if len(_watched) >= MAX_WATCHED:
+        old = _watched.popitem(last=False)[0]
+        w.removePath(old)
+        _listings.pop(old, None)
+        _found.clear()
+    if w.addPath(directory):
+        _watched[directory] = True
+        return True
+    return False
+
+
+def _read(directory):
+    """Read and return the Listing of the directory."""
+    files, dirs = [], []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        files.append(entry.name)
+                    elif entry.is_dir():
+                        dirs.append(entry.name)
+                except OSError:
+                    pass
+    except (OSError, UnicodeDecodeError):
+        pass
+    return Listing(files, dirs)
+
+
+def listing(directory, watch=True):
+    """Return the (cached) Listing of the directory.
+
+    The directory should be a normalized absolute path. If watch is False,
+    a directory that is not watched already is read but not watched and
+    cached.
+
+    """
+    if directory in _watched:
+        _watched.move_to_end(directory)
+        try:
+            return _listings[directory]
+        except KeyError:
+            watched = True
+    elif watch:
+        # start watching before reading, so no change can be missed
+        watched = _watch(directory)
+    else:
+        watched = False
+    result = _read(directory)
+    if watched:
+        _listings[directory] = result
+    return result
+
+
+def find(arg, directories):
+    """Return the path of the file arg, searched in directories, or None.
+
+    The returned path is the normalized path of arg joined with the first
+    directory it exists in. Empty or None directories are skipped.
+
+    Only the directories and their subdirectories are watched; a file
+    outside them (e.g. '../file.ly') is looked up without caching.
+
+    """
+    directories = tuple(directories)
+    key = (arg, directories)
+    try:
+        return _found[key]
+    except KeyError:
+        pass
+    result = None
+    cached = True
+    for d in directories:
+        if d:
+            base = os.path.normpath(os.path.abspath(d))
+            path = os.path.normpath(os.path.join(base, arg))
+            directory, name = os.path.split(path)
+            l = listing(directory, _inside(directory, base))
+            cached = cached and directory in _listings
+            if l.isfile(name):
+                result = path
+                break
+    if cached:
+        _found[key] = result
+    return result
+
+
+def _inside(directory, base):
+    """Return True if directory is base or a subdirectory of it."""
+    return directory == base or directory.startswith(os.path.join(base, ''))
+
+
+def realpath(path):
+    """Return the (cached) os.path.realpath() of the path."""
+    try:
+        return _realpaths[path]
+    except KeyError:
+        result = _realpaths[path] = os.path.realpath(path)
+        return result
+
@@ -32,6 +32,8 @@ from PyQt6.QtCore import QCoreApplication, QProcess, QProcessEnvironment
 
 import signals
 
+from .history import History
+
 
 # message status:
 STDOUT  = 1
@@ -87,6 +89,10 @@ class Job:
     started = signals.Signal()
     title_changed = signals.Signal() # title (string)
 
+    # the number of characters of the history that are kept in memory,
+    # older output is moved to a temporary file
+    history_limit = 1048576
+
     def __init__(self,
         command="",
         args=None,
@@ -103,6 +109,7 @@ class Job:
         self._input = input
         self._output = output
         self._runner = runner
+        self._queue = None
         self._arguments = args if args else []
         self._directory = directory
         self.environment = environment or {}
@@ -114,12 +121,12 @@ class Job:
         self._has_started = False
         self._aborted = False
         self._process = None
-        self._history = []
+        self._history = History(self.history_limit)
         self._starttime = 0.0
         self._elapsed = 0.0
+        self.decode_errors = decode_errors  # codecs error handling
         self.decoder_stdout = self.create_decoder(STDOUT)
         self.decoder_stderr = self.create_decoder(STDERR)
-        self.decode_errors = decode_errors  # codecs error handling
 
     def add_argument(self, arg):
         """Append an additional command line argument if it is not
@@ -141,12 +148,15 @@ class Job:
         by setting the `decoder_stdout` and `decoder_stderr` manually after
         construction.
 
-        This decoder is then used to decode the 8bit bytestrings into Python
-        unicode strings. The default implementation returns a 'latin1'
-        decoder for both channels.
+        The decoder must be an incremental decoder (codecs.IncrementalDecoder),
+        which is then used to decode the 8bit bytestrings into Python unicode
+        strings. Because it keeps its state between calls, multi-byte
+        characters that are split over two reads are decoded correctly. The
+        default implementation returns a decoder for the encoding given on
+        construction ('latin1' by default).
 
         """
-        return codecs.getdecoder(self._encoding)
+        return codecs.getincrementaldecoder(self._encoding)(self.decode_errors)
 
     def directory(self):
         return self._directory
@@ -174,6 +184,16 @@ class Job:
     def output_file(self):
         return self._output_file
 
+    def output_key(self):
+        """Return a key identifying the output files written by this job.
+
+        A JobQueue never runs two jobs with the same key at the same time.
+        The default implementation returns None, meaning the job can always
+        run in parallel with other jobs.
+
+        """
+        return None
+
     def runner(self):
         """Return the Runner object if the job is run within
         a JobQueue, or None if not."""
@@ -184,6 +204,20 @@ class Job:
         a JobQueue."""
         self._runner = runner
 
+    def queue(self):
+        """Return the JobQueue the job is waiting in, or None if the job
+        is not queued."""
+        return self._queue
+
+    def set_queue(self, queue):
+        """Store a reference to the JobQueue the job is waiting in.
+
+        The queue sets this to None again when the job is started or
+        removed from the queue.
+
+        """
+        self._queue = queue
+
     def title(self):
         """Return the job title, as set with set_title().
 
@@ -214,7 +248,9 @@ class Job:
         self.success = None
         self.error = None
         self._aborted = False
-        self._history = []
+        self._history.clear()
+        self.decoder_stdout.reset()
+        self.decoder_stderr.reset()
         self._elapsed = 0.0
         self._starttime = time.time()
         if self._process is None:
@@ -264,8 +300,18 @@ class Job:
         return 0.0
 
     def abort(self):
-        """Abort the process."""
-        if self._process:
+        """Abort the process.
+
+        If the job is still waiting in a JobQueue, it is removed from the
+        queue and the done() signal is emitted with success set to False.
+
+        """
+        if self.is_queued():
+            self._queue.remove_job(self)
+            self._aborted = True
+            self.success = False
+            self.done(False)
+        elif self._process:
             self._aborted = True
             self.abort_message()
             if platform.system() == "Windows":
@@ -277,9 +323,13 @@ class Job:
         """Returns True if the job was aborted by calling abort()."""
         return self._aborted
 
+    def is_queued(self):
+        """Returns True if this job is waiting in a JobQueue."""
+        return self._queue is not None
+
     def is_running(self):
-        """Returns True if this job is running."""
-        return bool(self._process)
+        """Returns True if this job is running or waiting in a JobQueue."""
+        return bool(self._process) or self.is_queued()
 
     def failed_to_start(self):
         """Return True if the process failed to start.
@@ -310,7 +360,7 @@ class Job:
     def message(self, text, type=NEUTRAL):
         """Output some text as the given type (NEUTRAL, SUCCESS, FAILURE, STDOUT or STDERR)."""
         self.output(text, type)
-        self._history.append((text, type))
+        self._history.append(text, type, bool(type & OUTPUT))
 
     def history(self, types=ALL):
         """Yield the output messages as two-tuples (text, type) since the process started.
@@ -318,6 +368,8 @@ class Job:
         If types is given, it should be an OR-ed combination of the status types
         STDERR, STDOUT, NEUTRAL, SUCCESS or FAILURE.
 
+        Consecutive output of the same type is joined in one message.
+
         """
         for msg, type in self._history:
             if type & types:
@@ -336,6 +388,12 @@ class Job:
 
     def _finished(self, exitCode, exitStatus):
         """(internal) Called when the process has finished."""
+        self._readstderr()
+        self._readstdout()
+        for decoder, type in ((self.decoder_stderr, STDERR), (self.decoder_stdout, STDOUT)):
+            text = decoder.decode(b'', True)
+            if text:
+                self.message(text, type)
         self.finish_message(exitCode, exitStatus)
         success = exitCode == 0 and exitStatus == QProcess.ExitStatus.NormalExit
         self._bye(success)
@@ -359,13 +417,17 @@ class Job:
 
     def _readstderr(self):
         """(internal) Called when STDERR can be read."""
-        output = self._process.readAllStandardError()
-        self.message(self.decoder_stderr(output, self.decode_errors)[0], STDERR)
+        output = self._process.readAllStandardError().data()
+        text = self.decoder_stderr.decode(output)
+        if text:
+            self.message(text, STDERR)
 
     def _readstdout(self):
         """(internal) Called when STDOUT can be read."""
-        output = self._process.readAllStandardOutput()
-        self.message(self.decoder_stdout(output, self.decode_errors)[0], STDOUT)
+        output = self._process.readAllStandardOutput().data()
+        text = self.decoder_stdout.decode(output)
+        if text:
+            self.message(text, STDOUT)
 
     def start_message(self):
         """Called by start().
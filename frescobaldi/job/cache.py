@@ -0,0 +1,252 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2015 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+A persistent, content-addressed cache of engraving results.
+
+The key of an entry is a hash of everything that determines the output of
+a LilyPond job: the path and contents of the input file, the paths and
+contents of all the files it includes, the include path, the LilyPond
+version and the command line options. The path of the input file is part of
+the key because the point-and-click links in the output contain it. An entry
+is a directory containing the PDF, SVG and MIDI files the job created, with
+their names relative to the job's directory, and the output LilyPond printed.
+
+When a job with the same key is run again, the files are copied back and the
+output is shown again, instead of running LilyPond. The cache is shared by all documents and
+sessions. Its size is limited; the least recently used entries are
+removed first.
+
+The cache is disabled by default, see enabled().
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+
+from PyQt6.QtCore import QSettings, QStandardPaths
+
+import util
+
+
+# the extensions of the files that are stored
+extensions = ('.pdf', '.svg', '.svgz', '.mid', '.midi')
+
+# the name of the file in an entry containing the output of the job
+LOGFILE = 'output.json'
+
+
+def enabled():
+    """Return True if the engraving cache is enabled in the Preferences."""
+    return QSettings().value("lilypond_settings/engrave_cache", False, bool)
+
+
+def max_size():
+    """Return the maximum size of the cache in bytes."""
+    mb = QSettings().value("lilypond_settings/engrave_cache_size", 500, int)
+    return mb * 1024 * 1024
+
+
+def cache_dir():
+    """Return the directory the cache entries are stored in."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.CacheLocation), 'engrave')
+
+
+def _file_digest(filename):
+    """Return the sha1 hex digest of the contents of a file."""
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def key(j):
+    """Return the cache key for the job.LilyPondJob j, or None.
+
+    None is returned if one of the files can't be read.
+
+    """
+    h = hashlib.sha1()
+    def add(s):
+        h.update(s.encode('utf-8', 'surrogateescape'))
+        h.update(b'\0')
+    filename = j.filename()
+    try:
+        add(os.path.normcase(os.path.abspath(filename)))
+        add(_file_digest(filename))
+        for f in sorted(os.path.normcase(os.path.abspath(f))
+                        for f in j.document_info.includefiles()):
+            add(f)
+            add(_file_digest(f))
+    except OSError:
+        return None
+    for path in j.includepath:
+        add(path)
+    add(j.lilypond_info.abscommand() or j.lilypond_info.command)
+    add(j.lilypond_info.versionString())
+    from .lilypond import serialize_d_options
+    for arg in serialize_d_options(j.d_options(), True):
+        add(arg)
+    for arg in j.arguments():
+        add(arg)
+    for arg in j.backend_args():
+        add(arg)
+    return h.hexdigest()
+
+
+def lookup(key):
+    """Return the directory of the cache entry for key, or None."""
+    path = os.path.join(cache_dir(), key)
+    if os.path.isdir(path):
+        return path
+
+
+def restore(key, directory):
+    """Copy the files of the cache entry for key to directory.
+
+    Returns the list of restored filenames, or None if there is no usable
+    entry. The entry is marked as most recently used.
+
+    """
+    path = lookup(key)
+    if not path:
+        return None
+    restored = []
+    logfile = os.path.join(path, LOGFILE)
+    try:
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                source = os.path.join(root, name)
+                if source == logfile:
+                    continue
+                target = os.path.join(directory, os.path.relpath(source, path))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # do not preserve the mtime, the files must look newer
+                # than the document
+                shutil.copyfile(source, target)
+                restored.append(target)
+        os.utime(path)
+    except OSError:
+        return None
+    return restored or None
+
+
+def output(key):
+    """Return the output stored in the cache entry for key.
+
+    This is a list of (text, type) tuples, as given to store().
+
+    """
+    path = lookup(key)
+    if path:
+        try:
+            with open(os.path.join(path, LOGFILE), encoding='utf-8') as f:
+                return [(text, type) for text, type in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            pass
+    return []
+
+
+def store(key, directory, filenames, output=()):
+    """Store the files in filenames (located in directory) under key.
+
+    Only files with one of the extensions are stored. Afterwards old
+    entries are removed if the cache has become too large.
+
+    output is a list of (text, type) tuples, the output of the job, which
+    can be retrieved later using output().
+
+    """
+    path = os.path.join(cache_dir(), key)
+    temp = path + '.part'
+    try:
+        shutil.rmtree(temp, ignore_errors=True)
+        for filename in filenames:
+            if not filename.lower().endswith(extensions):
+                continue
+            rel = os.path.relpath(filename, directory)
+            if rel.startswith(os.pardir):
+                continue
+            target = os.path.join(temp, rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(filename, target)
+        if not os.path.isdir(temp):
+            return
+        with open(os.path.join(temp, LOGFILE), 'w', encoding='utf-8') as f:
+            json.dump(list(output), f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp, path)
+    except OSError:
+        shutil.rmtree(temp, ignore_errors=True)
+        return
+    evict(max_size())
+
+
+def _entry_size(path):
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
+def evict(size):
+    """Remove the least recently used entries until the total size of the
+    cache is at most size bytes."""
+    root = cache_dir()
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    entries = []
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            entries.append((os.path.getmtime(path), _entry_size(path), path))
+        except OSError:
+            pass
+    total = sum(e[1] for e in entries)
+    for mtime, entry_size, path in sorted(entries):
+        if total <= size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= entry_size
+
+
+def clear():
+    """Remove all entries."""
+    shutil.rmtree(cache_dir(), ignore_errors=True)
+
+
+def output_files(j):
+    """Return the files created by the finished job.LilyPondJob j that
+    should be stored in the cache."""
+    files = util.files(j.document_info.basenames(), '.*')
+    try:
+        files = util.newer_files(files, j.start_time())
+    except OSError:
+        return []
+    return [f for f in files if f.lower().endswith(extensions)]
@@ -0,0 +1,105 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2015 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+The output history of a Job.
+
+The messages are kept in memory up to a limit; older messages are moved
+to a temporary file, so the complete history remains available without
+using an unbounded amount of memory.
+"""
+
+
+import collections
+import pickle
+import tempfile
+
+
+# maximum length of a message that is created by joining output chunks
+MAX_CHUNK = 65536
+
+
+class History:
+    """Stores (text, type) messages in the order they were added.
+
+    At most limit characters are kept in memory; when there are more,
+    the oldest messages are written to a temporary file. Iterating over
+    the History yields all the messages.
+
+    """
+    def __init__(self, limit=1048576):
+        self._limit = limit
+        self._entries = collections.deque()     # [parts, length, type] lists
+        self._size = 0
+        self._file = None
+        self._spilled = 0
+
+    def __len__(self):
+        return self._spilled + len(self._entries)
+
+    def __iter__(self):
+        if self._file:
+            f = self._file
+            pos = 0
+            for i in range(self._spilled):
+                f.seek(pos)
+                entry = pickle.load(f)
+                pos = f.tell()
+                yield entry
+        for parts, length, type in list(self._entries):
+            yield ''.join(parts), type
+
+    def append(self, text, type, join=False):
+        """Adds a message.
+
+        If join is True and the last message has the same type, the text is
+        appended to that message. This is used for output of a process, which
+        arrives in arbitrary chunks.
+
+        """
+        entries = self._entries
+        if (join and entries and entries[-1][2] == type
+                and entries[-1][1] < MAX_CHUNK):
+            entry = entries[-1]
+            entry[0].append(text)
+            entry[1] += len(text)
+        else:
+            entries.append([[text], len(text), type])
+        self._size += len(text)
+        while self._size > self._limit and len(entries) > 1:
+            self._spill()
+
+    def _spill(self):
+        """(Internal) Moves the oldest message to the temporary file."""
+        parts, length, type = self._entries.popleft()
+        self._size -= length
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(0, 2)
+        pickle.dump((''.join(parts), type), self._file, pickle.HIGHEST_PROTOCOL)
+        self._spilled += 1
+
+    def clear(self):
+        """Removes all messages and the temporary file."""
+        self._entries.clear()
+        self._size = 0
+        self._spilled = 0
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -27,15 +27,16 @@ import glob
 import os
 import shutil
 import sys
+import time
 
-from PyQt6.QtCore import QSettings, QUrl
+from PyQt6.QtCore import QSettings, QTimer, QUrl
 
 import ly.document
 import ly.docinfo
 
 import document
 import documentinfo
-from . import Job
+from . import Job, OUTPUT, SUCCESS
 import lilypondinfo
 import util
 
@@ -81,8 +82,14 @@ class LilyPondJob(Job):
     added from which the command line is implicitly composed in
     configure_command().
 
+    If the engraving cache is enabled in the Preferences and the job is
+    cacheable, the output files of the job are stored in the cache (see
+    job.cache) and restored from it if the same job is run again.
+
     """
 
+    cacheable = False
+
     def __init__(self, doc, args=None, title=""):
         """Create a LilyPond job by first retrieving some context
         from the document and feeding this into job.Job's __init__()."""
@@ -93,6 +100,8 @@ class LilyPondJob(Job):
         self.lilypond_info = docinfo.lilypondinfo()
         self._d_options = {}
         self._backend_args = []
+        self._cache_key = None
+        self._restoring = False
         input, self.includepath = docinfo.jobinfo(True)
         directory = os.path.dirname(input)
 
@@ -170,6 +179,18 @@ class LilyPondJob(Job):
     def d_option(self, key):
         return self._d_options.get(key, None)
 
+    def d_options(self):
+        return self._d_options
+
+    def output_key(self):
+        """Return the input file name without extension.
+
+        LilyPond bases the names of the output files on this, so jobs
+        for the same document are never run at the same time.
+
+        """
+        return os.path.normcase(os.path.splitext(self.filename())[0])
+
     def paths(self, includepath):
         """Ensure paths have trailing slashes for Windows compatibility."""
         result = []
@@ -183,10 +204,66 @@ class LilyPondJob(Job):
     def set_d_option(self, key, value=True):
         self._d_options[key] = value
 
+    def start(self):
+        """Start the job, or restore the results from the engraving cache."""
+        self._cache_key = None
+        if self.cacheable:
+            from . import cache
+            if cache.enabled():
+                self._cache_key = key = cache.key(self)
+                if key and self._restore_cached(key):
+                    return
+        super().start()
+
+    def is_running(self):
+        """Reimplemented to also return True while restoring from the cache."""
+        return self._restoring or super().is_running()
+
+    def _restore_cached(self, key):
+        """(internal) Restore the output files from the cache.
+
+        Returns True if the files were restored. The job finishes from the
+        event loop, so the done() signal is never emitted inside start().
+
+        """
+        from . import cache
+        self._starttime = time.time()
+        if not cache.restore(key, self.directory()):
+            return False
+        self.success = None
+        self.error = None
+        self._aborted = False
+        self._history.clear()
+        self.start_message()
+        for text, type in cache.output(key):
+            self.message(text, type)
+        self.message(_("Restored the output files from the engraving cache."),
+                     SUCCESS)
+        self._restoring = True
+        QTimer.singleShot(0, self._restored)
+        return True
+
+    def _restored(self):
+        """(internal) Finish the job after restoring from the cache."""
+        self._restoring = False
+        self._elapsed = time.time() - self._starttime
+        self.success = True
+        self.done(True)
+
+    def _bye(self, success):
+        """(internal) Stores the output files in the engraving cache."""
+        if success and self._cache_key:
+            from . import cache
+            cache.store(self._cache_key, self.directory(),
+                        cache.output_files(self), self.history(OUTPUT))
+        super()._bye(success)
+
 
 class PreviewJob(LilyPondJob):
     """Represents a LilyPond Job in Preview mode."""
 
+    cacheable = True
+
     def __init__(self, document, args=None, title=""):
         super().__init__(document, args, title)
         self.set_d_option('point-and-click', True)
@@ -195,6 +272,8 @@ class PreviewJob(LilyPondJob):
 class PublishJob(LilyPondJob):
     """Represents a LilyPond Job in Publish mode."""
 
+    cacheable = True
+
     def __init__(self, document, args=None, title=""):
         super().__init__(document, args, title)
         self.set_d_option('point-and-click', False)
@@ -215,6 +294,9 @@ class VolatileTextJob(PublishJob):
     base_dir can be used to add a 'virtual' document Directory
     in order to use relative includes.
     """
+
+    cacheable = False
+
     def __init__(self, text, title=None, base_dir=None):
         # Create temporary (document.Document object and file)
         self.directory = util.tempdir()
@@ -253,6 +335,8 @@ class CachedPreviewJob(PublishJob):
     in order to use relative includes from the 'current document'.
     """
 
+    cacheable = False
+
     _target_dir = util.tempdir()
 
     def __init__(
@@ -54,23 +54,39 @@ class JobManager(plugin.DocumentPlugin):
         self._job = None
 
     def start_job(self, job):
-        """Starts a Job on our behalf."""
+        """Starts a Job on our behalf.
+
+        The job is run by the 'engrave' queue of the global JobQueue, so
+        the number of LilyPond processes running in parallel is limited.
+        The started() signal is emitted when the queue actually starts the
+        job. Until then, the job is queued (see is_queued()).
+
+        """
         if not self.is_running():
             self._job = job
             job.done.connect(self._finished)
-            job.start()
+            queue = app.job_queue().queue('engrave')
+            queue.job_started.connect(self._job_started)
+            queue.add_job(job)
+
+    def _job_started(self, job):
+        if job is self._job:
             self.started(job)
             app.jobStarted(self.document(), job)
 
     def _finished(self, success):
-        self.finished(job, success)
+        self.finished(self._job, success)
         app.jobFinished(self.document(), self._job, success)
 
     def job(self):
         """Returns the last job if any."""
         return self._job
 
+    def is_queued(self):
+        """Returns True when the job is waiting in the queue."""
+        return bool(self._job and self._job.is_queued())
+
     def is_running(self):
-        """Returns True when a job is running."""
+        """Returns True when a job is running or waiting in the queue."""
         if self._job:
             return self._job.is_running() and not self._job.is_aborted()
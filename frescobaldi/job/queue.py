@@ -23,14 +23,34 @@ A (multithreaded) Job queue
 
 from enum import Enum
 import collections
+import os
 import time
 
-from PyQt6.QtCore import QObject
+from PyQt6.QtCore import QObject, QSettings
 
 import app
 import signals
 
 
+def default_num_runners():
+    """Return a sensible default for the number of parallel runners.
+
+    One core is left free for the GUI, but at least one runner is used.
+
+    """
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def num_runners_setting():
+    """Return the number of parallel runners configured in the Preferences.
+
+    A value of 0 (the default) means "automatic", see default_num_runners().
+
+    """
+    num = QSettings().value("lilypond_settings/num_runners", 0, int)
+    return num if num > 0 else default_num_runners()
+
+
 class RunnerBusyException(Exception):
     """Raised when a Runner is asked to start a job (without the force=True
     keyword argument) while having already a running job."""
@@ -128,6 +148,14 @@ class AbstractQueue(QObject):
         """Remove and return the next job."""
         raise NotImplementedError
 
+    def remove(self, j):
+        """Remove a job from the queue.
+
+        Returns True if the job was in the queue, False otherwise.
+
+        """
+        raise NotImplementedError
+
 
 class AbstractStackQueue(AbstractQueue):
     """Common ancestor for LIFO and FIFO queues"""
@@ -143,6 +171,13 @@ class AbstractStackQueue(AbstractQueue):
     def pop(self):
         return self._queue.pop()
 
+    def remove(self, j):
+        try:
+            self._queue.remove(j)
+        except ValueError:
+            return False
+        return True
+
 
 class Queue(AbstractStackQueue):
     """First-in-first-out queue (default operation)."""
@@ -188,6 +223,15 @@ class PriorityQueue(AbstractQueue):
         from heapq import heappop
         return heappop(self._queue)[2]
 
+    def remove(self, j):
+        from heapq import heapify
+        for i, entry in enumerate(self._queue):
+            if entry[2] is j:
+                del self._queue[i]
+                heapify(self._queue)
+                return True
+        return False
+
 
 class JobQueueException(Exception):
     """Abstract base exception for JobQueue related exceptions."""
@@ -256,6 +300,14 @@ class JobQueue(QObject):
     By default an internal FIFO (First in, first out) Queue is used
     as the underlying data structure, but Stack and PriorityQueue are
     available through the keyword command as well.
+
+    The number of runners can be changed while the queue is active
+    using set_num_runners().
+
+    Jobs that return the same (not None) output_key() are never run at
+    the same time: a job whose key is in use by a running job is held
+    back until that job has completed. This prevents two jobs from
+    writing the same output files at once.
     """
 
     started = signals.Signal()
@@ -286,8 +338,10 @@ class JobQueue(QObject):
         self._endtime = None
         self._completed = 0
         self._queue = queue_class()
+        self._blocked = collections.deque()
         self._capacity = capacity
-        self._runners = [Runner(self, i) for i in range(num_runners)]
+        self._runners = [Runner(self, i) for i in range(max(1, num_runners))]
+        self._retired = []
 
         if queue_mode == QueueMode.CONTINUOUS:
             self.start()
@@ -305,9 +359,13 @@ class JobQueue(QObject):
             )
         self.set_state(QueueStatus.ABORTED)
         self.set_queue_mode(QueueMode.SINGLE)
-        self._queue.clear()
+        while not self._queue.empty():
+            self._queue.pop().set_queue(None)
+        for j in self._blocked:
+            j.set_queue(None)
+        self._blocked.clear()
         if force:
-            for runner in self._runners:
+            for runner in self._runners + self._retired:
                 if runner:
                     # ignore runners that have already been set to None
                     runner.abort()
@@ -328,20 +386,41 @@ class JobQueue(QObject):
                 _("Can't add job to finished/aborted queue.")
             )
         elif self.state() in [QueueStatus.INACTIVE, QueueStatus.PAUSED]:
-            self._queue.push(job)
+            self._push(job)
             self.job_added.emit(job)
         else:
             runner = self.idle_runner()
-            if runner:
+            if runner and not self.is_blocked(job):
                 self.job_added.emit(job)
                 runner.start(job)
                 self.job_started.emit(job)
             else:
-                self._queue.push(job)
+                self._push(job)
                 self.job_added.emit(job)
             self.set_state(
-                QueueStatus.EMPTY if self._queue.empty()
-                else QueueStatus.STARTED)
+                QueueStatus.STARTED if self._has_pending()
+                else QueueStatus.EMPTY)
+
+    def _push(self, job):
+        """(internal) Add a job to the queue, waiting to be started."""
+        job.set_queue(self)
+        self._queue.push(job)
+
+    def remove_job(self, job):
+        """Remove a job that has not been started yet from the queue.
+
+        Returns True if the job was waiting in the queue, False otherwise.
+
+        """
+        if job in self._blocked:
+            self._blocked.remove(job)
+        elif not self._queue.remove(job):
+            return False
+        job.set_queue(None)
+        if self.state() == QueueStatus.STARTED and not self._has_pending():
+            self.set_state(QueueStatus.EMPTY)
+            self.emptied.emit()
+        return True
 
     def completed(self, runner=-1):
         """Return the number of completed jobs,
@@ -349,7 +428,7 @@ class JobQueue(QObject):
         if runner >= 0:
             return self._runners[runner].completed()
         else:
-            result = 0
+            result = self._completed
             for i in range(len(self._runners)):
                 result += self._runners[i].completed()
             return result
@@ -358,11 +437,27 @@ class JobQueue(QObject):
         """Returns True if a maximum capacity is set and used."""
         if not self._capacity:
             return False
-        return self._queue.length() == self._capacity
+        return self.size() == self._capacity
+
+    def _has_pending(self):
+        """Return True if there are jobs waiting to be started."""
+        return bool(self._blocked) or not self._queue.empty()
+
+    def is_blocked(self, job):
+        """Return True if job can't be started because a running job
+        has the same output key."""
+        key = job.output_key()
+        if key is None:
+            return False
+        for runner in self._runners + self._retired:
+            j = runner.job()
+            if j and j.output_key() == key:
+                return True
+        return False
 
     def is_idle(self):
         """Returns True if all Runners are idle."""
-        for runner in self._runners:
+        for runner in self._runners + self._retired:
             if runner.is_running():
                 return False
         return True
@@ -389,8 +484,12 @@ class JobQueue(QObject):
         Manage behaviour at that point, depending on the
         queue's state and mode.
         """
+        if runner in self._retired:
+            # the runner has been removed by set_num_runners()
+            self._retired.remove(runner)
+            self._completed += runner.completed()
         if self.state() == QueueStatus.STARTED:
-            runner.start(self.pop())
+            self._start_jobs()
         elif self.state() == QueueStatus.PAUSED:
             # If a SINGLE queue completes the last job while in PAUSE mode
             # it can be considered finished.
@@ -425,21 +524,80 @@ class JobQueue(QObject):
         self.set_state(QueueStatus.PAUSED)
         self.paused.emit()
 
+    def num_runners(self):
+        """Return the number of runners."""
+        return len(self._runners)
+
+    def set_num_runners(self, num):
+        """Change the number of runners (at least one).
+
+        New runners immediately start working on queued jobs. When the
+        number is decreased, the running jobs of the removed runners are
+        allowed to finish, but they won't receive new jobs.
+
+        """
+        num = max(1, num)
+        count = len(self._runners)
+        if num > count:
+            self._runners.extend(Runner(self, i) for i in range(count, num))
+            if self.state() == QueueStatus.STARTED:
+                self._start_jobs()
+        elif num < count:
+            for runner in self._runners[num:]:
+                if runner.is_running():
+                    self._retired.append(runner)
+                else:
+                    self._completed += runner.completed()
+            del self._runners[num:]
+
     def pop(self):
-        """Return and remove the next Job.
-        Raises Exception if empty."""
+        """Return and remove the next Job that can be started.
+
+        Returns None if all remaining jobs are blocked by running jobs
+        with the same output key. Raises Exception if empty."""
         if self.state() == QueueStatus.EMPTY:
             raise IndexError("Job Queue is empty.")
         if self.state() != QueueStatus.STARTED:
             raise JobQueueStateException(
                 _("Can't pop job from non-started Job Queue")
             )
-        j = self._queue.pop()
-        if self._queue.empty():
+        j = self._take()
+        if not self._has_pending():
             self.set_state(QueueStatus.EMPTY)
             self.emptied.emit()
         return j
 
+    def _take(self):
+        """(internal) Remove and return the first job that is not blocked.
+
+        Jobs that were held back earlier are considered first, so they
+        keep their place. Blocked jobs taken from the queue are held back.
+
+        """
+        for j in self._blocked:
+            if not self.is_blocked(j):
+                self._blocked.remove(j)
+                j.set_queue(None)
+                return j
+        while not self._queue.empty():
+            j = self._queue.pop()
+            if not self.is_blocked(j):
+                j.set_queue(None)
+                return j
+            self._blocked.append(j)
+
+    def _start_jobs(self):
+        """(internal) Start pending jobs on all idle runners."""
+        for runner in self._runners:
+            if self.state() != QueueStatus.STARTED:
+                break
+            if not runner.is_running():
+                j = self.pop()
+                if j is None:
+                    break
+                runner.start(j)
+                self.job_started.emit(j)
+
     def queue_finished(self):
         """Called when the last job has been completed and the queue
         is in SINGLE mode."""
@@ -473,7 +631,7 @@ class JobQueue(QObject):
 
     def size(self):
         """Return the number of unstarted jobs."""
-        return self._queue.length()
+        return self._queue.length() + len(self._blocked)
 
     def _start(self):
         """Set the state to started and ask all runners to start."""
@@ -494,15 +652,11 @@ class JobQueue(QObject):
             and self.queue_mode() == QueueMode.SINGLE
         ):
             raise IndexError(_("Can't start SINGLE-mode empty queue"))
-        if self._queue.empty():
+        if not self._has_pending():
             self.set_state(QueueStatus.IDLE)
         else:
             self.set_state(QueueStatus.STARTED)
-            for runner in self._runners:
-                if self._queue.empty():
-                    break
-                if not runner.is_running():
-                    runner.start(self.pop())
+            self._start_jobs()
 
     def start(self):
         """Start processing of the queue."""
@@ -523,10 +677,14 @@ class JobQueue(QObject):
 class GlobalJobQueue(QObject):
     """The application-wide Job Queue that dispatches jobs to runners
     and subordinate queues.
+
+    The number of runners of the 'engrave' and 'generic' queues is
+    read from the Preferences and updated when the settings change.
+    The 'crawl' queue always has one runner.
     """
 
     def __init__(self):
-        self.load_settings()
+        super().__init__()
         self._crawler = JobQueue()
         self._engraver = JobQueue()
         self._generic = JobQueue()
@@ -535,6 +693,7 @@ class GlobalJobQueue(QObject):
             'engrave': self._engraver,
             'generic': self._generic
         }
+        self.load_settings()
         app.settingsChanged.connect(self.settings_changed)
         app.aboutToQuit.connect(self.about_to_quit)
 
@@ -553,10 +712,16 @@ class GlobalJobQueue(QObject):
             raise ValueError(_("Invalid job queue target: {name}").format(name=target))
         target_queue.add_job(j)
 
+    def queue(self, target='engrave'):
+        """Return the JobQueue for the specified target, or None."""
+        return self._queues.get(target)
+
     def load_settings(self):
-        # TODO: Load settings and create the JobQueues accordingly
-        pass
+        """Set the number of runners from the Preferences."""
+        num = num_runners_setting()
+        self._engraver.set_num_runners(num)
+        self._generic.set_num_runners(num)
 
     def settings_changed(self):
-        # TODO: If multicore-related settings have changed update the queues
-        pass
+        """Resize the queues if the number of runners has changed."""
+        self.load_settings()
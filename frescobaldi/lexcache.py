@@ -0,0 +1,202 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Persistent cache of the lexer states and tokens of large documents.
+
+When a large document is closed, the frozen ly.lex states and the tokens of
+every block are saved to disk. When the same file is opened again (with the
+same modification time and contents), the Highlighter uses the cached tokens
+and states instead of lexing the blocks again.
+
+The tokens of a block only depend on the text of the block and the lexer
+state at the start of the block, so a cached entry is used for a block when
+both are the same.
+"""
+
+
+import hashlib
+import os
+import pickle
+
+from PyQt6.QtCore import QStandardPaths
+
+import ly.lex
+import ly.pkginfo
+
+
+# only documents with at least this number of blocks are cached
+MIN_BLOCKS = 1000
+
+# maximum number of cached documents
+MAX_ENTRIES = 50
+
+# change this when the format of the stored data changes
+_format = 1
+
+
+def cache_dir():
+    """Return the directory the cached data is stored in."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.CacheLocation), 'lexer')
+
+
+def _cache_file(filename):
+    """Return the file name the data for filename is stored in."""
+    name = hashlib.sha1(filename.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(cache_dir(), name)
+
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+def _header(filename, text, mode):
+    """Return the tuple that must match for cached data to be valid."""
+    return (_format, ly.pkginfo.version, filename,
+            os.path.getmtime(filename), _text_hash(text), mode)
+
+
+class LexerCache:
+    """Cached lexer states and tokens of a document.
+
+    The states list contains the frozen states in the order of the Fridge
+    they were taken from. Every block entry is a tuple (text, previous,
+    state, tokens), where previous and state are the user states of the
+    previous and the current block, and tokens is a tuple of (class, pos,
+    end) tuples.
+
+    """
+    def __init__(self, mode, states, blocks):
+        self.mode = mode
+        self.states = states
+        self.blocks = blocks
+
+    def tokens(self, number, text, previous):
+        """Return a tuple (tokens, state) for the block with the given number.
+
+        Returns None if the cache has no entry for the block with that text
+        and that previous state.
+
+        """
+        try:
+            entry = self.blocks[number]
+        except IndexError:
+            return None
+        if entry[0] != text or entry[1] != previous:
+            return None
+        tokens = tuple(cls(text[pos:end], pos) for cls, pos, end in entry[3])
+        return tokens, entry[2]
+
+
+def load(filename, text, varmode):
+    """Return the LexerCache for the file, or None.
+
+    The cache is only returned if the file has not changed since it was
+    saved, its contents are the same as text and the mode set in the document
+    variables (varmode, may be None) is the same.
+
+    """
+    try:
+        with open(_cache_file(filename), 'rb') as f:
+            header = pickle.load(f)
+            if header != _header(filename, text, varmode):
+                return None
+            mode, states, blocks = pickle.load(f)
+    except Exception:
+        # any error (also when unpickling) means the cache is not usable
+        return None
+    try:
+        os.utime(_cache_file(filename))
+    except OSError:
+        pass
+    return LexerCache(mode, states, blocks)
+
+
+def save(doc, fridge, varmode, mode):
+    """Save the tokens and states of the document.
+
+    fridge is the ly.lex.Fridge the user states of the blocks refer to,
+    varmode the mode set in the document variables (may be None) and mode
+    the mode that was used to lex the document.
+
+    Nothing is saved if the document is small, modified or not a local file,
+    or if not all blocks have been lexed.
+
+    """
+    filename = doc.url().toLocalFile()
+    if (not filename or doc.isModified()
+            or doc.blockCount() < MIN_BLOCKS):
+        return
+    blocks = []
+    previous = -1
+    block = doc.firstBlock()
+    while block.isValid():
+        state = block.userState()
+        try:
+            tokens = block.userData().tokens
+        except AttributeError:
+            return
+        if state == -1:
+            return
+        blocks.append((block.text(), previous, state,
+            tuple((type(t), t.pos, t.end) for t in tokens)))
+        previous = state
+        block = block.next()
+    states = [fridge.thaw(i).freeze() for i in range(fridge.count())]
+    try:
+        header = _header(filename, doc.toPlainText(), varmode)
+        os.makedirs(cache_dir(), exist_ok=True)
+        temp = _cache_file(filename) + '.part'
+        with open(temp, 'wb') as f:
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump((mode, states, blocks), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, _cache_file(filename))
+    except (OSError, pickle.PicklingError):
+        return
+    _evict()
+
+
+def _evict():
+    """Remove the least recently used files if there are too many."""
+    root = cache_dir()
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    entries = []
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            pass
+    entries.sort()
+    for mtime, path in entries[:-MAX_ENTRIES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def restore_fridge(fridge, states):
+    """Put the frozen states in the (empty) ly.lex.Fridge, keeping their
+    numbers."""
+    for frozen in states:
+        fridge.freeze(ly.lex.State.thaw(frozen))
@@ -24,7 +24,7 @@ A Log shows the output of a Job.
 
 import contextlib
 
-from PyQt6.QtCore import QSettings
+from PyQt6.QtCore import QSettings, QTimer
 from PyQt6.QtGui import (QFont, QPalette, QTextCharFormat, QTextCursor,
                          QTextFormat)
 from PyQt6.QtWidgets import QApplication, QTextBrowser
@@ -34,7 +34,15 @@ import qutil
 
 
 class Log(QTextBrowser):
-    """Widget displaying output from a Job."""
+    """Widget displaying output from a Job.
+
+    Messages are not written immediately, but collected and written
+    together after flushInterval msec, so that a job with much output
+    does not slow down the user interface.
+
+    """
+    flushInterval = 50
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setOpenLinks(False)
@@ -42,6 +50,8 @@ class Log(QTextBrowser):
         self._types = job.ALL
         self._lasttype = None
         self._formats = self.logformats()
+        self._pending = []
+        self._flushTimer = QTimer(self, singleShot=True, timeout=self.flush)
 
     def setMessageTypes(self, types):
         """Set the types of Job output to display.
@@ -60,12 +70,21 @@ class Log(QTextBrowser):
         """Gives us the output from the Job (past and upcoming)."""
         for msg, type in j.history():
             self.write(msg, type)
+        self.flush()
         j.output.connect(self.write)
 
     def disconnectJob(self, j):
         """Disconnects from an aborted job
         (to avoid calling into a destroyed log widget)."""
         j.output.disconnect(self.write)
+        self._pending = []
+
+    def clear(self):
+        """Reimplemented to also discard messages that are not yet written."""
+        self._pending = []
+        self._flushTimer.stop()
+        self._lasttype = None
+        super().clear()
 
     def textFormat(self, type):
         """Returns a QTextFormat() for the given type."""
@@ -74,6 +93,19 @@ class Log(QTextBrowser):
     def write(self, message, type):
         """Writes the given message with the given type to the log.
 
+        The message is actually written by flush(), which is called shortly
+        afterwards.
+
+        """
+        if type & self._types:
+            self._pending.append((message, type))
+            if not self._flushTimer.isActive():
+                self._flushTimer.start(self.flushInterval)
+
+    def flush(self):
+        """Writes the pending messages to the log.
+
+        Consecutive messages of the same type are joined and written at once.
         The keepScrolledDown context manager is used to scroll the log further
         down if it was scrolled down at that moment.
 
@@ -81,13 +113,26 @@ class Log(QTextBrowser):
         is inserted if otherwise the message would continue on the same line.
 
         """
-        if type & self._types:
-            with self.keepScrolledDown():
+        self._flushTimer.stop()
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        messages = []
+        for message, type in pending:
+            if messages and messages[-1][1] == type:
+                messages[-1][0].append(message)
+            else:
+                messages.append(([message], type))
+        with self.keepScrolledDown():
+            self.cursor.beginEditBlock()
+            for parts, type in messages:
+                message = ''.join(parts)
                 changed = type != self._lasttype
                 self._lasttype = type
                 if changed and self.cursor.block().text() and not message.startswith('\n'):
                     self.cursor.insertText('\n')
                 self.writeMessage(message, type)
+            self.cursor.endEditBlock()
 
     def writeMessage(self, message, type):
         """Inserts the given message in the text with the textformat belonging to type."""
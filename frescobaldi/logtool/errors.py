@@ -22,6 +22,7 @@ Manages cursor positions of file-references in error messages.
 """
 
 
+import collections
 import os
 import re
 import sys
@@ -51,10 +52,12 @@ class Errors(plugin.DocumentPlugin):
     def __init__(self, document):
         self._refs = {}
         self._job = None
+        self._partialLine = ""
         mgr = job.manager.manager(document)
         if mgr.job():
             self.connectJob(mgr.job())
         mgr.started.connect(self.connectJob)
+        app.documentLoaded.connect(self.slotDocumentLoaded)
 
     def connectJob(self, j):
         """Starts collecting the references of a started Job.
@@ -76,6 +79,7 @@ class Errors(plugin.DocumentPlugin):
         for doc in docs:
             bookmarks.bookmarks(doc).clear("error")
         self._refs.clear()
+        self._partialLine = ""
         # take over history and connect
         for msg, type in j.history():
             self.slotJobOutput(msg, type)
@@ -87,16 +91,52 @@ class Errors(plugin.DocumentPlugin):
         The output is checked for error messages that contain
         a filename:line:column expression.
 
+        Only complete lines are checked; an incomplete last line is kept
+        until the rest of it arrives, or until other output follows.
+
         """
         if type == job.STDERR:
-            enc = sys.getfilesystemencoding()
-            job_enc = self._job._encoding
-            for m in message_re.finditer(message.encode(job_enc)):
-                url = m.group(1).decode(enc)
-                filename = m.group(2).decode(enc)
-                filename = util.normpath(filename)
-                line, column = int(m.group(3)), int(m.group(4) or 1)
-                self._refs[url] = Reference(filename, line, column)
+            text = self._partialLine + message
+            end = text.rfind('\n') + 1
+            self._partialLine = text[end:]
+            self.parseErrors(text[:end])
+        elif self._partialLine:
+            text, self._partialLine = self._partialLine, ""
+            self.parseErrors(text)
+
+    def parseErrors(self, text):
+        """Finds the error messages in text, which consists of complete lines."""
+        enc = sys.getfilesystemencoding()
+        job_enc = self._job._encoding
+        refs = []
+        for m in message_re.finditer(text.encode(job_enc)):
+            url = m.group(1).decode(enc)
+            filename = m.group(2).decode(enc)
+            filename = util.normpath(filename)
+            line, column = int(m.group(3)), int(m.group(4) or 1)
+            ref = self._refs[url] = Reference(filename, line, column)
+            refs.append(ref)
+        self.markErrors(refs)
+
+    def slotDocumentLoaded(self, document):
+        """Called whenever a new Document is loaded, binds the references to it."""
+        self.markErrors([ref for ref in self._refs.values() if ref.trybind(document)])
+
+    def markErrors(self, refs):
+        """Sets error marks on the lines of the bound references.
+
+        The marks are set with one call per document, so the views need to
+        update the marked lines only once.
+
+        """
+        lines = collections.defaultdict(list)
+        for ref in refs:
+            c = ref.cursor(False)
+            if c:
+                # use the line of the cursor, not "_line - 1", which may be invalid
+                lines[c.document()].append(c.blockNumber())
+        for doc, linenums in lines.items():
+            bookmarks.bookmarks(doc).setMarks(linenums, "error")
 
     def cursor(self, url, load=False):
         """Returns a QTextCursor belonging to the url (string).
@@ -120,7 +160,9 @@ class Reference:
         refers to the scratchdir for a document) a QTextCursor is created immediately.
 
         Otherwise, when a Document is loaded later with our filename, a QTextCursor
-        is created then (by the bind() method).
+        is created then (by the bind() method, called via trybind()).
+
+        The error mark on the line is set by Errors.markErrors().
 
         """
         self._filename = filename
@@ -128,7 +170,6 @@ class Reference:
         self._column = column
         self._cursor = None
 
-        app.documentLoaded.connect(self.trybind)
         d = scratchdir.findDocument(filename)
         if d:
             self.bind(d)
@@ -144,17 +185,17 @@ class Reference:
         # _line or _column overrun defaults to end of document or line respectively.
         self._cursor = document.cursorAtPosition(self._line, self._column)
         document.closed.connect(self.unbind)
-        # Set highlighting by new cursor, not "_line - 1", which may be invalid.
-        bookmarks.bookmarks(document).setMark(self._cursor.blockNumber(), "error")
 
     def unbind(self):
         """Called when previously "bound" document is closed."""
         self._cursor = None
 
     def trybind(self, document):
-        """Called whenever a new Document is loaded, checks the filename."""
+        """Binds to the Document if it has our filename, and returns True if so."""
         if document.url().toLocalFile() == self._filename:
             self.bind(document)
+            return True
+        return False
 
     def cursor(self, load):
         """Returns a QTextCursor for this reference.
@@ -49,6 +49,7 @@ class LogWidget(log.Log):
         self._document = lambda: None
         self._errors = []
         self._currentErrorIndex = -1
+        self._partialLine = None
         self.readSettings()
         self.anchorClicked.connect(self.slotAnchorClicked)
         logtool.mainwindow().currentDocumentChanged.connect(self.switchDocument)
@@ -87,6 +88,7 @@ class LogWidget(log.Log):
     def clear(self):
         self._errors = []
         self._currentErrorIndex = -1
+        self._partialLine = None
         self.setExtraSelections([])
         super().clear()
 
@@ -97,38 +99,64 @@ class LogWidget(log.Log):
         LilyPond writes filenames out in the system's filesystemencoding,
         while the messages are always written in UTF-8 encoding...
 
+        Output can end in the middle of a line. Such a last incomplete line
+        is written again together with the next output, so that a filename
+        reference split over two chunks of output is found.
+
         """
         if type == job.STDERR:
-            # find filenames in message:
-            #TODO: make the various encoding parameters be read directly
-            # from the Job.
-            # But this should be reviewed in general anyway.
-            parts = iter(errors.message_re.split(message.encode('utf-8')))
-            msg = next(parts).decode('utf-8', 'replace')
-            self.cursor.insertText(msg, self.textFormat(type))
-            enc = sys.getfilesystemencoding()
-
-            for url, path, line, col, msg in zip(*itertools.repeat(parts, 5)):
-                url = url.decode(enc)
-                path = path.decode(enc)
-                msg = msg.decode('utf-8', 'replace')
-                if self._rawView:
-                    fmt = QTextCharFormat(self.textFormat(type))
-                    display_url = url
-                else:
-                    fmt = QTextCharFormat(self.textFormat("link"))
-                    display_url = os.path.basename(path)
-                fmt.setAnchor(True)
-                fmt.setAnchorHref(str(len(self._errors)))
-                fmt.setToolTip(_("Click to edit this file"))
-
-                pos = self.cursor.position()
-                self.cursor.insertText(display_url, fmt)
-                self.cursor.insertText(msg, self.textFormat(type))
-                self._errors.append((pos, self.cursor.position(), url))
+            if self._partialLine:
+                # remove the incomplete line and prepend it to the message
+                pos, count, text = self._partialLine
+                self.cursor.setPosition(pos)
+                self.cursor.movePosition(QTextCursor.MoveOperation.End,
+                                         QTextCursor.MoveMode.KeepAnchor)
+                self.cursor.removeSelectedText()
+                del self._errors[count:]
+                message = text + message
+            self.writeErrors(message, type)
+            if message.endswith('\n'):
+                self._partialLine = None
+            else:
+                pos = self.cursor.block().position()
+                count = len(self._errors)
+                while count and self._errors[count - 1][0] >= pos:
+                    count -= 1
+                self._partialLine = (pos, count, message[message.rfind('\n') + 1:])
         else:
+            self._partialLine = None
             super().writeMessage(message, type)
 
+    def writeErrors(self, message, type):
+        """Writes the message, making filename references clickable."""
+        # find filenames in message:
+        #TODO: make the various encoding parameters be read directly
+        # from the Job.
+        # But this should be reviewed in general anyway.
+        parts = iter(errors.message_re.split(message.encode('utf-8')))
+        msg = next(parts).decode('utf-8', 'replace')
+        self.cursor.insertText(msg, self.textFormat(type))
+        enc = sys.getfilesystemencoding()
+
+        for url, path, line, col, msg in zip(*itertools.repeat(parts, 5)):
+            url = url.decode(enc)
+            path = path.decode(enc)
+            msg = msg.decode('utf-8', 'replace')
+            if self._rawView:
+                fmt = QTextCharFormat(self.textFormat(type))
+                display_url = url
+            else:
+                fmt = QTextCharFormat(self.textFormat("link"))
+                display_url = os.path.basename(path)
+            fmt.setAnchor(True)
+            fmt.setAnchorHref(str(len(self._errors)))
+            fmt.setToolTip(_("Click to edit this file"))
+
+            pos = self.cursor.position()
+            self.cursor.insertText(display_url, fmt)
+            self.cursor.insertText(msg, self.textFormat(type))
+            self._errors.append((pos, self.cursor.position(), url))
+
     def slotAnchorClicked(self, url):
         """Called when the user clicks a filename in the log."""
         index = int(url.toString())
@@ -78,7 +78,8 @@ class Document(ly.document.DocumentBase):
 
     Creating a Document is very fast, you do not need to save it. When
     applying the changes, Document starts an editblock, so that the
-    operations appears as one undo-item.
+    operations appears as one undo-item. (Changes that are far apart are
+    applied in separate editblocks that are joined, see apply_changes().)
 
     It is recommended to not nest calls to QTextCursor.beginEditBlock(), as
     the highlighter is not called to update the tokens until the last
@@ -179,20 +180,57 @@ class Document(ly.document.DocumentBase):
         return block.isValid()
 
     def apply_changes(self):
-        """Apply the changes and update the tokens."""
+        """Apply the changes and update the tokens.
+
+        The changes in a block or in a run of adjacent blocks are applied in
+        one edit block, and all edit blocks are joined into one undo-item.
+        QTextDocument emits contentsChange only once per edit block, for the
+        whole range from the first to the last change. So applying groups
+        of changes makes the highlighter (and other listeners) only update
+        the blocks that were actually changed, and not all the blocks in
+        between.
+
+        """
         c = QTextCursor(self._d)
         # record a sensible position for undo
         c.setPosition(self._changes_list[-1][0])
-        c.joinPreviousEditBlock() if self.combine_undo else c.beginEditBlock()
-        try:
-            for start, end, text in self._changes_list:
-                c.movePosition(QTextCursor.MoveOperation.End) if end is None else c.setPosition(end)
-                c.setPosition(start, QTextCursor.MoveMode.KeepAnchor)
-                c.insertText(text)
-        finally:
-            c.endEditBlock()
-            if self.combine_undo is None:
-                self.combine_undo = True
+        join = self.combine_undo
+        for group in self._change_groups():
+            if join:
+                c.joinPreviousEditBlock()
+            else:
+                c.beginEditBlock()
+            try:
+                for start, end, text in group:
+                    c.movePosition(QTextCursor.MoveOperation.End) if end is None else c.setPosition(end)
+                    c.setPosition(start, QTextCursor.MoveMode.KeepAnchor)
+                    c.insertText(text)
+            finally:
+                c.endEditBlock()
+            join = True
+        if self.combine_undo is None:
+            self.combine_undo = True
+
+    def _change_groups(self):
+        """Return the changes of the _changes_list, grouped.
+
+        Every group is a list of changes that touch the same block or
+        adjacent blocks. The groups and the changes in the groups have the
+        same order as in the _changes_list, from the end of the document to
+        the start.
+
+        """
+        d = self._d
+        groups = []
+        first = 0
+        for change in self._changes_list:
+            start, end, text = change
+            last = d.blockCount() - 1 if end is None else d.findBlock(end).blockNumber()
+            if not groups or last < first - 1:
+                groups.append([])
+            groups[-1].append(change)
+            first = d.findBlock(start).blockNumber()
+        return groups
 
     def tokens(self, block):
         """Return the tuple of tokens of the specified block."""
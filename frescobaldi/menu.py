@@ -148,7 +148,10 @@ def menu_file_import(mainwindow):
     m.addSeparator()
     if app.is_git_controlled() or QSettings().value("experimental-features", False, bool):
         m.addAction(acfe.export_audio)
+        m.addAction(acfe.export_all_audio)
+        m.addAction(acfe.export_session_audio)
         m.addAction(acfe.export_musicxml)
+        m.addAction(acfe.export_session_musicxml)
     m.addAction(ac.export_colored_html)
     return m
 
@@ -22,6 +22,7 @@ A MIDI Player.
 
 
 import collections
+import math
 import time
 import threading
 
@@ -33,9 +34,16 @@ class Player:
 
     Use set_output() to set a MIDI output instance (see output.py).
     You can override: timer_midi_time(), timer_start() and timer_stop()
-    to use another timing source than the Python threading.Timer instances.
+    to use another timing source than the built-in Scheduler thread.
+
+    Events that are due within tick msec of each other are handled in one
+    go. The deviation of the actual from the scheduled time of every event
+    is measured, see jitter().
 
     """
+    # events due within this many msec are handled together
+    tick = 0.5
+
     def __init__(self):
         self._song = None
         self._events = []
@@ -46,6 +54,8 @@ class Player:
         self._tempo_factor = 1.0
         self._output = None
         self._last_exception = None
+        self._timer = None
+        self._jitter = JitterStats()
 
     def set_output(self, output):
         """Sets an Output instance that handles the MIDI events.
@@ -136,6 +146,14 @@ class Player:
         """Returns the tempo factor (by default: 1.0)."""
         return self._tempo_factor
 
+    def jitter(self):
+        """Returns the JitterStats of the current or last playback.
+
+        The statistics are reset every time playback is started.
+
+        """
+        return self._jitter
+
     def seek(self, time):
         """Goes to the specified time (in msec)."""
         pos = 0
@@ -281,11 +299,11 @@ class Player:
     def timer_midi_time(self):
         """Should return a continuing time value in msec, used while playing.
 
-        The default implementation returns the time in msec from the Python
-        time module.
+        The default implementation returns the time in msec from the
+        monotonic high-resolution clock of the Python time module.
 
         """
-        return int(time.time() * 1000)
+        return time.perf_counter() * 1000
 
     def timer_schedule(self, delay, sync=True):
         """Schedules the upcoming event.
@@ -303,15 +321,14 @@ class Player:
 
     def timer_start(self, msec):
         """Starts the timer to fire once, the specified msec from now."""
-        self._timer = None
-        self._timer = threading.Timer(msec / 1000.0, self.timer_timeout)
-        self._timer.start()
+        if not self._timer:
+            self._timer = Scheduler()
+        self._timer.start(msec / 1000.0, self.timer_timeout)
 
     def timer_stop(self):
         """Stops the timer."""
         if self._timer:
             self._timer.cancel()
-            self._timer = None
 
     def timer_offset(self):
         """Returns the time before the next event.
@@ -325,6 +342,7 @@ class Player:
         """Starts playing by starting the timer for the first upcoming event."""
         reset = self.current_time() == 0
         self._playing = True
+        self._jitter.reset()
         self.start_event()
         if reset and self._output:
             try:
@@ -336,17 +354,24 @@ class Player:
     def timer_timeout(self):
         """Called when the timer times out.
 
-        Handles an event and schedules the next.
+        Handles an event and schedules the next. Events that are due within
+        tick msec from now are handled right away.
         If the end of a song is reached, calls finish_event()
 
         """
-        offset = self.next_event()
-        if offset:
-            self.timer_schedule(offset)
-        else:
-            self._offset = 0
-            self._playing = False
-            self.finish_event()
+        now = self.timer_midi_time()
+        while True:
+            self._jitter.add(now - self._sync_time)
+            offset = self.next_event()
+            if not offset:
+                self._offset = 0
+                self._playing = False
+                self.finish_event()
+                return
+            self._sync_time += offset / self._tempo_factor
+            if not self._playing or self._sync_time - now > self.tick:
+                break
+        self.timer_start(max(0, self._sync_time - self.timer_midi_time()))
 
     def timer_stop_playing(self):
         self.timer_stop()
@@ -355,6 +380,116 @@ class Player:
         self.stop_event()
 
 
+class Scheduler:
+    """Calls a function at a specified time from a single long-lived thread.
+
+    Only one call can be pending; start() replaces a pending call. The
+    thread waits on a condition until shortly before the due time and then
+    polls the monotonic clock, which is much more precise than the
+    resolution of the operating system timers. When it has been idle for
+    idle seconds, the thread exits; it is restarted when needed.
+
+    """
+    # seconds before the due time to start polling the clock
+    spin = 0.002
+
+    def __init__(self, idle=10.0):
+        self._idle = idle
+        self._cond = threading.Condition()
+        self._thread = None
+        self._deadline = None
+        self._callback = None
+        self._generation = 0
+
+    def start(self, delay, callback):
+        """Calls callback (without arguments) delay seconds from now."""
+        with self._cond:
+            self._deadline = time.perf_counter() + delay
+            self._callback = callback
+            self._generation += 1
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self):
+        """Cancels the pending call, if any."""
+        with self._cond:
+            self._deadline = None
+            self._callback = None
+            self._generation += 1
+            self._cond.notify()
+
+    def _run(self):
+        """(Private) The main loop of the thread."""
+        cond = self._cond
+        while True:
+            with cond:
+                while True:
+                    if self._deadline is None:
+                        if not cond.wait(self._idle) and self._deadline is None:
+                            self._thread = None
+                            return
+                        continue
+                    remaining = self._deadline - time.perf_counter()
+                    if remaining <= self.spin:
+                        break
+                    cond.wait(remaining - self.spin)
+                deadline = self._deadline
+                generation = self._generation
+            while time.perf_counter() < deadline:
+                time.sleep(0)
+            with cond:
+                if generation != self._generation:
+                    # cancelled or rescheduled meanwhile
+                    continue
+                callback = self._callback
+                self._deadline = None
+                self._callback = None
+            callback()
+
+
+class JitterStats:
+    """Statistics about the deviation (in msec) of the actual time an event
+    was handled from the time it was scheduled.
+
+    Positive values mean the event was late.
+
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clears the statistics."""
+        self.count = 0
+        self.mean = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        """Adds a measured value."""
+        self.count += 1
+        if self.count == 1:
+            self.min = self.max = value
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def stdev(self):
+        """Returns the standard deviation."""
+        if self.count > 1:
+            return math.sqrt(self._m2 / (self.count - 1))
+        return 0.0
+
+    def __repr__(self):
+        return (f'<JitterStats count={self.count} mean={self.mean:.3f} '
+                f'stdev={self.stdev():.3f} min={self.min:.3f} max={self.max:.3f}>')
+
+
 class Event:
     """Any event (MIDI, Time and/or Beat).
 
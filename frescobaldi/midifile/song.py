@@ -21,6 +21,7 @@ midifile.song -- structures MIDI file data as a song.
 """
 
 
+import bisect
 import collections
 
 from . import event
@@ -115,7 +116,12 @@ def iter_events_dict(evs):
 
 
 class TempoMap:
-    """Converts midi time to real time in microseconds."""
+    """Converts midi time to real time in microseconds.
+
+    The real time at every tempo change is computed beforehand, so a single
+    conversion only needs a bisection in the list of tempo changes.
+
+    """
     def __init__(self, d, division):
         """Initialize our tempo map based on events d and division."""
         # are the events one list (single-track) or a dict (per-track)?
@@ -130,24 +136,51 @@ class TempoMap:
                         break
         if not times or times[0][0] != 0:
             times.insert(0, (0, 500000))
+        # the MIDI times of the tempo changes, and the real time at every
+        # change (in microseconds, not yet divided by the division)
+        self._midi_times = [t for t, tempo in times]
+        self._real_times = real_times = [0]
+        for (t0, tempo), (t1, _) in zip(times, times[1:]):
+            real_times.append(real_times[-1] + (t1 - t0) * tempo)
 
     def real_time(self, midi_time):
         """Returns the real time in microseconds for the given MIDI time."""
-        real_time = 0
-        times = self.times
-        for i in range(1, len(times)):
-            if times[i][0] >= midi_time:
-                real_time += (midi_time - times[i-1][0]) * times[i-1][1]
-                break
-            real_time += (times[i][0] - times[i-1][0]) * times[i-1][1]
-        else:
-            real_time += (midi_time - times[-1][0]) * times[-1][1]
-        return real_time // self.division
+        i = max(0, bisect.bisect_right(self._midi_times, midi_time) - 1)
+        t, tempo = self.times[i]
+        return (self._real_times[i] + (midi_time - t) * tempo) // self.division
 
     def msec(self, midi_time):
         """Returns the real time in milliseconds."""
         return self.real_time(midi_time) // 1000
 
+    def real_times(self, midi_times):
+        """Returns a list with the real time in microseconds for every MIDI
+        time in the iterable midi_times.
+
+        The MIDI times should be in ascending order, then the tempo changes
+        are walked only once. Otherwise every time is looked up separately.
+
+        """
+        times, real_times, division = self.times, self._real_times, self.division
+        last = len(times) - 1
+        i = 0
+        prev = 0
+        result = []
+        for midi_time in midi_times:
+            if midi_time < prev:
+                i = max(0, bisect.bisect_right(self._midi_times, midi_time) - 1)
+            prev = midi_time
+            while i < last and times[i+1][0] <= midi_time:
+                i += 1
+            t, tempo = times[i]
+            result.append((real_times[i] + (midi_time - t) * tempo) // division)
+        return result
+
+    def msecs(self, midi_times):
+        """Returns a list with the real time in milliseconds for every MIDI
+        time in the iterable midi_times. See real_times()."""
+        return [t // 1000 for t in self.real_times(midi_times)]
+
 
 def beats(d, division):
     """Yields tuples for every beat in the events dictionary d.
@@ -215,12 +248,15 @@ class Song:
 
         self.beats = b = []
         measnum = 0
-        for midi_time, beat, num, den in beats(self.events, division):
+        beat_list = list(beats(self.events, division))
+        for msec, (midi_time, beat, num, den) in zip(
+                t.msecs(midi_time for midi_time, *rest in beat_list), beat_list):
             if beat == 1:
                 measnum += 1
-            b.append((t.msec(midi_time), measnum, beat, num, den))
-        self.music = [(t.msec(midi_time), evs)
-                      for midi_time, evs in sorted(self.events.items())]
+            b.append((msec, measnum, beat, num, den))
+        events = sorted(self.events.items())
+        self.music = list(zip(t.msecs(midi_time for midi_time, evs in events),
+                              (evs for midi_time, evs in events)))
 
     def beat(self, time):
         """Returns (time, measnum, beat, num, den) for the beat at time."""
@@ -80,16 +80,15 @@ class MusicPosition(plugin.ViewSpacePlugin):
             except RuntimeError:
                 # This happens if the window is closed before the timer fires
                 return
-            import documentinfo
-            m = documentinfo.music(d)
+            import timeindex
             import ly.duration
             if c.hasSelection():
                 cursortools.strip_selection(c)
-                length = m.time_length(c.selectionStart(), c.selectionEnd())
+                length = timeindex.time_length(d, c.selectionStart(), c.selectionEnd())
                 text = _("Length: {length}").format(
                     length=ly.duration.format_fraction(length)) if length is not None else ''
             else:
-                pos = m.time_position(c.position())
+                pos = timeindex.time_position(d, c.position())
                 text = _("Pos: {pos}").format(
                     pos=ly.duration.format_fraction(pos)) if pos is not None else ''
             self._label.setText(text)
@@ -28,8 +28,6 @@ import os
 import sys
 import weakref
 
-import qpageview.locking
-
 import util
 import textedit
 import pointandclick
@@ -42,6 +40,11 @@ _cache = weakref.WeakKeyDictionary()
 
 
 def links(document):
+    """Return the Links for the qpageview Document.
+
+    The links are loaded in the background, see pointandclick.Loader.
+
+    """
     # the backend object is replaced on every load
     # of the pdf, which makes it a suitable cache key
     key = document.document()
@@ -50,18 +53,16 @@ def links(document):
         return _cache[key]
     except KeyError:
         l = _cache[key] = Links()
-        with l:
-            with qpageview.locking.lock(document):
-                for num, page in enumerate(document.pages()):
-                    for link in page.links():
-                        t = textedit.link(link.url)
-                        if t:
-                            filename = util.normpath(t.filename)
-                            area = QRectF(QPointF(*link.area[0:2]), QPointF(*link.area[2:4]))
-                            l.add_link(filename, t.line, t.column, (num, area))
+        l.loader = pointandclick.Loader(l, document, _destination)
+        l.loader.start()
         return l
 
 
+def _destination(num, area):
+    """Return the destination stored in the Links for a link area."""
+    return (num, QRectF(QPointF(*area[0:2]), QPointF(*area[2:4])))
+
+
 class Links(pointandclick.Links):
     """Stores all the links of a PDF document sorted by URL and text position.
 
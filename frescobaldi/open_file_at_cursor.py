@@ -30,6 +30,7 @@ import re
 from PyQt6.QtCore import QUrl 
 
 import documentinfo
+import includeresolver
 import browseriface
 
 # regular expression for finding \include expressions
@@ -68,11 +69,9 @@ def includeTarget(cursor):
     targets = []
     # iterating over the search paths, find the first combination pointing to an existing file
     for f in fnames:
-        for p in path:
-            name = os.path.normpath(os.path.join(p, f))
-            if os.path.exists(name) and not os.path.isdir(name):
-                targets.append(name)
-                continue
+        name = includeresolver.find(f, path)
+        if name:
+            targets.append(name)
     return targets
 
 def filenames_at_cursor(cursor, existing=True):
@@ -106,15 +105,12 @@ def filenames_at_cursor(cursor, existing=True):
     # find all docs, trying all include paths
     filenames = []
     for f in fnames:
-        for p in path:
-            name = os.path.normpath(os.path.join(p, f))
-            if os.access(name, os.R_OK):
-                filenames.append(name)
-                break
-        else:
-            if not existing:
-                name = os.path.normpath(os.path.join(directory, f))
-                filenames.append(name)
+        name = includeresolver.find(f, path)
+        if name:
+            filenames.append(name)
+        elif not existing:
+            name = os.path.normpath(os.path.join(directory, f))
+            filenames.append(name)
     return filenames
 
 def open_file_at_cursor(mainwindow, cursor=None):
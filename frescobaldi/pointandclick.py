@@ -24,22 +24,35 @@ Generic Point and Click handling.
 
 import os
 import collections
+import hashlib
+import pickle
+import weakref
 
-from PyQt6.QtCore import QUrl
+from PyQt6.QtCore import QObject, QStandardPaths, QTimer, QUrl
 from PyQt6.QtGui import QTextCursor
 
 import app
 import scratchdir
+import signals
+import textedit
+import util
 import ly.lex.lilypond
 import ly.document
 import lydocument
 
 
 class Links:
-    """Stores point and click links grouped by filename."""
+    """Stores point and click links grouped by filename.
+
+    Links can also be added after finish() has been called, e.g. while they
+    are being loaded in the background by a Loader. They are then added to
+    the bound documents immediately.
+
+    """
     def __init__(self):
         self._links = collections.defaultdict(lambda: collections.defaultdict(list))
         self._docs = {}
+        self._finished = False
 
     def add_link(self, filename, line, column, destination):
         """Add a link.
@@ -49,7 +62,21 @@ class Links:
         destination can be any object that describes where the link points to.
 
         """
-        self._links[filename][(line, column)].append(destination)
+        links = self._links[filename]
+        pos = (line, column)
+        if pos in links:
+            links[pos].append(destination)
+            return
+        dests = links[pos] = [destination]
+        if self._finished:
+            bound = self._docs.get(filename)
+            if bound:
+                bound.add(pos, dests)
+            elif len(links) == 1:
+                # first link to this file, try to bind it
+                d = scratchdir.findDocument(filename)
+                if d:
+                    self.bind(filename, d)
 
     def finish(self):
         """Call this when you are done with adding links.
@@ -61,6 +88,7 @@ class Links:
         On exit, finish() is automatically called.
 
         """
+        self._finished = True
         for filename in self._links:
             d = scratchdir.findDocument(filename)
             if d:
@@ -78,8 +106,9 @@ class Links:
         """Binds the given filename to the given document.
 
         When the document disappears, the binding is removed automatically.
-        While a document is bound, textedit links are stored as QTextCursors,
-        so they keep their position even if the user changes the document.
+        While a document is bound, textedit links are stored as positions
+        that follow the changes, so they keep their position even if the
+        user changes the document.
 
         """
         if filename not in self._docs:
@@ -125,30 +154,164 @@ class Links:
 
 
 class BoundLinks:
-    """Stores links as QTextCursors for a document."""
+    """Stores links as text positions in a document.
+
+    The positions are kept in a sorted array and follow the changes of the
+    document, just like QTextCursors would, but without the cost of
+    creating a QTextCursor for every link and having Qt adjust all of them
+    on every change. QTextCursors are only created on request.
+
+    The positions are stored as a base value and an offset, where the
+    offsets are kept in a Fenwick tree (binary indexed tree), so that
+    shifting all positions after a change takes only O(log n) time.
+
+    """
     def __init__(self, doc, links):
-        """Creates QTextCursor instances for every link, keeps a reference to the document."""
+        """Computes the position of every link, keeps a reference to the document."""
         self.document = doc
-        # make a sorted list of cursors with their [destination, ...] destinations list
-        self._cursor_dict = d = {}              # mapping from (line, col) to QTextCursor
-        self._cursors = cursors = []            # sorted list of the cursors
-        self._destinations = destinations = []  # corresponding list of destinations
+        self._keys = []             # sorted list of the (line, col) tuples
+        self._base = []             # corresponding list of positions
+        self._destinations = []     # corresponding list of destinations
+        self._pending = []          # links added later, see add()
+        self._index = None          # mapping from (line, col) to index
         for pos, dest in sorted(links.items()):
-            line, column = pos
-            b = doc.findBlockByNumber(line - 1)
-            if b.isValid():
-                c = d[pos] = QTextCursor(doc)
-                c.setPosition(b.position() + column)
-                cursors.append(c)
-                destinations.append(dest)
+            self._append(pos, dest)
+        self._tree = [0] * (len(self._base) + 1)
+        doc.contentsChange.connect(self.slotContentsChange)
+
+    def _append(self, pos, destinations):
+        """(Internal) Append a link if its line exists in the document."""
+        line, column = pos
+        b = self.document.findBlockByNumber(line - 1)
+        if b.isValid():
+            self._keys.append(pos)
+            self._base.append(b.position() + column)
+            self._destinations.append(destinations)
+
+    def add(self, pos, destinations):
+        """Add a link at pos (line, column) with the list of destinations.
+
+        Used when links are added after the document has been bound.
+        The position in the document is computed immediately, but the links
+        are sorted in the next time they are needed.
+
+        """
+        line, column = pos
+        b = self.document.findBlockByNumber(line - 1)
+        if b.isValid():
+            self._pending.append((b.position() + column, pos, destinations))
+
+    def _merge(self):
+        """(Internal) Merge links added by add() into the sorted lists.
+
+        The positions of the pending links were computed in add(), so this
+        must be done before the document changes again.
+
+        """
+        pending, self._pending = self._pending, []
+        base = [self._position(i) for i in range(len(self._base))]
+        entries = list(zip(base, self._keys, self._destinations))
+        entries.extend(pending)
+        entries.sort(key=lambda e: e[0])
+        self._base = [e[0] for e in entries]
+        self._keys = [e[1] for e in entries]
+        self._destinations = [e[2] for e in entries]
+        self._tree = [0] * (len(entries) + 1)
+        self._index = None
+
+    def _shift(self, index, amount):
+        """(Internal) Add amount to the positions from index on."""
+        tree = self._tree
+        index += 1
+        while index < len(tree):
+            tree[index] += amount
+            index += index & -index
+
+    def _position(self, index):
+        """(Internal) Return the current position of the link at index."""
+        pos = self._base[index]
+        tree = self._tree
+        index += 1
+        while index:
+            pos += tree[index]
+            index -= index & -index
+        return pos
+
+    def _find(self, position):
+        """(Internal) Return the index of the first link at or after position."""
+        lo, hi = 0, len(self._base)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._position(mid) < position:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slotContentsChange(self, position, removed, added):
+        """Called when the document changes, adjusts the positions.
+
+        Positions after the changed range are shifted and positions before
+        it are not changed. When text is only inserted, links at the
+        insertion point move to after the new text, as with QTextCursor.
+        Links inside a replaced range keep their offset from the start,
+        clipped to the new text. This way changes of only the formatting,
+        which are reported as a range that is removed and added again,
+        keep the links in place.
+
+        """
+        if self._pending:
+            self._merge()
+        count = len(self._base)
+        if removed == 0:
+            self._shift(self._find(position), added)
+            return
+        index = self._find(position)
+        end = position + removed
+        while index < count:
+            pos = self._position(index)
+            if pos >= end:
+                break
+            new = position + min(pos - position, added)
+            if new != pos:
+                self._shift(index, new - pos)
+                self._shift(index + 1, pos - new)
+            index += 1
+        if added != removed:
+            self._shift(index, added - removed)
+
+    def positions(self):
+        """Return the list of link positions in the document, sorted."""
+        if self._pending:
+            self._merge()
+        return [self._position(i) for i in range(len(self._base))]
+
+    def _cursor(self, index):
+        """(Internal) Return a new QTextCursor for the link at index."""
+        c = QTextCursor(self.document)
+        c.setPosition(min(self._position(index), self.document.characterCount() - 1))
+        return c
 
     def cursor(self, line, column):
-        """Returns the QTextCursor for the give line/col."""
-        return self._cursor_dict.get((line, column))
+        """Returns a QTextCursor for the give line/col, or None."""
+        if self._pending:
+            self._merge()
+        if self._index is None:
+            self._index = dict((key, i) for i, key in enumerate(self._keys))
+        index = self._index.get((line, column))
+        if index is not None:
+            return self._cursor(index)
 
     def cursors(self):
-        """Return the list of cursors, sorted on cursor position."""
-        return self._cursors
+        """Return a list of cursors, sorted on cursor position.
+
+        This creates a QTextCursor for every link, use positions() if you
+        only need the positions.
+
+        """
+        if self._pending:
+            self._merge()
+        return [self._cursor(i) for i in range(len(self._base))]
 
     def destinations(self):
         """Return the list of destination lists.
@@ -160,6 +323,8 @@ class BoundLinks:
         document.
 
         """
+        if self._pending:
+            self._merge()
         return self._destinations
 
     def indices(self, cursor):
@@ -175,24 +340,18 @@ class BoundLinks:
         points to the _ending_ point of a slur, beam or phrasing slur.
 
         """
-        cursors = self._cursors
+        if self._pending:
+            self._merge()
 
         def findlink(pos):
-            # binary search in list of cursors
-            lo, hi = 0, len(cursors)
-            while lo < hi:
-                mid = (lo + hi) // 2
-                if pos < cursors[mid].position():
-                    hi = mid
-                else:
-                    lo = mid + 1
-            return lo - 1
+            # index of the last link at or before pos
+            return self._find(pos + 1) - 1
 
         if cursor.hasSelection():
             end = findlink(cursor.selectionEnd() - 1)
             if end >= 0:
                 start = findlink(cursor.selectionStart())
-                if start < 0 or cursors[start].position() < cursor.selectionStart():
+                if start < 0 or self._position(start) < cursor.selectionStart():
                     start += 1
                 if start <= end:
                     return slice(start, end+1)
@@ -202,7 +361,7 @@ class BoundLinks:
         if index < 0:
             return # before all other links
 
-        cur2 = cursors[index]
+        cur2 = self._cursor(index)
         if cur2.position() < cursor.position():
             # is the cursor at an ending token like a slur end?
             prevcol = -1
@@ -232,7 +391,7 @@ class BoundLinks:
                         break
             if found:
                 index = findlink(tokens.block.position() + token.pos)
-                if index < 0 or cursors[index].block() != tokens.block:
+                if index < 0 or self._cursor(index).block() != tokens.block:
                     return
             elif cur2.block() != cursor.block():
                 return False
@@ -240,6 +399,134 @@ class BoundLinks:
         return slice(index, index+1)
 
 
+class Loader(QObject):
+    """Loads the textedit links of a qpageview Document into a Links instance.
+
+    The links are read one page at a time when the event loop is idle, so
+    the user interface is not blocked on large documents, and the links of
+    the pages read so far are immediately available.
+
+    The links are stored in a cache, keyed on the file name, mtime and size
+    of the PDF file, so loading them again (also by another viewer) is
+    instant.
+
+    destination is a callable that gets the page number and the link area
+    and returns the destination to add to the Links.
+
+    """
+    finished = signals.Signal()
+
+    def __init__(self, links, document, destination):
+        super().__init__()
+        self._links = links
+        self._document = weakref.ref(document)
+        self._destination = destination
+        self._page = 0
+        self._pages = None
+        self._data = []
+        self._key = _links_cache_key(document.filename())
+        self._timer = QTimer(timeout=self._loadPage)
+
+    def start(self):
+        """Start loading the links.
+
+        If the links are in the cache, they are all added at once.
+
+        """
+        data = _load_links(self._key)
+        if data is not None:
+            for filename, line, column, num, area in data:
+                self._links.add_link(filename, line, column,
+                                     self._destination(num, area))
+            self._links.finish()
+            self.finished()
+        else:
+            self._links.finish()
+            self._pages = self._document().pages()
+            self._timer.start(0)
+
+    def _loadPage(self):
+        """(internal) Called by the timer, loads the links of one page."""
+        import qpageview.locking
+        document = self._document()
+        if not document or document.pages() is not self._pages:
+            # the document was deleted or reloaded, the data is incomplete
+            self._timer.stop()
+            self._pages = None
+            self.finished()
+            return
+        if self._page >= len(self._pages):
+            self._timer.stop()
+            self._pages = None
+            _save_links(self._key, self._data)
+            self.finished()
+            return
+        num = self._page
+        self._page += 1
+        page = self._pages[num]
+        with qpageview.locking.lock(document):
+            links = page.links()
+        for link in links:
+            t = textedit.link(link.url)
+            if t:
+                filename = util.normpath(t.filename)
+                area = tuple(link.area)
+                self._data.append((filename, t.line, t.column, num, area))
+                self._links.add_link(filename, t.line, t.column,
+                                     self._destination(num, area))
+
+
+def _links_cache_dir():
+    """Return the directory where the links of PDF documents are cached."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.CacheLocation), 'pointandclick')
+
+
+def _links_cache_key(filename):
+    """Return the cache file name for a PDF file, or None."""
+    try:
+        stat = os.stat(filename)
+    except (OSError, TypeError, ValueError):
+        return None
+    key = "{}\0{}\0{}".format(filename, stat.st_mtime_ns, stat.st_size)
+    name = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(_links_cache_dir(), name)
+
+
+def _load_links(key):
+    """Return the cached link data for the key, or None."""
+    if key:
+        try:
+            with open(key, 'rb') as f:
+                data = pickle.load(f)
+            os.utime(key)
+        except Exception:
+            return None
+        return data
+
+
+def _save_links(key, data):
+    """Save the link data under key, removing outdated cache files."""
+    if not key:
+        return
+    try:
+        os.makedirs(_links_cache_dir(), exist_ok=True)
+        with open(key + '.part', 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(key + '.part', key)
+    except OSError:
+        return
+    # keep the 100 most recently used files
+    root = _links_cache_dir()
+    try:
+        files = [os.path.join(root, name) for name in os.listdir(root)]
+        files.sort(key=os.path.getmtime)
+        for filename in files[:-100]:
+            os.remove(filename)
+    except OSError:
+        pass
+
+
 def positions(cursor):
     """Return a list of QTextCursors describing the grob the cursor points at.
 
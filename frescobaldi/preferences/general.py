@@ -253,6 +253,8 @@ class SessionsAndFiles(preferences.Group):
         session_layout.addWidget(self.session_lastused, 1, 0, 1, 2)
         session_layout.addWidget(self.session_custom, 2, 0, 1, 1)
         session_layout.addWidget(self.session_combo, 2, 1, 1, 1)
+        self.session_warmup = QCheckBox(toggled=self.changed)
+        session_layout_wrap.addWidget(self.session_warmup)
         session_layout_wrap.addStretch()
 
         self.loadNewCombo()
@@ -307,6 +309,13 @@ class SessionsAndFiles(preferences.Group):
         self.session_none.setText(_("Start with no session"))
         self.session_lastused.setText(_("Start with last used session"))
         self.session_custom.setText(_("Start with session:"))
+        self.session_warmup.setText(_("Load session documents in the background"))
+        self.session_warmup.setToolTip(_(
+            "When a session is opened, only the active document is loaded "
+            "immediately; the other documents are loaded when they are first "
+            "needed.\n"
+            "If checked, they are also loaded one by one in the background "
+            "while Frescobaldi is idle."))
 
     def loadNewCombo(self):
         from snippet import snippets
@@ -358,6 +367,7 @@ class SessionsAndFiles(preferences.Group):
         custom = s.value("custom", "", str)
         if custom in sessionNames:
             self.session_combo.setCurrentIndex(sessionNames.index(custom))
+        self.session_warmup.setChecked(s.value("warmup", False, bool))
         s.endGroup()
         self.tabs.setCurrentIndex(
             s.value("prefs_general_file_tab_index", 0, int)
@@ -395,6 +405,7 @@ class SessionsAndFiles(preferences.Group):
         else:
             startup = "none"
         s.setValue("startup", startup)
+        s.setValue("warmup", self.session_warmup.isChecked())
 
     def saveTabIndex(self):
         s = app.settings("")
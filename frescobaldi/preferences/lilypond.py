@@ -37,13 +37,14 @@ from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import (
     QAbstractItemView, QCheckBox, QDialog, QDialogButtonBox,
     QFileDialog, QGridLayout, QHBoxLayout, QLabel, QLineEdit, QListWidgetItem,
-    QMenu, QMessageBox, QPushButton, QRadioButton, QTabWidget, QVBoxLayout,
-    QWidget)
+    QMenu, QMessageBox, QPushButton, QRadioButton, QSpinBox, QTabWidget,
+    QVBoxLayout, QWidget)
 
 import app
 import userguide
 import qutil
 import icons
+import job.queue
 import preferences
 import lilypondinfo
 import linux
@@ -664,10 +665,27 @@ class Running(preferences.Group):
         self.include.listBox.setDragDropMode(
             QAbstractItemView.DragDropMode.InternalMove)
         self.include.changed.connect(self.changed)
+        self.engraveCache = QCheckBox(toggled=self.changed)
+        self.cacheSize = QSpinBox(minimum=10, maximum=100000, singleStep=50,
+                                  valueChanged=self.changed)
+        self.engraveCache.toggled.connect(self.cacheSize.setEnabled)
+        self.numRunners = QSpinBox(minimum=0, maximum=64, valueChanged=self.changed)
+        self.numRunnersLabel = l = QLabel()
+        l.setBuddy(self.numRunners)
         layout.addWidget(self.saveDocument)
         layout.addWidget(self.deleteFiles)
         layout.addWidget(self.embedSourceCode)
         layout.addWidget(self.noTranslation)
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.numRunnersLabel)
+        hbox.addWidget(self.numRunners)
+        hbox.addStretch(1)
+        layout.addLayout(hbox)
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.engraveCache)
+        hbox.addWidget(self.cacheSize)
+        hbox.addStretch(1)
+        layout.addLayout(hbox)
         layout.addWidget(self.includeLabel)
         layout.addWidget(self.include)
         app.translateUI(self)
@@ -689,6 +707,25 @@ class Running(preferences.Group):
         self.noTranslation.setToolTip(_(
             "If checked, LilyPond's output messages will be in English.\n"
             "This can be useful for bug reports."))
+        self.numRunnersLabel.setText(_("Maximum number of parallel jobs:"))
+        self.numRunners.setSpecialValueText(_("Automatic ({num})").format(
+            num=job.queue.default_num_runners()))
+        self.numRunners.setToolTip(_(
+            "The maximum number of LilyPond processes that are run at the "
+            "same time.\n"
+            "Automatic uses one less than the number of processor cores."))
+        self.numRunnersLabel.setToolTip(self.numRunners.toolTip())
+        self.engraveCache.setText(_("Cache engraving results, up to:"))
+        self.engraveCache.setToolTip(_(
+            "If checked, the output files of preview and publish jobs are "
+            "stored in a cache.\n"
+            "When a document and its included files have not changed, the "
+            "output is restored\nfrom the cache instead of running "
+            "LilyPond again."))
+        self.cacheSize.setSuffix(" " + _("MB"))
+        self.cacheSize.setToolTip(_(
+            "The maximum size of the engraving cache. When it is exceeded, "
+            "the least recently used results are removed."))
         self.includeLabel.setText(_("LilyPond include path:"))
 
     def loadSettings(self):
@@ -697,6 +734,10 @@ class Running(preferences.Group):
         self.deleteFiles.setChecked(s.value("delete_intermediate_files", True, bool))
         self.embedSourceCode.setChecked(s.value("embed_source_code", False, bool))
         self.noTranslation.setChecked(s.value("no_translation", False, bool))
+        self.numRunners.setValue(s.value("num_runners", 0, int))
+        self.engraveCache.setChecked(s.value("engrave_cache", False, bool))
+        self.cacheSize.setValue(s.value("engrave_cache_size", 500, int))
+        self.cacheSize.setEnabled(self.engraveCache.isChecked())
         include_path = qsettings.get_string_list(s, "include_path")
         self.include.setValue(include_path)
 
@@ -706,6 +747,9 @@ class Running(preferences.Group):
         s.setValue("delete_intermediate_files", self.deleteFiles.isChecked())
         s.setValue("embed_source_code", self.embedSourceCode.isChecked())
         s.setValue("no_translation", self.noTranslation.isChecked())
+        s.setValue("num_runners", self.numRunners.value())
+        s.setValue("engrave_cache", self.engraveCache.isChecked())
+        s.setValue("engrave_cache_size", self.cacheSize.value())
         s.setValue("include_path", self.include.value())
 
 
@@ -92,7 +92,7 @@ def restoreSession(key):
             doc = document.EditorDocument()
         else:
             try:
-                doc = app.openUrl(url)
+                doc = app.openUrl(url, deferred=True)
             except OSError:
                 pass
         settings.endGroup()
@@ -121,6 +121,9 @@ def restoreSession(key):
         win = mainwindow.MainWindow()
         win.show()
         app.qApp.processEvents()    # init (re)size dock tools
+    ## load the other documents in the background
+    import sessions
+    sessions.warmup(app.documents)
 
 
 @app.oninit
@@ -26,9 +26,10 @@ A session is a global list of open documents, with some additional preferences s
 """
 
 
+import collections
 import itertools
 
-from PyQt6.QtCore import QSettings, QUrl
+from PyQt6.QtCore import QSettings, QTimer, QUrl
 
 import app
 import util
@@ -106,7 +107,7 @@ def loadSession(name):
     docs = []
     for url in urls:
         try:
-            doc = app.openUrl(url)
+            doc = app.openUrl(url, deferred=True)
         except OSError:
             pass
         else:
@@ -115,8 +116,37 @@ def loadSession(name):
     if docs:
         if active not in range(len(docs)):
             active = 0
+        docs[active].ensureLoaded()
+        warmup(docs)
         return docs[active]
 
+def warmup(documents):
+    """Load the documents that are not loaded yet in the background.
+
+    The documents are loaded one at a time when the application is idle.
+    This is only done if enabled in the Preferences.
+
+    """
+    if QSettings().value("session/warmup", False, bool):
+        docs = [doc for doc in documents if not doc.isLoaded()]
+        if docs:
+            _warmup_queue.extend(docs)
+            if not _warmup_timer.isActive():
+                _warmup_timer.start(500)
+
+def _warmup_next():
+    """Load the next document in the warm-up queue."""
+    while _warmup_queue:
+        doc = _warmup_queue.popleft()
+        if doc in app.documents and not doc.isLoaded():
+            doc.ensureLoaded()
+            break
+    if _warmup_queue:
+        _warmup_timer.start(0)
+
+_warmup_queue = collections.deque()
+_warmup_timer = QTimer(singleShot=True, timeout=_warmup_next)
+
 def saveSession(name, documents, activeDocument=None):
     """Saves the list of documents and which one is active."""
     # only save the documents that have an url
@@ -34,10 +34,13 @@ A special Signal variation is also available, the SignalContext. Methods or
 functions connected to this signal should return context managers which are
 entered when the signal is entered in a context (with) block.
 
+For debugging, the calls of all connected slots can be measured, see
+start_profiling().
+
 """
 
-import bisect
 import contextlib
+import time
 import types
 import weakref
 import sys
@@ -46,6 +49,52 @@ import sys
 __all__ = ["Signal", "SignalContext"]
 
 
+# maps slot functions to [calls, seconds] while profiling, see start_profiling()
+_profile = None
+
+
+def start_profiling():
+    """Starts measuring the slot calls of all signals.
+
+    From now on, every call of a slot by an emitted Signal is counted and
+    timed, until stop_profiling() is called. See profile() to get the results.
+
+    """
+    global _profile
+    if _profile is None:
+        _profile = {}
+
+
+def stop_profiling():
+    """Stops measuring the slot calls, and returns the results of profile()."""
+    global _profile
+    result = profile()
+    _profile = None
+    return result
+
+
+def profile():
+    """Returns a list of (name, calls, seconds) tuples with the measured slots.
+
+    The list is sorted on the cumulative time, the most expensive slot first.
+
+    """
+    if not _profile:
+        return []
+    result = [(_slot_name(func), calls, seconds)
+              for func, (calls, seconds) in _profile.items()]
+    result.sort(key=lambda r: r[2], reverse=True)
+    return result
+
+
+def _slot_name(func):
+    """Returns a readable name for a slot function."""
+    try:
+        return func.__module__ + '.' + func.__qualname__
+    except (AttributeError, TypeError):
+        return repr(func)
+
+
 class Signal:
     """A Signal can be emitted and receivers (slots) can be connected to it.
 
@@ -96,7 +145,8 @@ class Signal:
         the owner dies, the connection is removed.
 
         """
-        self.listeners = []
+        self._listeners = {}    # every listener is mapped to itself
+        self._sorted = ()       # the listeners sorted on priority, or None
         self._blocked = False
         self._owner = weakref.ref(owner) if owner else lambda: None
 
@@ -117,6 +167,18 @@ class Signal:
         """Returns the owner of this Signal, if any."""
         return self._owner()
 
+    @property
+    def listeners(self):
+        """The connected listeners, in the order they are called.
+
+        Listeners with the same priority are called in the order they were
+        connected.
+
+        """
+        if self._sorted is None:
+            self._sorted = tuple(sorted(self._listeners, key=lambda l: l.priority))
+        return self._sorted
+
     def connect(self, slot, priority=0, owner=None):
         """Connects a method or function ('slot') to this Signal.
 
@@ -139,7 +201,7 @@ class Signal:
 
         """
         key = self.makeListener(slot, owner)
-        if key not in self.listeners:
+        if key not in self._listeners:
             key.add(self, priority)
 
     def disconnect(self, func):
@@ -148,15 +210,22 @@ class Signal:
         No exception is raised if there wasn't a connection.
 
         """
-        key = self.makeListener(func)
-        try:
-            self.listeners.remove(key)
-        except ValueError:
-            pass
+        self.removeListener(self.makeListener(func))
 
     def clear(self):
         """Removes all connected slots."""
-        del self.listeners[:]
+        self._listeners.clear()
+        self._sorted = ()
+
+    def addListener(self, listener):
+        """(Internal) Adds a listener, used by ListenerBase.add()."""
+        self._listeners[listener] = listener
+        self._sorted = None
+
+    def removeListener(self, listener):
+        """(Internal) Removes a listener, if it is connected."""
+        if self._listeners.pop(listener, None) is not None:
+            self._sorted = None
 
     @contextlib.contextmanager
     def blocked(self):
@@ -187,8 +256,12 @@ class Signal:
 
         """
         if not self._blocked:
-            for l in self.listeners[:]:
-                l.call(args, kwargs)
+            if _profile is None:
+                for l in self.listeners:
+                    l.call(args, kwargs)
+            else:
+                for l in self.listeners:
+                    _profiled_call(l, args, kwargs)
 
     __call__ = emit
 
@@ -221,8 +294,10 @@ class SignalContext(Signal):
     def emit(self, *args, **kwargs):
         if self._blocked:
             managers = []
-        else:
+        elif _profile is None:
             managers = [l.call(args, kwargs) for l in self.listeners]
+        else:
+            managers = [_profiled_call(l, args, kwargs) for l in self.listeners]
         return self.signalcontextmanager(managers)
 
     __call__ = emit
@@ -265,12 +340,12 @@ class ListenerBase:
 
     def add(self, signal, priority):
         self.priority = priority
-        bisect.insort_right(signal.listeners, self)
+        signal.addListener(self)
         if self.obj is not None:
             def remove(wr, selfref=weakref.ref(self), sigref=weakref.ref(signal)):
                 self, signal = selfref(), sigref()
                 if self and signal:
-                    signal.listeners.remove(self)
+                    signal.removeListener(self)
             self.obj = weakref.ref(self.obj, remove)
 
         # determine the number of arguments allowed
@@ -302,6 +377,9 @@ class MethodListener(ListenerBase):
     def __eq__(self, other):
         return self.__class__ is other.__class__ and self.objid == other.objid and self.func is other.func
 
+    def __hash__(self):
+        return hash((self.objid, id(self.func)))
+
     def call(self, args, kwargs):
         if self.obj is not None:
             obj = self.obj()
@@ -317,7 +395,21 @@ class FunctionListener(ListenerBase):
     def __eq__(self, other):
         return self.__class__ is other.__class__ and self.func is other.func
 
+    def __hash__(self):
+        return hash(id(self.func))
+
     def call(self, args, kwargs):
         return self.func(*args[self.argslice], **kwargs)
 
 
+def _profiled_call(listener, args, kwargs):
+    """Calls the listener and records the call and the time it took."""
+    start = time.perf_counter()
+    try:
+        return listener.call(args, kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        if _profile is not None:
+            entry = _profile.setdefault(listener.func, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
@@ -0,0 +1,334 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+An index of the symbols defined in documents and the files they include.
+
+For every document and file the index stores the positions of the defined
+identifiers, the defined markup commands, the toplevel \\score commands
+and the \\include commands. Open documents are indexed from their contents
+when they are needed after a change, other files when they are needed for
+the first time or after their modification time has changed.
+
+The entries of the files are saved when Frescobaldi quits and loaded again
+on the next run, so included files only need to be lexed again when they
+have changed.
+
+Finding a definition, the identifiers in included files or the name of
+the definition at a position only uses the index; no music tree is built
+and the included files are not read again.
+"""
+
+
+import bisect
+import collections
+import itertools
+import os
+import pickle
+
+from PyQt6.QtCore import QStandardPaths, QUrl
+
+import app
+import documentinfo
+import fileinfo
+import plugin
+import ly.lex
+import ly.lex.lilypond
+import ly.lex.scheme   # needed by DocInfo.markup_definitions()
+import ly.pkginfo
+
+
+# the kinds of the entries
+DEFINITION = 'definition'   # name = ...
+MARKUP = 'markup'           # name = \markup ... or #(define-markup-command (name ...
+SCORE = 'score'             # a \score at the start of a line
+INCLUDE = 'include'         # \include "name"
+
+# maximum number of files that are saved
+MAX_ENTRIES = 5000
+
+# change this when the format of the stored data changes
+_format = 3
+
+
+Definition = collections.namedtuple('Definition', 'filename document position')
+Definition.__doc__ = """The location of a definition.
+
+filename is the real path of the file or None if the definition is in an
+unsaved document, document the open Document containing the definition or
+None and position the position of the definition.
+
+"""
+
+
+class Symbols:
+    """The symbols of one document or file.
+
+    The entries attribute is a tuple of (position, kind, name) tuples, sorted
+    on position. For INCLUDE entries, the name is the argument of the
+    \\include command.
+
+    """
+    def __init__(self, entries=()):
+        self.entries = entries
+        self._positions = [e[0] for e in entries]
+
+    @classmethod
+    def from_docinfo(cls, dinfo):
+        """Return the Symbols of a ly.docinfo.DocInfo instance."""
+        tokens = dinfo.tokens
+        doc = dinfo.document
+
+        def toplevel(i):
+            """Return True if token i starts a line (maybe after an indent)
+            in the toplevel context."""
+            j = i - 1 if i and tokens[i-1].isspace() and not tokens[i-1].endswith('\n') else i
+            return (j == 0 or tokens[j-1].endswith('\n')) and isinstance(
+                doc.state(doc.block(tokens[i].pos)).parser(),
+                ly.lex.lilypond.ParseGlobal)
+
+        entries = [(t.pos, DEFINITION, str(t)) for t in dinfo.definitions()]
+        entries.extend((t.pos, MARKUP, str(t)) for t in dinfo.markup_definitions())
+        # DocInfo only finds the definitions in the first column
+        for i in dinfo.find_all(None, ly.lex.lilypond.Name):
+            if i and tokens[i-1] != '\n' and toplevel(i):
+                t = tokens[i]
+                entries.append((t.pos, DEFINITION, str(t)))
+                for u in tokens[i+1:i+6]:
+                    if u == '\\markup':
+                        entries.append((t.pos, MARKUP, str(t)))
+                    elif u == '=' or u.isspace():
+                        continue
+                    break
+        for i in dinfo.find_all('\\score', ly.lex.lilypond.Score):
+            if toplevel(i):
+                entries.append((tokens[i].pos, SCORE, '\\score'))
+        for i in dinfo.find_all('\\include', ly.lex.lilypond.Keyword):
+            args = iter(tokens[i+1:i+10])
+            for t in args:
+                if not isinstance(t, (ly.lex.Space, ly.lex.Comment)):
+                    if t == '"':
+                        name = ''.join(itertools.takewhile(lambda t: t != '"', args))
+                        entries.append((tokens[i].pos, INCLUDE, name))
+                    break
+        entries.sort()
+        return cls(tuple(entries))
+
+    def index(self, end=None):
+        """Return the number of entries before position end (all if None)."""
+        if end is None:
+            return len(self.entries)
+        return bisect.bisect_left(self._positions, end)
+
+
+class SymbolIndex:
+    """Keeps the Symbols of files, and checks their modification time."""
+    def __init__(self):
+        self._files = {}        # filename: (mtime, size, Symbols)
+        self._changed = False
+
+    def symbols(self, filename):
+        """Return the Symbols of the file, or None if it can't be read."""
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        entry = self._files.pop(filename, None)
+        if not entry or entry[:2] != (stat.st_mtime, stat.st_size):
+            try:
+                symbols = Symbols.from_docinfo(fileinfo.docinfo(filename))
+            except (OSError, UnicodeError):
+                return None
+            entry = (stat.st_mtime, stat.st_size, symbols)
+            self._changed = True
+        # keep the most recently used files at the end
+        self._files[filename] = entry
+        return entry[2]
+
+    def load(self):
+        """Load the saved entries."""
+        try:
+            with open(index_file(), 'rb') as f:
+                if pickle.load(f) != (_format, ly.pkginfo.version):
+                    return
+                files = pickle.load(f)
+        except Exception:
+            # any error (also when unpickling) means the index is not usable
+            return
+        for filename, (mtime, size, entries) in files.items():
+            self._files.setdefault(filename, (mtime, size, Symbols(entries)))
+
+    def save(self):
+        """Save the entries of the files that still exist, if changed."""
+        if not self._changed:
+            return
+        files = {}
+        for filename, (mtime, size, symbols) in reversed(self._files.items()):
+            if len(files) >= MAX_ENTRIES:
+                break
+            if os.path.isfile(filename):
+                files[filename] = (mtime, size, symbols.entries)
+        filename = index_file()
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename + '.part', 'wb') as f:
+                pickle.dump((_format, ly.pkginfo.version), f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(dict(reversed(files.items())), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(filename + '.part', filename)
+        except (OSError, pickle.PicklingError):
+            return
+        self._changed = False
+
+
+class DocumentSymbols(plugin.DocumentPlugin):
+    """Keeps the Symbols of an open Document."""
+    def __init__(self, doc):
+        import document
+        if doc.__class__ == document.EditorDocument:
+            doc.contentsChanged.connect(self._reset)
+            doc.closed.connect(self._reset)
+        self._reset()
+
+    def _reset(self):
+        """Called when the document is changed."""
+        self._symbols = None
+
+    def symbols(self):
+        """Return the Symbols of our document."""
+        if self._symbols is None:
+            self._symbols = Symbols.from_docinfo(
+                documentinfo.docinfo(self.document()))
+        return self._symbols
+
+
+_index = None
+
+
+def index():
+    """Return the global SymbolIndex, loading the saved entries the first time."""
+    global _index
+    if _index is None:
+        _index = SymbolIndex()
+        _index.load()
+        app.aboutToQuit.connect(_index.save)
+    return _index
+
+
+def index_file():
+    """Return the file name the index is saved to."""
+    return os.path.join(QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.CacheLocation), 'symbolindex')
+
+
+def document_symbols(doc):
+    """Return the Symbols of the document."""
+    return DocumentSymbols.instance(doc).symbols()
+
+
+def file_symbols(filename):
+    """Return the Symbols of the file (a real path), or None.
+
+    If the file is open and loaded, the Symbols of the document are returned.
+
+    """
+    doc = open_document(filename)
+    if doc:
+        return document_symbols(doc)
+    return index().symbols(filename)
+
+
+def open_document(filename):
+    """Return the loaded Document of the file, or None if not open."""
+    doc = app.findDocument(QUrl.fromLocalFile(filename))
+    if doc and doc.isLoaded():
+        return doc
+
+
+def entries(doc, end=None):
+    """Yield (filename, document, position, kind, name) for all entries.
+
+    The entries of the document before position end are yielded, and every
+    \\include entry is followed by the entries of the included file (if it
+    was found and not already included). The name of an INCLUDE entry is the
+    real path of the included file.
+
+    filename is the real path of the file the entry is in (None for an
+    unsaved document) and document the open Document (or None for a file
+    that is not open).
+
+    """
+    filename = doc.url().toLocalFile()
+    basedir = os.path.dirname(filename) if filename else None
+    filename = os.path.realpath(filename) if filename else None
+    include_path = documentinfo.info(doc).includepath()
+    seen = {filename}
+
+    def walk(filename, doc, symbols, end):
+        directory = os.path.dirname(filename) if filename else basedir
+        for pos, kind, name in symbols.entries[:symbols.index(end)]:
+            if kind != INCLUDE:
+                yield filename, doc, pos, kind, name
+                continue
+            path = fileinfo.find_include(name, directory, basedir, include_path)
+            if path and path not in seen:
+                seen.add(path)
+                s = file_symbols(path)
+                if s:
+                    yield filename, doc, pos, kind, path
+                    yield from walk(path, open_document(path), s, None)
+
+    return walk(filename, doc, document_symbols(doc), end)
+
+
+def include_names(doc, kind, end=None):
+    """Yield the names of the kind defined in the files included by the document.
+
+    Only the files that are included before position end are used.
+
+    """
+    for f, d, pos, k, name in entries(doc, end):
+        if k == kind and d is not doc:
+            yield name
+
+
+def find_definition(doc, name, end=None):
+    """Return the Definition of the identifier or markup command name.
+
+    The last definition before position end is returned, also looking in the
+    files included before end. Returns None if there is no definition.
+
+    """
+    result = None
+    for f, d, pos, kind, n in entries(doc, end):
+        if n == name and kind in (DEFINITION, MARKUP):
+            result = Definition(f, d, pos)
+    return result
+
+
+def definition_at(doc, position):
+    """Return the name of the definition the position is in.
+
+    Returns "\\score" if the position is in a toplevel \\score, and None
+    if no definition precedes the position.
+
+    """
+    symbols = document_symbols(doc)
+    for pos, kind, name in reversed(symbols.entries[:symbols.index(position + 1)]):
+        if kind in (DEFINITION, SCORE):
+            return name
@@ -0,0 +1,244 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Fast differences between (large) texts.
+
+Comparing two texts character by character with difflib.SequenceMatcher
+takes quadratic time in the worst case, which is very slow for large
+documents. This module compares texts in two steps: first the lines are
+compared using the patience diff algorithm, and then only the lines that
+differ are compared character by character.
+
+The results are in the same format as those of difflib, so they can be used
+as a drop-in replacement.
+"""
+
+
+import bisect
+import collections
+import difflib
+
+
+# changed ranges longer than this (in characters) are not compared character
+# by character as a whole, but line by line
+MAX_REFINE = 2000
+
+
+class LineMatcher(difflib.SequenceMatcher):
+    """A difflib.SequenceMatcher that compares two lists of lines.
+
+    The matching blocks are computed with the patience diff algorithm, which
+    takes O(n log n) time for typical texts. All other methods, like
+    get_opcodes() and get_grouped_opcodes(), are inherited from
+    SequenceMatcher.
+
+    """
+    def __init__(self, a=(), b=()):
+        super().__init__(None, a, b, False)
+
+    def get_matching_blocks(self):
+        if self.matching_blocks is None:
+            self.matching_blocks = matching_blocks(self.a, self.b)
+        return self.matching_blocks
+
+
+def matching_blocks(a, b):
+    """Return a list of (i, j, n) triples describing matching lines.
+
+    a and b are sequences of hashable items (normally lines). The list has the
+    same format as difflib.SequenceMatcher.get_matching_blocks(), and ends
+    with the dummy triple (len(a), len(b), 0).
+
+    """
+    matches = []    # (i, j) pairs of matching lines
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        alo, ahi, blo, bhi = ranges.pop()
+        # common lines at the start and the end
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            # the lines between the anchors are compared again
+            for i, j in anchors:
+                matches.append((i, j))
+                ranges.append((alo, i, blo, j))
+                alo, blo = i + 1, j + 1
+            ranges.append((alo, ahi, blo, bhi))
+        else:
+            # there are no unique lines, use difflib for this (small) range
+            m = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], False)
+            for i, j, n in m.get_matching_blocks():
+                matches.extend((alo + i + k, blo + j + k) for k in range(n))
+    matches.sort()
+    blocks = []
+    for i, j in matches:
+        if blocks and blocks[-1][0] + blocks[-1][2] == i and blocks[-1][1] + blocks[-1][2] == j:
+            blocks[-1][2] += 1
+        else:
+            blocks.append([i, j, 1])
+    blocks = [tuple(block) for block in blocks]
+    blocks.append((len(a), len(b), 0))
+    return blocks
+
+
+def _unique_anchors(a, alo, ahi, b, blo, bhi):
+    """Return the longest increasing list of (i, j) pairs of lines that occur
+    only once in a[alo:ahi] and b[blo:bhi]."""
+    counts = collections.Counter(a[alo:ahi])
+    index = {}
+    for i in range(alo, ahi):
+        if counts[a[i]] == 1:
+            index[a[i]] = i
+    counts = collections.Counter(b[blo:bhi])
+    pairs = [(index[b[j]], j) for j in range(blo, bhi)
+             if counts[b[j]] == 1 and b[j] in index]
+    if not pairs:
+        return []
+    # the pairs are ordered by j; find the longest subsequence that is also
+    # ordered by i (patience sorting)
+    tops = []       # the i of the last pair on every pile
+    piles = []      # the index in pairs of the last pair on every pile
+    previous = []   # the index of the previous pair in the subsequence
+    for n, (i, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tops, i)
+        previous.append(piles[pile - 1] if pile else -1)
+        if pile == len(tops):
+            tops.append(i)
+            piles.append(n)
+        else:
+            tops[pile] = i
+            piles[pile] = n
+    result = []
+    n = piles[-1]
+    while n != -1:
+        result.append(pairs[n])
+        n = previous[n]
+    result.reverse()
+    return result
+
+
+def opcodes(a, b):
+    """Return a list of 5-tuples describing how to turn text a into text b.
+
+    The tuples are in the same format as those returned by
+    difflib.SequenceMatcher.get_opcodes(), with character positions. The
+    lines are compared first, and the characters only within changed lines.
+    Large blocks of changed lines are compared line by line.
+
+    """
+    a_lines = a.splitlines(True)
+    b_lines = b.splitlines(True)
+    a_pos = _offsets(a_lines)
+    b_pos = _offsets(b_lines)
+    result = []
+    def add(tag, i1, i2, j1, j2):
+        if result and result[-1][0] == tag:
+            i1, j1 = result.pop()[1::2]
+        result.append((tag, i1, i2, j1, j2))
+    def refine(i1, i2, j1, j2):
+        if i2 - i1 + j2 - j1 > MAX_REFINE:
+            add('replace', i1, i2, j1, j2)
+            return
+        m = difflib.SequenceMatcher(None, a[i1:i2], b[j1:j2], False)
+        for tag, k1, k2, l1, l2 in m.get_opcodes():
+            add(tag, i1 + k1, i1 + k2, j1 + l1, j1 + l2)
+    for tag, i1, i2, j1, j2 in LineMatcher(a_lines, b_lines).get_opcodes():
+        if tag != 'replace':
+            add(tag, a_pos[i1], a_pos[i2], b_pos[j1], b_pos[j2])
+        elif a_pos[i2] - a_pos[i1] + b_pos[j2] - b_pos[j1] <= MAX_REFINE:
+            refine(a_pos[i1], a_pos[i2], b_pos[j1], b_pos[j2])
+        else:
+            # a large hunk: compare the lines one by one, as comparing all
+            # characters would take too long
+            count = min(i2 - i1, j2 - j1)
+            for k in range(count):
+                refine(a_pos[i1 + k], a_pos[i1 + k + 1], b_pos[j1 + k], b_pos[j1 + k + 1])
+            if i2 - i1 > count:
+                add('delete', a_pos[i1 + count], a_pos[i2], b_pos[j2], b_pos[j2])
+            elif j2 - j1 > count:
+                add('insert', a_pos[i2], a_pos[i2], b_pos[j1 + count], b_pos[j2])
+    return result
+
+
+def _offsets(lines):
+    """Return the list of the positions of the lines, with the total length
+    appended."""
+    pos = [0]
+    for line in lines:
+        pos.append(pos[-1] + len(line))
+    return pos
+
+
+def edits(a, b):
+    """Return a list of (start, end, text) tuples to turn text a into text b.
+
+    Every tuple means: replace a[start:end] with text. The edits are returned
+    from the end to the start, so they can be applied in that order.
+
+    """
+    return [(i1, i2, b[j1:j2])
+        for tag, i1, i2, j1, j2 in reversed(opcodes(a, b))
+        if tag != 'equal']
+
+
+def unified_diff(a, b, fromfile='', tofile='', n=3, lineterm='\n'):
+    """Like difflib.unified_diff(), but faster for large lists of lines."""
+    started = False
+    for group in LineMatcher(a, b).get_grouped_opcodes(n):
+        if not started:
+            started = True
+            yield f'--- {fromfile}{lineterm}'
+            yield f'+++ {tofile}{lineterm}'
+        first, last = group[0], group[-1]
+        yield '@@ -{} +{} @@{}'.format(
+            _format_range(first[1], last[2]), _format_range(first[3], last[4]),
+            lineterm)
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in a[i1:i2]:
+                    yield ' ' + line
+                continue
+            if tag in ('replace', 'delete'):
+                for line in a[i1:i2]:
+                    yield '-' + line
+            if tag in ('replace', 'insert'):
+                for line in b[j1:j2]:
+                    yield '+' + line
+
+
+def _format_range(start, stop):
+    """Convert a range to the "ed" format, like difflib does."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
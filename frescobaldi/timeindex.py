@@ -0,0 +1,291 @@
+# This file is part of the Frescobaldi project, http://www.frescobaldi.org/
+#
+# Copyright (c) 2008 - 2014 by Wilbert Berendsen
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+# See http://www.gnu.org/licenses/ for more information.
+
+"""
+Computes time positions in the music of a document, updating incrementally.
+
+documentinfo.music() builds the music tree of the whole document again after
+every change. The TimeIndex keeps its music tree and, after a change, only
+reads the toplevel expressions (assignments, \\score blocks, etc.) again
+that contain the changed text.
+
+The toplevel items of the tree are grouped in segments of whole lines. When
+text is inserted or removed, the segments containing the change are marked
+dirty, and the positions of the segments after it are shifted. The nodes in
+a clean segment keep the positions they had when they were read, so a
+position in the document is translated to the coordinates of its segment
+before the tree is consulted.
+
+When a change turns out to affect the text after it, (e.g. when an opening
+brace is typed), the whole tree is read again.
+"""
+
+
+import bisect
+
+import documentinfo
+import lydocument
+import music
+import plugin
+import tokeniter
+import ly.document
+import ly.music.items
+import ly.music.read
+
+
+def time_position(doc, position):
+    """Return the time position in the music at position, as a Fraction.
+
+    Returns None if the position is not in a music expression.
+
+    """
+    if not _lilypond(doc):
+        return documentinfo.music(doc).time_position(position)
+    return TimeIndex.instance(doc).time_position(position)
+
+
+def time_length(doc, start, end):
+    """Return the length of the music between start and end, as a Fraction.
+
+    Returns None if start and end are not in the same music expression.
+
+    """
+    if not _lilypond(doc):
+        return documentinfo.music(doc).time_length(start, end)
+    return TimeIndex.instance(doc).time_length(start, end)
+
+
+def _lilypond(doc):
+    """Return True if the document is a LilyPond document.
+
+    The mode of the highlighter is used, documentinfo.mode() may need to
+    tokenize the whole document.
+
+    """
+    return lydocument.Document(doc).initial_state().mode() == "lilypond"
+
+
+class Segment:
+    """A range of whole lines containing a number of toplevel items.
+
+    start is the current position of the segment in the document, shift the
+    number of characters that has been inserted (or removed, when negative)
+    before the segment since its items were read, count the number of toplevel
+    items and dirty is True when the segment has been changed.
+
+    state is the (language, duration) state of the ly.music Reader at the end
+    of the segment. The default duration of a note without duration is the
+    duration of the previous note, even if it is in a previous expression;
+    when it changes, the next segment is read again as well.
+
+    """
+    def __init__(self, start, count, state):
+        self.start = start
+        self.shift = 0
+        self.count = count
+        self.state = state
+        self.dirty = False
+
+
+class Tree(music.Document):
+    """A music.Document that only looks up nodes in some of its children.
+
+    The children are not read from the document on construction; they are
+    added by the TimeIndex. The children in the range lo:hi must have
+    positions in the same coordinates as the positions given to node().
+
+    """
+    lo = 0
+    hi = None
+
+    def __init__(self, doc):
+        ly.music.items.Item.__init__(self)
+        self.document = doc
+        self.include_node = None
+        self.include_path = []
+        self.relative_includes = True
+
+    def node(self, position, depth=-1):
+        """Return the node at or just before the specified position."""
+        return _node(self, self[self.lo:self.hi], position, depth)
+
+
+def _node(node, children, position, depth):
+    """Return the node at or just before position, looking in children.
+
+    This does the same as ly.music.items.Document.node().
+
+    """
+    while depth != 0 and children:
+        i = bisect.bisect_right([n.position for n in children], position) - 1
+        if i < 0:
+            break
+        node = children[i]
+        if node.position == position:
+            break
+        children = node[:]
+        depth -= 1
+    return node
+
+
+class TimeIndex(plugin.DocumentPlugin):
+    """Keeps a music tree that is partially read again after changes."""
+    def __init__(self, doc):
+        self._tree = None
+        self._segments = []
+        doc.contentsChange.connect(self._contentsChange)
+
+    def _contentsChange(self, position, removed, added):
+        """Called when the document changes; marks the segments dirty."""
+        segments = self._segments
+        if not segments:
+            return
+        i = max(0, bisect.bisect_right([s.start for s in segments], position) - 1)
+        end = position + removed
+        j = i + 1
+        while j < len(segments) and segments[j].start <= end:
+            j += 1
+        # merge the changed segments in one dirty segment
+        seg = segments[i]
+        seg.count = sum(s.count for s in segments[i:j])
+        seg.state = segments[j-1].state
+        seg.dirty = True
+        del segments[i+1:j]
+        for s in segments[i+1:]:
+            s.start += added - removed
+            s.shift += added - removed
+
+    def _read(self, start, end, state):
+        """Read the toplevel items from start to end (None for the end).
+
+        The Reader starts with the (language, duration) state. Returns the
+        list of items and the list of the Reader states after every item.
+
+        """
+        c = ly.document.Cursor(lydocument.Document(self.document()), start, end)
+        reader = ly.music.read.Reader(
+            ly.document.Source(c, True, tokens_with_position=True))
+        reader.language, reader.prev_duration = state
+        items, states = [], []
+        for item in reader.read():
+            items.append(item)
+            states.append((reader.language, reader.prev_duration))
+        return items, states
+
+    def _build(self):
+        """Read the whole tree."""
+        reader = ly.music.read.Reader(None)
+        state = reader.language, reader.prev_duration
+        items, states = self._read(0, None, state)
+        self._tree = Tree(lydocument.Document(self.document()))
+        self._tree.extend(items)
+        self._segments = self._make_segments(items, states, 0, state)
+
+    def _make_segments(self, items, states, start, state):
+        """Return a list of Segments for the items, the first one at start.
+
+        state is the Reader state at start, states the Reader states after
+        every item.
+
+        """
+        doc = self.document()
+        segments = [Segment(start, 0, state)]
+        last = -1   # the last block number of the current segment
+        for item, state in zip(items, states):
+            first = doc.findBlock(item.position).blockNumber()
+            if segments[-1].count and first > last:
+                segments.append(Segment(doc.findBlockByNumber(first).position(), 0, state))
+            segments[-1].count += 1
+            segments[-1].state = state
+            last = max(last, doc.findBlock(item.end_position()).blockNumber())
+        return segments
+
+    def _update(self):
+        """Read the dirty segments again, or everything if needed."""
+        if self._tree is None:
+            self._build()
+            return
+        doc = self.document()
+        segments = self._segments
+        reader = ly.music.read.Reader(None)
+        state = reader.language, reader.prev_duration
+        lo = 0
+        i = 0
+        while i < len(segments):
+            seg = segments[i]
+            if not seg.dirty:
+                lo += seg.count
+                state = seg.state
+                i += 1
+                continue
+            end = segments[i+1].start if i + 1 < len(segments) else None
+            if end is not None and tokeniter.state(doc.findBlock(end)).depth() != 1:
+                # the change affected the text after the segment
+                self._build()
+                return
+            items, states = self._read(seg.start, end, state)
+            self._tree[lo:lo+seg.count] = items
+            new = self._make_segments(items, states, seg.start, state)
+            if end is not None and new[-1].state != seg.state:
+                # the notes in the next segment may get another duration
+                segments[i+1].dirty = True
+            segments[i:i+1] = new
+            lo += len(items)
+            state = new[-1].state
+            i += len(new)
+
+    def _find(self, position):
+        """Return the (up-to-date) Segment to look up position in, or None.
+
+        This is the segment containing the last item that starts at or
+        before position, which may be an earlier segment than the one
+        containing position, e.g. when position is in the indent before the
+        first item of a segment.
+
+        Also sets the lo and hi attributes of the tree to the range of the
+        items in the segment.
+
+        """
+        if self._tree is None or any(s.dirty for s in self._segments):
+            self._update()
+        self._tree.include_path = documentinfo.info(self.document()).includepath()
+        segments = self._segments
+        i = bisect.bisect_right([s.start for s in segments], position) - 1
+        lo = sum(s.count for s in segments[:i])
+        while i >= 0:
+            seg = segments[i]
+            if seg.count and self._tree[lo].position <= position - seg.shift:
+                self._tree.lo, self._tree.hi = lo, lo + seg.count
+                return seg
+            i -= 1
+            lo -= segments[i].count if i >= 0 else 0
+
+    def time_position(self, position):
+        """Return the time position at position, or None."""
+        seg = self._find(position)
+        if seg:
+            return self._tree.time_position(position - seg.shift)
+
+    def time_length(self, start, end):
+        """Return the length of the music between start and end, or None."""
+        if start > end:
+            start, end = end, start
+        seg = self._find(start)
+        if seg and seg is self._find(end):
+            return self._tree.time_length(start - seg.shift, end - seg.shift)
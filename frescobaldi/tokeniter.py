@@ -22,8 +22,8 @@ Use this module to get the parsed tokens of a document.
 
 The tokens are created by the syntax highlighter, see highlighter.py.
 The core methods of this module are tokens() and state(). These access
-the token information from the highlighter, and also run the highlighter
-if it has not run yet.
+the token information from the highlighter, and also lex the blocks that
+the highlighter has not processed yet.
 
 If you alter the document and directly after that need the new tokens,
 use update().
@@ -44,26 +44,34 @@ def tokens(block):
     try:
         return block.userData().tokens
     except AttributeError:
-        # we used to call highlighter.highlighter(block.document()).rehighlight()
-        # here, but there is a bug in PyQt-4.9.6 causing QTextBlockUserData to
-        # lose its Python attributes. So we only run the highlighter when the
-        # previous block's userState() is -1.
+        highlighter.highlighter(block.document()).lexUntil(block)
+    try:
+        return block.userData().tokens
+    except AttributeError:
+        # there was a bug in PyQt-4.9.6 causing QTextBlockUserData to
+        # lose its Python attributes, so don't rely on them being present.
         return tuple(state(block).tokens(block.text()))
 
 
 def state(block):
-    """Return the ly.lex.State() object at the beginning of the given QTextBlock."""
+    """Return the ly.lex.State() object at the beginning of the given QTextBlock.
+
+    Only the blocks before the block that have not been lexed yet are lexed.
+
+    """
     hl = highlighter.highlighter(block.document())
-    if block.previous().userState() == -1 and block.blockNumber() > 0:
-        hl.rehighlight()
+    hl.lexUntil(block.previous())
     return hl.state(block.previous())
 
 
 def state_end(block):
-    """Return the ly.lex.State() object at the end of the given QTextBlock."""
+    """Return the ly.lex.State() object at the end of the given QTextBlock.
+
+    Only the blocks up to the block that have not been lexed yet are lexed.
+
+    """
     hl = highlighter.highlighter(block.document())
-    if block.userState() == -1:
-        hl.rehighlight()
+    hl.lexUntil(block)
     return hl.state(block)
 
 
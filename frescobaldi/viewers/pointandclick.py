@@ -30,8 +30,6 @@ import weakref
 
 from PyQt6.QtCore import QRectF
 
-import qpageview.locking
-
 import util
 import textedit
 import pointandclick
@@ -42,22 +40,25 @@ _cache = weakref.WeakKeyDictionary()
 
 
 def links(document):
+    """Return the Links for the qpageview Document.
+
+    The links are loaded in the background, see pointandclick.Loader.
+
+    """
     try:
         return _cache[document]
     except KeyError:
         l = _cache[document] = Links()
-        with l:
-            with qpageview.locking.lock(document):
-                for num, page in enumerate(document.pages()):
-                    for link in page.links():
-                        t = textedit.link(link.url)
-                        if t:
-                            filename = util.normpath(t.filename)
-                            area = QRectF(*link.area)
-                            l.add_link(filename, t.line, t.column, (num, area))
+        l.loader = pointandclick.Loader(l, document, _destination)
+        l.loader.start()
         return l
 
 
+def _destination(num, area):
+    """Return the destination stored in the Links for a link area."""
+    return (num, QRectF(*area))
+
+
 class Links(pointandclick.Links):
     """Stores all the links of a PDF document sorted by URL and text position.
 
@@ -94,31 +94,213 @@ class LinePainter(QObject):
         return True
 
 
+class FoldIndex:
+    """Stores the fold Level of every block, for fast depth and region queries.
+
+    The levels are kept in a segment tree. Every node stores the sum of the
+    levels of its blocks (i.e. how much the depth changes) and the lowest depth
+    reached in its blocks, relative to the depth before its first block. With
+    those, the depth of a block and the blocks where regions start or end are
+    found in O(log n) time.
+
+    When splice() changes the number of blocks, the tree is built again on
+    the next query.
+
+    """
+    def __init__(self, levels=()):
+        self._levels = list(levels)
+        self._build()
+
+    def __len__(self):
+        return len(self._levels)
+
+    def copy(self):
+        """Return a copy of the FoldIndex."""
+        index = FoldIndex.__new__(FoldIndex)
+        index._levels = self._levels[:]
+        index._sum = self._sum[:]
+        index._low = self._low[:]
+        index._size = self._size
+        index._stale = self._stale
+        return index
+
+    def _build(self):
+        """Build the tree from the levels."""
+        size = 1
+        while size < len(self._levels):
+            size *= 2
+        self._size = size
+        self._sum = sums = [0] * (2 * size)
+        self._low = low = [float('inf')] * (2 * size)
+        for i, (stop, start) in enumerate(self._levels, size):
+            sums[i] = stop + start
+            low[i] = stop
+        for i in range(size - 1, 0, -1):
+            sums[i] = sums[2*i] + sums[2*i+1]
+            low[i] = min(low[2*i], sums[2*i] + low[2*i+1])
+        self._stale = False
+
+    def level(self, i):
+        """Return the Level of block i."""
+        return self._levels[i]
+
+    def set(self, i, level):
+        """Set the Level of block i."""
+        if self._levels[i] == level:
+            return
+        self._levels[i] = level
+        if self._stale:
+            return
+        sums, low = self._sum, self._low
+        i += self._size
+        sums[i] = level.stop + level.start
+        low[i] = level.stop
+        i //= 2
+        while i:
+            sums[i] = sums[2*i] + sums[2*i+1]
+            low[i] = min(low[2*i], sums[2*i] + low[2*i+1])
+            i //= 2
+
+    def splice(self, start, end, levels):
+        """Replace the levels of the blocks start:end with levels."""
+        if len(levels) == end - start:
+            for i, level in enumerate(levels, start):
+                self.set(i, level)
+        else:
+            self._levels[start:end] = levels
+            self._stale = True
+
+    def _prefix(self, i):
+        """Return the depth at the start of block i and the lowest depth
+        reached in the blocks before it (inf if i is 0)."""
+        if self._stale:
+            self._build()
+        sums, low = self._sum, self._low
+        depth, lowest = 0, float('inf')
+        node, lo, hi = 1, 0, self._size
+        while lo < i:
+            if hi <= i:
+                lowest = min(lowest, depth + low[node])
+                depth += sums[node]
+                break
+            mid = (lo + hi) // 2
+            if i > mid:
+                lowest = min(lowest, depth + low[2*node])
+                depth += sums[2*node]
+                node, lo = 2*node+1, mid
+            else:
+                node, hi = 2*node, mid
+        return depth, lowest
+
+    def depth(self, i):
+        """Return the depth at the start of block i."""
+        return self._prefix(i)[0]
+
+    def toplevel(self, i):
+        """Return True if all regions starting before block i end before it."""
+        depth, lowest = self._prefix(i)
+        return depth <= lowest
+
+    def find_toplevel(self, i):
+        """Return the last block at or before block i that is at toplevel."""
+        while not self.toplevel(i):
+            # this block starts a region that is still open at block i,
+            # or, if it starts none, ends all regions before it
+            b = self.find_before(i, self.depth(i))
+            i = b if self._levels[b].start else b + 1
+        return i
+
+    def lowest(self, i):
+        """Return the lowest depth reached in block i (after its stops)."""
+        return self.depth(i) + self._levels[i].stop
+
+    def find_before(self, i, depth):
+        """Return the last block before block i where the depth goes lower
+        than depth, or -1 if there is none."""
+        if self._stale:
+            self._build()
+        sums, low = self._sum, self._low
+        def find(node, lo, hi, offset):
+            # offset is the depth at the start of block lo
+            if lo >= i or offset + low[node] >= depth:
+                return -1
+            if hi - lo == 1:
+                return lo
+            mid = (lo + hi) // 2
+            result = find(2*node+1, mid, hi, offset + sums[2*node])
+            if result == -1:
+                result = find(2*node, lo, mid, offset)
+            return result
+        return find(1, 0, self._size, 0)
+
+    def find_after(self, i, depth):
+        """Return the first block after block i where the depth goes down to
+        depth or lower, or -1 if there is none."""
+        if self._stale:
+            self._build()
+        sums, low = self._sum, self._low
+        def find(node, lo, hi, offset):
+            # offset is the depth at the start of block lo
+            if hi <= i + 1 or offset + low[node] > depth:
+                return -1
+            if hi - lo == 1:
+                return lo
+            mid = (lo + hi) // 2
+            result = find(2*node, lo, mid, offset)
+            if result == -1:
+                result = find(2*node+1, mid, hi, offset + sums[2*node])
+            return result
+        return find(1, 0, self._size, 0)
+
+
+def _merge_range(block_range, first, old_last, last):
+    """Merge the (first, last) range of changed blocks with block_range.
+
+    block_range is a (first, last) tuple of block numbers from before the
+    change or None, old_last the number the last changed block had before the
+    change. Returns the merged range in the block numbers after the change.
+
+    """
+    if block_range is None:
+        return first, last
+    a, b = block_range
+    if a > old_last:
+        a += last - old_last
+    if b > old_last:
+        b += last - old_last
+    elif b >= first:
+        b = last
+    return min(a, first), max(b, last)
+
+
 class Folder(QObject):
     """Manages the folding of a QTextDocument.
 
     You should inherit from this class to provide folding events.
     It is enough to implement the fold_events() method.
 
-    By default, simple caching is used to store the nesting depth every
-    20 lines. This makes the depth() method faster, which would otherwise count
-    the fold_events() for every block from the beginning of the document.
-
-    The depth() caching expects that the fold_events that a text block
-    generates do not depend on the contents of a text block later in the
-    document.
+    The fold level of every block is stored in a FoldIndex, so the depth()
+    and region() methods do not need to count the fold_events() of all the
+    blocks before or after a block. When the document changes, the levels of
+    the changed blocks are computed again. Also the blocks after them are
+    computed again, as long as the userState() of the preceding block has
+    changed, so fold_events() may depend on the state a syntax highlighter
+    stores in the blocks.
 
-    If your fold_events() method generates events for a text block that depend
-    on a later block, you should disable caching by setting the
-    cache_depth_lines instance (or class) attribute to zero.
+    The fold_events() that a text block generates should not depend on the
+    contents of a text block later in the document. If your fold_events()
+    method does depend on them, call invalidate_depth_cache() to recompute
+    the levels from a block.
 
     """
-    # cache depth() for every n lines (0=disable)
-    cache_depth_lines = 20
-
     def __init__(self, doc):
         QObject.__init__(self, doc)
-        self._depth_cache = []      # cache result of depth()
+        self._index = None          # FoldIndex with the Level of every block
+        self._states = []           # userState() of the blocks in the index
+        self._dirty = None          # (first, last) block numbers to update
+        self._changed = None        # (first, last) block numbers to check
+        self._checked = None        # (FoldIndex, block count) before changes
+        self._block_count = doc.blockCount()
         self._all_visible = None    # True when all are certainly visible
         doc.contentsChange.connect(self.slot_contents_change)
         self._timer = QTimer(singleShot=True, timeout=self.check_consistency)
@@ -137,13 +319,25 @@ class Folder(QObject):
         """Called when the document changes.
 
         Provides limited support for unhiding regions when the user types
-        text in it, and deletes the depth() cache for lines from position.
+        text in it, and marks the changed blocks for updating the FoldIndex
+        and for the consistency check.
 
         """
-        block = self.document().findBlock(position)
-        if self.cache_depth_lines:
-            chunk = block.blockNumber() // self.cache_depth_lines
-            del self._depth_cache[chunk:]
+        doc = self.document()
+        block = doc.findBlock(position)
+        first = block.blockNumber()
+        last = doc.findBlock(position + added).blockNumber()
+        count = doc.blockCount()
+        old_last = last - (count - self._block_count)
+        if self._changed is None and self._index is not None and self._dirty is None:
+            # keep the levels the last consistency check saw
+            self._checked = self._index.copy(), self._block_count
+        self._block_count = count
+        if self._index is not None:
+            self._index.splice(first, old_last + 1, [Level(0, 0)] * (last - first + 1))
+            self._states[first:old_last + 1] = [None] * (last - first + 1)
+            self._dirty = _merge_range(self._dirty, first, old_last, last)
+        self._changed = _merge_range(self._changed, first, old_last, last)
 
         if self._all_visible:
             return
@@ -167,33 +361,79 @@ class Folder(QObject):
                     n = n.next()
                 start = block.next().position()
                 self.document().markContentsDirty(start, n.position() - start)
-        self._timer.start(250 + self.document().blockCount())
+        self._timer.start(250)
 
     def invalidate_depth_cache(self, block):
-        """Makes sure the depth is recomputed from the specified block."""
-        if self.cache_depth_lines:
-            chunk = block.blockNumber() // self.cache_depth_lines
-            del self._depth_cache[chunk:]
+        """Makes sure the fold levels are recomputed from the specified block."""
+        if self._index is not None:
+            first = block.blockNumber()
+            if self._dirty:
+                first = min(first, self._dirty[0])
+            self._dirty = first, self._block_count - 1
+
+    def fold_index(self):
+        """Return the up-to-date FoldIndex with the Level of every block."""
+        doc = self.document()
+        if self._index is None:
+            levels, states = [], []
+            for block in cursortools.all_blocks(doc):
+                levels.append(self.fold_level(block))
+                states.append(block.userState())
+            self._index = FoldIndex(levels)
+            self._states = states
+            self._dirty = None
+        elif self._dirty:
+            (first, last), self._dirty = self._dirty, None
+            block = doc.findBlockByNumber(first)
+            n = first
+            changed = True
+            # also update the blocks after a block whose state has changed
+            while block.isValid() and (n <= last or changed):
+                self._index.set(n, self.fold_level(block))
+                state = block.userState()
+                changed = state != self._states[n]
+                self._states[n] = state
+                block = block.next()
+                n += 1
+        return self._index
 
     def check_consistency(self):
         """Called some time after the last document change.
 
-        Walk through the whole document, unfolding folded lines that
+        Walk through the changed part of the document, unfolding folded lines
+        that
         - are in the toplevel
         - are in regions that have visible lines
         - are in regions that have visible sub-regions
 
+        The walk starts at the last toplevel block (where no region is open)
+        before the first changed block, and stops at the first visible block
+        after the last changed block that is at toplevel, and also was before
+        the changes. If nothing was changed, the whole document is walked
+        through.
+
         """
         show_blocks = []
-        self._all_visible = True    # for now at least ...
+        doc = self.document()
+        index = self.fold_index()
+        changed, self._changed = self._changed, None
+        checked, self._checked = self._checked, None
+        if changed:
+            last = min(changed[1], len(index) - 1)
+            first = doc.findBlockByNumber(index.find_toplevel(min(changed[0], last)))
+        else:
+            first, last = doc.firstBlock(), len(index) - 1
+            self._all_visible = True    # for now at least ...
 
         def blocks_gen():
             """Yield depth (before block), block and fold_level per block."""
-            depth = 0
-            for b in cursortools.all_blocks(self.document()):
-                l = self.fold_level(b)
+            n = first.blockNumber()
+            depth = index.depth(n)
+            for b in cursortools.forwards(first):
+                l = index.level(n)
                 yield depth, b, l
                 depth += sum(l)
+                n += 1
 
         blocks = blocks_gen()
 
@@ -205,7 +445,8 @@ class Folder(QObject):
                 the invisible lines are already made visible)
             depth, block, and level are the result of the last block_gen yield.
             If level.start is True, a new region starts on the same line the
-            former one ends.
+            former one ends. The region may end on the same line as one of
+            its sub-regions.
 
             """
             must_show = False
@@ -213,18 +454,20 @@ class Folder(QObject):
             start_block.isVisible() or invisible_blocks.append(start_block)
             for depth, block, level in blocks:
                 block.isVisible() or invisible_blocks.append(block)
-                if depth + level.stop < start_depth:
-                    # the region ends
-                    if block.isVisible() and not level.start:
-                        must_show = True
-                    if must_show:
-                        show_blocks.extend(invisible_blocks)
-                    elif invisible_blocks:
-                        self._all_visible = False
-                    return must_show, depth, block, level
-                elif block.isVisible():
+                if depth + level.stop >= start_depth and block.isVisible():
                     must_show = True
-                while level.start:
+                while block is not None:
+                    if depth + level.stop < start_depth:
+                        # the region ends
+                        if block.isVisible() and not level.start:
+                            must_show = True
+                        if must_show:
+                            show_blocks.extend(invisible_blocks)
+                        elif invisible_blocks:
+                            self._all_visible = False
+                        return must_show, depth, block, level
+                    elif not level.start:
+                        break
                     must_show_region, depth, block, level = check_region(block, depth + sum(level))
                     if must_show_region:
                         must_show = True
@@ -233,6 +476,13 @@ class Folder(QObject):
 
         # toplevel
         for depth, block, level in blocks:
+            n = block.blockNumber()
+            if n > last and block.isVisible() and index.toplevel(n):
+                # the regions before the block may have changed, so it must
+                # also have been at toplevel before the changes
+                old_index, old_count = checked or (None, 0)
+                if old_index and old_index.toplevel(n - len(index) + old_count):
+                    break
             block.isVisible() or show_blocks.append(block)
             while level.start:
                 must_show, depth, block, level = check_region(block, depth + sum(level))
@@ -284,34 +534,11 @@ class Folder(QObject):
     def depth(self, block):
         """Return the number of active regions at the start of this block.
 
-        The default implementation simply counts all the fold_events from
-        the beginning of the document, using caching if the cache_depth_lines
-        instance attribute is set to a value > 0.
+        The default implementation adds the fold levels of all the blocks
+        before the block, which are stored in the FoldIndex.
 
         """
-        depth = 0
-        last = block.document().firstBlock()
-        if self.cache_depth_lines:
-            chunk = block.blockNumber() // self.cache_depth_lines
-            if chunk:
-                target = block.document().findBlockByNumber(chunk * self.cache_depth_lines)
-                if chunk <= len(self._depth_cache):
-                    depth = self._depth_cache[chunk - 1]
-                    last = target
-                else:
-                    # some values need to be computed first
-                    if self._depth_cache:
-                        depth = self._depth_cache[-1]
-                        last = block.document().findBlockByNumber(len(self._depth_cache) * self.cache_depth_lines)
-                    while last < target:
-                        depth += sum(self.fold_events(last))
-                        last = last.next()
-                        if last.blockNumber() % self.cache_depth_lines == 0:
-                            self._depth_cache.append(depth)
-        while last < block:
-            depth += sum(self.fold_events(last))
-            last = last.next()
-        return depth
+        return self.fold_index().depth(block.blockNumber())
 
     def region(self, block, depth=0):
         """Return as Region (start, end) the region of the specified block.
@@ -325,29 +552,35 @@ class Folder(QObject):
         find one more above that, etc. Use -1 to get the top-most region.
 
         """
+        index = self.fold_index()
+        n = block.blockNumber()
+        total = index.depth(n + 1)
         start = None
-        start_depth = 0
-        count = 0
-        for b in cursortools.backwards(block):
-            l = self.fold_level(b)
-            if l.start:
-                count += l.start
-                if count > start_depth:
-                    start = b
-                    start_depth = count
-                    if count > depth > -1:
-                        break
-            count += l.stop
-        if start:
-            count = start_depth
-            end = None
-            for end in cursortools.forwards(block.next()):
-                l = self.fold_level(end)
-                if count <= -l.stop:
-                    return Region(start, end)
-                count += sum(l)
-            if end:
-                return Region(start, end)
+        level = index.level(n)
+        if level.start:
+            start, start_depth = n, level.start
+            lowest = index.lowest(n)
+        else:
+            lowest = total
+        # every block before that goes below the lowest depth found so far
+        # starts a region one level further out
+        b = n
+        while start is None or not start_depth > depth > -1:
+            b = index.find_before(b, lowest)
+            if b == -1:
+                break
+            lowest = index.lowest(b)
+            start, start_depth = b, total - lowest
+        if start is not None:
+            # the region ends in the first block that goes back to the
+            # depth the region started at
+            end = index.find_after(n, index.lowest(start))
+            if end == -1:
+                end = len(index) - 1
+                if end == n:
+                    return
+            doc = self.document()
+            return Region(doc.findBlockByNumber(start), doc.findBlockByNumber(end))
 
     def fold(self, block, depth=0):
         """Fold the region the block is in.
@@ -0,0 +1,31 @@
+"""
+Test setup: makes the frescobaldi modules importable and creates the
+QApplication, using the offscreen platform and a temporary home directory.
+"""
+
+import builtins
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frescobaldi'))
+
+_home = tempfile.mkdtemp(prefix='frescobaldi-tests-')
+os.environ['HOME'] = _home
+os.environ['XDG_CONFIG_HOME'] = _home
+os.environ['XDG_CACHE_HOME'] = os.path.join(_home, 'cache')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# the translation function is normally installed by the i18n module
+builtins._ = lambda *args: args[-1]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def qapp():
+    """The global QApplication."""
+    import app
+    if app.qApp is None:
+        app.instantiate()
+    return app.qApp
@@ -0,0 +1,34 @@
+"""
+Tests for documents whose loading is deferred until the contents are needed.
+"""
+
+from PyQt6.QtCore import QUrl
+
+import document
+import job.manager
+
+
+def make_deferred(tmp_path, text):
+    filename = tmp_path / 'deferred.ly'
+    filename.write_text(text)
+    return document.EditorDocument.new_deferred(QUrl.fromLocalFile(str(filename)))
+
+
+def test_plugin_does_not_load(tmp_path):
+    doc = make_deferred(tmp_path, "{ c d e }\n")
+    try:
+        job.manager.manager(doc)
+        assert not doc.isLoaded()
+        assert doc.toPlainText() == "{ c d e }\n"
+        assert doc.isLoaded()
+    finally:
+        doc.close()
+
+
+def test_block_access_loads(tmp_path):
+    doc = make_deferred(tmp_path, "a\nb\nc\n")
+    try:
+        assert doc.findBlockByNumber(1).text() == "b"
+        assert doc.isLoaded()
+    finally:
+        doc.close()
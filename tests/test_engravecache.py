@@ -0,0 +1,71 @@
+"""
+Tests for the cache of engraving results.
+"""
+
+import os
+import types
+
+import job
+import job.cache
+
+
+class FakeJob:
+    """Has the parts of a job.lilypond.LilyPondJob that make up the key."""
+    def __init__(self, filename, includefiles=(), includepath=()):
+        self._filename = filename
+        self.includepath = list(includepath)
+        self.document_info = types.SimpleNamespace(
+            includefiles=lambda: set(includefiles))
+        self.lilypond_info = types.SimpleNamespace(
+            abscommand=lambda: '/usr/bin/lilypond', command='lilypond',
+            versionString=lambda: '2.24.0')
+
+    def filename(self):
+        return self._filename
+
+    def d_options(self):
+        return {'point-and-click': True}
+
+    def arguments(self):
+        return []
+
+    def backend_args(self):
+        return ['--pdf']
+
+
+def write(path, text):
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def test_key(tmp_path):
+    a = write(tmp_path / 'a' / 'music.ly', '{ c }')
+    b = write(tmp_path / 'b' / 'music.ly', '{ c }')
+    one = write(tmp_path / 'a' / 'one.ily', '{ d }')
+    two = write(tmp_path / 'a' / 'two.ily', '{ e }')
+    key = job.cache.key(FakeJob(a, [one, two]))
+    assert key == job.cache.key(FakeJob(a, [two, one]))
+    # same contents in another directory
+    assert key != job.cache.key(FakeJob(b, [one, two]))
+    assert key != job.cache.key(FakeJob(a, [one, two], ['/usr/share/ly']))
+    # swapped contents of the included files
+    write(tmp_path / 'a' / 'one.ily', '{ e }')
+    write(tmp_path / 'a' / 'two.ily', '{ d }')
+    assert key != job.cache.key(FakeJob(a, [one, two]))
+    assert job.cache.key(FakeJob(str(tmp_path / 'missing.ly'))) is None
+
+
+def test_store_and_restore(tmp_path):
+    source, target = tmp_path / 'source', tmp_path / 'target'
+    target.mkdir()
+    pdf = write(source / 'music.pdf', 'PDF')
+    output = [("Processing `music.ly'\n", job.STDERR),
+              ("music.ly:1:3: warning: barcheck failed\n", job.STDERR)]
+    job.cache.store('0123abcd', str(source), [pdf], output)
+    try:
+        assert job.cache.restore('0123abcd', str(target)) == [str(target / 'music.pdf')]
+        assert os.listdir(target) == ['music.pdf']
+        assert job.cache.output('0123abcd') == output
+    finally:
+        job.cache.clear()
@@ -0,0 +1,147 @@
+"""
+Tests for the fold levels kept by widgets.folding.Folder, comparing them
+with the implementation that counted the fold events of all blocks.
+"""
+
+import random
+
+import pytest
+
+from PyQt6.QtGui import QSyntaxHighlighter, QTextCursor, QTextDocument
+from PyQt6.QtWidgets import QPlainTextDocumentLayout
+
+import cursortools
+from widgets import folding
+
+
+class CommentHighlighter(QSyntaxHighlighter):
+    """Stores in the block state whether the block ends in a comment,
+    which is started by '<' and ended by '>'."""
+    def highlightBlock(self, text):
+        comment = self.previousBlockState() == 1
+        for c in text:
+            if c == '<':
+                comment = True
+            elif c == '>':
+                comment = False
+        self.setCurrentBlockState(1 if comment else 0)
+
+
+class CommentFolder(folding.Folder):
+    """A Folder ignoring braces in comments, so the fold events of a block
+    depend on the state of the preceding block."""
+    def fold_events(self, block):
+        comment = block.previous().userState() == 1
+        for c in block.text():
+            if c == '<':
+                comment = True
+            elif c == '>':
+                comment = False
+            elif not comment:
+                if c == '{':
+                    yield folding.START
+                elif c == '}':
+                    yield folding.STOP
+
+
+def old_depth(folder, block):
+    """The depth() that counted the fold events from the first block."""
+    depth = 0
+    for b in cursortools.forwards(block.document().firstBlock()):
+        if b == block:
+            break
+        depth += sum(folder.fold_events(b))
+    return depth
+
+
+def old_region(folder, block, depth=0):
+    """The region() that scanned the blocks backwards and forwards."""
+    start = None
+    start_depth = 0
+    count = 0
+    for b in cursortools.backwards(block):
+        l = folder.fold_level(b)
+        if l.start:
+            count += l.start
+            if count > start_depth:
+                start = b
+                start_depth = count
+                if count > depth > -1:
+                    break
+        count += l.stop
+    if start:
+        count = start_depth
+        end = None
+        for end in cursortools.forwards(block.next()):
+            l = folder.fold_level(end)
+            if count <= -l.stop:
+                return folding.Region(start, end)
+            count += sum(l)
+        if end:
+            return folding.Region(start, end)
+
+
+def numbers(region):
+    if region:
+        return region.start.blockNumber(), region.end.blockNumber()
+
+
+def random_text(rnd, length):
+    return ''.join(rnd.choice('{{}}<>ab \n\n') for i in range(length))
+
+
+def random_edit(rnd, doc):
+    cursor = QTextCursor(doc)
+    pos = rnd.randrange(doc.characterCount())
+    end = min(pos + rnd.randrange(12), doc.characterCount() - 1)
+    cursor.setPosition(pos)
+    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(random_text(rnd, rnd.randrange(12)))
+
+
+def make_document(rnd):
+    doc = QTextDocument()
+    doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
+    doc.setPlainText(random_text(rnd, 300))
+    return doc
+
+
+@pytest.mark.parametrize('folder_class', [folding.Folder, CommentFolder])
+@pytest.mark.parametrize('seed', range(6))
+def test_depth_and_region(seed, folder_class):
+    rnd = random.Random(seed)
+    doc = make_document(rnd)
+    highlighter = CommentHighlighter(doc)
+    highlighter.rehighlight()
+    folder = folder_class(doc)
+    for i in range(30):
+        random_edit(rnd, doc)
+        for block in cursortools.all_blocks(doc):
+            assert folder.depth(block) == old_depth(folder, block)
+            for depth in (0, 1, -1):
+                assert numbers(folder.region(block, depth)) == \
+                    numbers(old_region(folder, block, depth)), \
+                    f"edit {i}, block {block.blockNumber()}, depth {depth}"
+
+
+def visible_blocks(doc):
+    return [b.blockNumber() for b in cursortools.all_blocks(doc) if b.isVisible()]
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_check_consistency(seed):
+    rnd = random.Random(seed)
+    doc = make_document(rnd)
+    folder = folding.Folder(doc)
+    for i in range(30):
+        block = doc.findBlockByNumber(rnd.randrange(doc.blockCount()))
+        if block.isVisible():
+            folder.fold(block, rnd.choice((0, 1, -1)))
+        # without changes, the whole document is checked
+        folder.check_consistency()
+        random_edit(rnd, doc)
+        folder.check_consistency()
+        # checking the changed part must be as good as checking everything
+        visible = visible_blocks(doc)
+        folder.check_consistency()
+        assert visible_blocks(doc) == visible, f"edit {i}"
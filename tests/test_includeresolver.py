@@ -0,0 +1,56 @@
+"""
+Tests for the includeresolver module and the directories it watches.
+"""
+
+import os
+
+import pytest
+
+import includeresolver
+
+
+@pytest.fixture
+def small_watcher(monkeypatch):
+    monkeypatch.setattr(includeresolver, 'MAX_WATCHED', 3)
+    for directory in list(includeresolver._watched):
+        includeresolver.watcher().removePath(directory)
+    includeresolver._watched.clear()
+    includeresolver._listings.clear()
+    includeresolver._found.clear()
+
+
+def make_dirs(tmp_path, count):
+    dirs = []
+    for i in range(count):
+        d = tmp_path / f'dir{i}'
+        d.mkdir()
+        (d / 'file.ly').write_text('')
+        dirs.append(str(d))
+    return dirs
+
+
+def test_least_recently_used_is_evicted(tmp_path, small_watcher):
+    dirs = make_dirs(tmp_path, 4)
+    for d in dirs[:3]:
+        includeresolver.listing(d)
+    includeresolver.listing(dirs[0])
+    includeresolver.listing(dirs[3])
+    assert list(includeresolver._watched) == [dirs[2], dirs[0], dirs[3]]
+    assert set(includeresolver.watcher().directories()) == {dirs[2], dirs[0], dirs[3]}
+    assert dirs[1] not in includeresolver._listings
+
+
+def test_no_watch(tmp_path, small_watcher):
+    d = make_dirs(tmp_path, 1)[0]
+    assert includeresolver.listing(d, watch=False).isfile('file.ly')
+    assert not includeresolver._watched
+    assert not includeresolver.watcher().directories()
+
+
+def test_find_watches_search_directories_only(tmp_path, small_watcher):
+    dirs = make_dirs(tmp_path, 2)
+    os.mkdir(os.path.join(dirs[0], 'sub'))
+    open(os.path.join(dirs[0], 'sub', 'part.ly'), 'w').close()
+    assert includeresolver.find('sub/part.ly', [dirs[0]]) == os.path.join(dirs[0], 'sub', 'part.ly')
+    assert includeresolver.find('../dir1/file.ly', [dirs[0]]) == os.path.join(dirs[1], 'file.ly')
+    assert list(includeresolver._watched) == [os.path.join(dirs[0], 'sub')]
@@ -0,0 +1,135 @@
+"""
+Tests for the job queue: jobs waiting in a queue can be inspected and
+aborted before they are started.
+"""
+
+import sys
+
+from PyQt6.QtCore import QEventLoop, QTimer
+
+import job
+import job.queue
+
+
+def sleep_job():
+    return job.Job([sys.executable, '-c', 'import time; time.sleep(0.2)'])
+
+
+class KeyJob(job.Job):
+    """A job writing the output files with the given key."""
+    def __init__(self, key):
+        super().__init__([sys.executable, '-c', 'import time; time.sleep(0.2)'])
+        self._key = key
+
+    def output_key(self):
+        return self._key
+
+
+def wait_for(j):
+    loop = QEventLoop()
+    quit = lambda success: loop.quit()
+    j.done.connect(quit)
+    QTimer.singleShot(10000, loop.quit)
+    if j.is_running():
+        loop.exec()
+    j.done.disconnect(quit)
+
+
+def test_abort_queued_job():
+    queue = job.queue.JobQueue(num_runners=1)
+    first, second = sleep_job(), sleep_job()
+    started = []
+    queue.job_started.connect(lambda j: started.append(j))
+    results = []
+    second.done.connect(lambda success: results.append(success))
+    queue.add_job(first)
+    queue.add_job(second)
+    assert started == [first]
+    assert not first.is_queued() and first.is_running()
+    assert second.is_queued() and second.is_running()
+    assert queue.size() == 1
+
+    second.abort()
+    assert results == [False]
+    assert second.is_aborted()
+    assert not second.is_queued() and not second.is_running()
+    assert queue.size() == 0
+
+    wait_for(first)
+    assert first.success
+    assert started == [first]
+
+
+def test_queued_job_is_started():
+    queue = job.queue.JobQueue(num_runners=1)
+    first, second = sleep_job(), sleep_job()
+    started = []
+    queue.job_started.connect(lambda j: started.append(j))
+    queue.add_job(first)
+    queue.add_job(second)
+    wait_for(first)
+    assert started == [first, second]
+    assert not second.is_queued() and second.is_running()
+    wait_for(second)
+    assert second.success
+
+
+def test_runners_work_in_parallel():
+    queue = job.queue.JobQueue(num_runners=2)
+    first, second, third = sleep_job(), sleep_job(), sleep_job()
+    started = []
+    queue.job_started.connect(lambda j: started.append(j))
+    for j in first, second, third:
+        queue.add_job(j)
+    assert started == [first, second]
+    assert first.is_running() and not first.is_queued()
+    assert second.is_running() and not second.is_queued()
+    assert third.is_queued()
+    wait_for(first)
+    wait_for(second)
+    assert started == [first, second, third]
+    wait_for(third)
+    assert first.success and second.success and third.success
+    assert queue.completed() == 3
+
+
+def test_set_num_runners():
+    queue = job.queue.JobQueue(num_runners=1)
+    jobs = [sleep_job() for i in range(3)]
+    started = []
+    queue.job_started.connect(lambda j: started.append(j))
+    for j in jobs:
+        queue.add_job(j)
+    assert started == jobs[:1]
+    queue.set_num_runners(3)
+    assert queue.num_runners() == 3
+    assert started == jobs
+    assert queue.size() == 0
+
+    queue.set_num_runners(1)
+    assert queue.num_runners() == 1
+    # the removed runners finish their jobs
+    for j in jobs:
+        assert j.is_running()
+    for j in jobs:
+        wait_for(j)
+        assert j.success
+    assert queue.completed() == 3
+
+
+def test_same_output_key_not_parallel():
+    queue = job.queue.JobQueue(num_runners=3)
+    first, second, other = KeyJob('music'), KeyJob('music'), KeyJob('other')
+    started = []
+    queue.job_started.connect(lambda j: started.append(j))
+    for j in first, second, other:
+        queue.add_job(j)
+    # a runner is idle, but second has to wait for first
+    assert started == [first, other]
+    assert second.is_queued()
+    wait_for(first)
+    assert started == [first, other, second]
+    wait_for(second)
+    wait_for(other)
+    assert first.success and second.success and other.success
+    assert second.start_time() >= first.start_time() + first.elapsed_time()
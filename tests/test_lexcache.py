@@ -0,0 +1,52 @@
+"""
+Tests for the cache of lexer states and tokens used by the highlighter.
+"""
+
+from PyQt6.QtCore import QUrl
+from PyQt6.QtWidgets import QApplication
+
+import ly.lex
+
+import document
+import highlighter
+import lexcache
+
+
+def lex(text):
+    """Return the (class, pos, text) tuples of the tokens of every line."""
+    state = ly.lex.state(ly.lex.guessMode(text))
+    return [[(type(t), t.pos, t) for t in state.tokens(line)]
+            for line in text.split('\n')]
+
+
+def block_tokens(doc):
+    result = []
+    block = doc.firstBlock()
+    while block.isValid():
+        result.append([(type(t), t.pos, t) for t in block.userData().tokens])
+        block = block.next()
+    return result
+
+
+def test_cache_used_after_deferred_load(tmp_path):
+    text = '\\version "2.24.0"\n' + "music = { c'4 d' e' f' | g'2 g' }\n" * lexcache.MIN_BLOCKS
+    filename = tmp_path / 'large.ly'
+    filename.write_text(text)
+    url = QUrl.fromLocalFile(str(filename))
+
+    doc = document.EditorDocument.new_from_url(url)
+    highlighter.highlighter(doc)
+    QApplication.processEvents()
+    doc.close()
+    assert lexcache.load(str(filename), text, None)
+
+    doc = document.EditorDocument.new_deferred(url)
+    try:
+        hl = highlighter.highlighter(doc)
+        doc.ensureLoaded()
+        QApplication.processEvents()
+        assert hl._cache is not None
+        QApplication.processEvents()
+        assert block_tokens(doc) == lex(text)
+    finally:
+        doc.close()
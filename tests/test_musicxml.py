@@ -0,0 +1,85 @@
+"""
+Tests for the MusicXML export job.
+"""
+
+import glob
+import os
+import tempfile
+
+from PyQt6.QtCore import QEventLoop, QTimer
+
+import job.queue
+from file_export import musicxml
+
+
+TEXT = '\\version "2.18.0"\n\\relative c\' { c4 d e f }\n'
+
+
+def temp_files(directory=None):
+    pattern = os.path.join(directory or tempfile.gettempdir(), '.frescobaldi-musicxml-*')
+    return set(glob.glob(pattern))
+
+
+def wait_for(j):
+    loop = QEventLoop()
+    quit = lambda success: loop.quit()
+    j.done.connect(quit)
+    QTimer.singleShot(20000, loop.quit)
+    if j.is_running():
+        loop.exec()
+    j.done.disconnect(quit)
+
+
+def test_export(tmp_path):
+    before = temp_files()
+    xmlfile = str(tmp_path / 'music.xml')
+    j = musicxml.MusicXMLJob(TEXT, xmlfile)
+    queue = job.queue.JobQueue()
+    queue.add_job(j)
+    wait_for(j)
+    assert j.success, j.stderr()
+    with open(xmlfile, encoding='utf-8') as f:
+        assert '<score-partwise' in f.read()
+    assert os.listdir(tmp_path) == ['music.xml']
+    assert temp_files() == before
+
+
+def test_abort_queued(tmp_path):
+    before = temp_files()
+    queue = job.queue.JobQueue(num_runners=1)
+    first = musicxml.MusicXMLJob(TEXT, str(tmp_path / 'first.xml'))
+    second = musicxml.MusicXMLJob(TEXT, str(tmp_path / 'second.xml'))
+    queue.add_job(first)
+    queue.add_job(second)
+    second.abort()
+    first.abort()
+    wait_for(first)
+    assert not first.success and not second.success
+    assert os.listdir(tmp_path) == []
+    assert temp_files() == before
+
+
+def test_include(tmp_path):
+    (tmp_path / 'music.ily').write_text("music = \\relative c' { c4 d e f }\n")
+    text = '\\version "2.18.0"\n\\include "music.ily"\n{ \\music }\n'
+    filename = str(tmp_path / 'main.ly')
+    xmlfile = str(tmp_path / 'main.xml')
+    j = musicxml.MusicXMLJob(text, xmlfile, filename)
+    queue = job.queue.JobQueue()
+    queue.add_job(j)
+    wait_for(j)
+    assert j.success, j.stderr()
+    with open(xmlfile, encoding='utf-8') as f:
+        assert f.read().count('<note>') == 4
+    assert not temp_files(str(tmp_path))
+
+
+def test_write(tmp_path):
+    (tmp_path / 'music.ily').write_text("music = \\relative c' { c4 d e f }\n")
+    text = '\\version "2.18.0"\n\\include "music.ily"\n{ \\music }\n'
+    xmlfile = str(tmp_path / 'main.xml')
+    musicxml.write(text, str(tmp_path / 'main.ly'), xmlfile, 'Frescobaldi 4.0')
+    with open(xmlfile, encoding='utf-8') as f:
+        xml = f.read()
+    assert xml.count('<note>') == 4
+    assert '<software>Frescobaldi 4.0</software>' in xml
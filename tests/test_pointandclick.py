@@ -0,0 +1,47 @@
+"""
+Tests for the BoundLinks of the pointandclick module.
+"""
+
+from PyQt6.QtGui import QTextCursor, QTextDocument
+
+import pointandclick
+
+
+def make_document(text):
+    doc = QTextDocument()
+    doc.documentLayout()    # contentsChange is only emitted with a layout
+    doc.setPlainText(text)
+    return doc
+
+
+def insert(doc, position, text):
+    c = QTextCursor(doc)
+    c.setPosition(position)
+    c.insertText(text)
+
+
+def test_positions_follow_changes():
+    doc = make_document("abcd efgh\nijkl mnop\n")
+    links = pointandclick.BoundLinks(doc, {(1, 5): ['a'], (2, 0): ['b']})
+    assert links.positions() == [5, 10]
+    insert(doc, 0, "xx")
+    assert links.positions() == [7, 12]
+
+
+def test_change_while_links_are_pending():
+    doc = make_document("abcd efgh\nijkl mnop\n")
+    links = pointandclick.BoundLinks(doc, {(1, 5): ['a']})
+    links.add((2, 0), ['b'])
+    links.add((2, 5), ['c'])
+    insert(doc, 0, "xx")
+    assert links.positions() == [7, 12, 17]
+    assert links.cursor(2, 5).position() == 17
+
+
+def test_change_between_pending_links():
+    doc = make_document("abcd efgh\nijkl mnop\n")
+    links = pointandclick.BoundLinks(doc, {(1, 5): ['a']})
+    links.add((2, 0), ['b'])
+    insert(doc, 12, "xx")
+    links.add((2, 7), ['c'])
+    assert links.positions() == [5, 10, 17]
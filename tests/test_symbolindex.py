@@ -0,0 +1,71 @@
+"""
+Tests for the symbolindex module.
+"""
+
+import pytest
+
+from PyQt6.QtGui import QTextCursor
+
+import ly.lex.lilypond
+
+import document
+import documenttooltip
+import symbolindex
+import tokeniter
+
+
+def old_get_definition(cursor):
+    """The implementation of documenttooltip.get_definition() that walked
+    back through the blocks, used as reference."""
+    block = cursor.block()
+    while block.isValid():
+        state = tokeniter.state(block)
+        if isinstance(state.parser(), ly.lex.lilypond.ParseGlobal):
+            for t in tokeniter.tokens(block)[:2]:
+                if type(t) is ly.lex.lilypond.Name:
+                    return t[:]
+                elif isinstance(t, ly.lex.lilypond.Keyword) and t == '\\score':
+                    return '\\score'
+        block = block.previous()
+
+
+TEXTS = [
+    "foo = { c }\n\\score {\n  \\foo\n}\n",
+    "\\score {\n  { c d }\n}\nbar = { e }\n\\score { \\bar }\n",
+    "foo = { c }\n  \\score {\n  \\foo\n}\n",
+    "foo = { c }\n\\book {\n  \\score {\n    \\foo\n  }\n}\n",
+    "foo = {\n  c\n}\n% comment\n\\score {\n  <<\n    \\foo\n  >>\n  \\layout { }\n}\n"
+    "bar = \\relative {\n  d\n}\n",
+    "\\version \"2.24.0\"\n\n\\header { title = \"x\" }\n\n\\score {\n  c\n}\n",
+    "  foo = {\n    c d\n  }\n\\score {\n  \\foo\n}\n",
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_definition_at_matches_old_get_definition(text):
+    doc = document.EditorDocument()
+    doc.setPlainText(text)
+    block = doc.firstBlock()
+    while block.isValid():
+        cursor = QTextCursor(block)
+        assert documenttooltip.get_definition(cursor) == old_get_definition(cursor), \
+            f"line {block.blockNumber() + 1}"
+        block = block.next()
+
+
+def test_score_at_line_start():
+    doc = document.EditorDocument()
+    doc.setPlainText("foo = { c }\n\\score {\n  \\foo\n}\n")
+    kinds = [kind for pos, kind, name in symbolindex.document_symbols(doc).entries]
+    assert kinds == [symbolindex.DEFINITION, symbolindex.SCORE]
+
+
+def test_indented_definition():
+    doc = document.EditorDocument()
+    doc.setPlainText("  foo = { c }\n  bar = \\markup { x }\n\\header {\n  title = \"x\"\n}\n")
+    assert symbolindex.find_definition(doc, 'foo') == symbolindex.Definition(None, doc, 2)
+    assert [(kind, name) for pos, kind, name in symbolindex.document_symbols(doc).entries] == [
+        (symbolindex.DEFINITION, 'foo'),
+        (symbolindex.DEFINITION, 'bar'),
+        (symbolindex.MARKUP, 'bar'),
+    ]
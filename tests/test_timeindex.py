@@ -0,0 +1,69 @@
+"""
+Tests for the timeindex module, comparing its results with those of a
+freshly built music tree.
+"""
+
+import random
+
+import pytest
+
+from PyQt6.QtGui import QTextCursor
+
+import document
+import lydocument
+import music
+import timeindex
+
+
+def make_document(text):
+    doc = document.EditorDocument()
+    doc.setPlainText(text)
+    return doc
+
+
+def fresh_time_position(doc, position):
+    return music.Document(lydocument.Document(doc)).time_position(position)
+
+
+def test_delete_space_before_note():
+    doc = make_document("vN = { c4 d e f8 g }\n" * 5)
+    timeindex.time_position(doc, 0)
+    block = doc.findBlockByNumber(1)
+    c = QTextCursor(doc)
+    c.setPosition(block.position() + block.text().index(' g'))
+    c.deleteChar()
+    position = doc.findBlockByNumber(2).position()
+    assert timeindex.time_position(doc, position) == fresh_time_position(doc, position)
+
+
+def test_position_in_indent():
+    doc = make_document("vA = { c4 d e f8 g }\n  vB = { c2 }\n% text\n\n  vC = { d4 }\n")
+    tree = music.Document(lydocument.Document(doc))
+    for position in range(doc.characterCount()):
+        assert timeindex.time_position(doc, position) == tree.time_position(position), position
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_edits(seed):
+    rnd = random.Random(seed)
+    doc = make_document("vN = { c4 d e f8 g }\n" * 20)
+    edits = [" a8", "4", " ", "  ", "\n", "}", "{ ", " c'", "% x\n", "\\score { c4 }\n"]
+    for i in range(200):
+        c = QTextCursor(doc)
+        position = rnd.randrange(doc.characterCount() - 1)
+        c.setPosition(position)
+        if rnd.random() < 0.5:
+            end = min(position + rnd.randint(1, 3), doc.characterCount() - 1)
+            c.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            c.removeSelectedText()
+        else:
+            c.insertText(rnd.choice(edits))
+        tree = music.Document(lydocument.Document(doc))
+        for j in range(5):
+            if rnd.random() < 0.3:
+                block = doc.findBlockByNumber(rnd.randrange(doc.blockCount()))
+                position = block.position()
+            else:
+                position = rnd.randrange(doc.characterCount())
+            assert timeindex.time_position(doc, position) == tree.time_position(position), \
+                (i, position)